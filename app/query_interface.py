@@ -1,29 +1,40 @@
 """
 CLI interface for question answering using the KAG system.
+A thin client of the query service (app/service.py); without a running
+service it loads the artifacts in-process once for the session.
 """
-from solver.retriever import Retriever
-from solver.logical_form_solver import LogicalFormSolver
-from model.azure_openai_client import AzureOpenAIClient
-from model.instruction_tuner import InstructionTuner
-from model.summarizer import Summarizer
-from builder.indexer import process_dir as index_process
+from app.service_client import connect
 
-if __name__ == "__main__":
-    indexer = index_process("data/chunks")
-    if not indexer:
-        print("[Error] No valid chunks to index. Please check your PDF extraction and chunking steps.")
+def main():
+    client = connect()
+    ready, status = client.ready()
+    if not ready:
+        print(f"[Error] Query service is not ready: {status.get('error')}")
         exit(1)
-    retriever = Retriever(indexer=indexer)
-    solver = LogicalFormSolver()
-    llm = AzureOpenAIClient()
-    tuner = InstructionTuner()
-    summarizer = Summarizer()
-    
-    question = input("Ask a question: ")
-    answers = solver.solve(question, retriever)
-    for ans in answers:
-        prompt = tuner.build_prompt(ans['sub_question'], ans['context'])
-        response = llm.generate(prompt)
-        summary = summarizer.summarize(response)
-        print(f"Sub-question: {ans['sub_question']}")
-        print(f"Answer: {summary}\n")
\ No newline at end of file
+    while True:
+        try:
+            question = input("Ask a question: ").strip()
+        except EOFError:
+            break
+        if not question:
+            break
+        # Answers stream in sub-question order while all sub-questions run concurrently
+        pending = {}
+        def header(idx):
+            if idx in pending:
+                print(f"Sub-question: {pending.pop(idx)}")
+                print("Answer: ", end='', flush=True)
+        for event in client.answer(question):
+            if event['type'] == 'plan':
+                pending = {sq['index']: sq['sub_question'] for sq in event['sub_questions']}
+            elif event['type'] == 'token':
+                header(event['index'])
+                print(event['text'], end='', flush=True)
+            elif event['type'] == 'end':
+                header(event['index'])
+                print("\n")
+            elif event['type'] == 'answer' and event.get('error'):
+                print(f"[Error] Sub-question {event['index'] + 1}: {event['error']}")
+
+if __name__ == "__main__":
+    main()
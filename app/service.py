@@ -0,0 +1,295 @@
+"""
+Long-lived query service for the KAG system.
+Loads the index, merged graph, NER model and LLM client once, then answers
+questions over HTTP with JSON:
+
+    GET  /health     liveness (always 200 while the process runs)
+    GET  /ready      200 once artifacts are loaded, 503 before (or on load error)
+    POST /retrieve   {"question", "k", "hops", "session_id"} -> plan with retrieved chunks per sub-question
+    POST /answer     {"question", "k", "hops", "session_id"} -> NDJSON event stream (plan, token, end, answer, done)
+    POST /path       {"source", "target", "k", "max_hops", "edge_types"} -> typed graph paths
+
+Malformed bodies get 400 with {"error": ...}. Retrieval memory is kept per
+client-supplied session_id; requests without one get a fresh memory.
+
+Run with `python main.py serve` or `python -m app.service`.
+"""
+import os
+import json
+import time
+import difflib
+import argparse
+import threading
+from collections import OrderedDict
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from builder.indexer import load_or_build
+from builder.graph_store import load_or_build as load_graph_store
+from solver.retriever import Retriever
+from solver.logical_form_solver import LogicalFormSolver
+from solver.memory_manager import MemoryManager
+from solver.graph_reasoner import GraphReasoner
+from model.azure_openai_client import llm_from_env
+from model.instruction_tuner import InstructionTuner
+from model.summarizer import Summarizer
+from model.llm_dispatch import answer_streams
+from model import registry
+
+# Full spaCy pipeline, only used to list answer entities when none are in the graph
+registry.register('spacy', registry.spacy_model("en_core_web_sm"))
+# Models loaded before the service reports ready
+WARMUP_MODELS = ('spacy',)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Upper bounds for request parameters
+MAX_K = 50
+MAX_HOPS = 3
+MAX_PATH_HOPS = 6
+MAX_SESSION_ID = 128
+
+class RequestError(ValueError):
+    """A malformed request body; answered with 400 and the message."""
+
+def int_field(body, name, default, high):
+    value = body.get(name, default)
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise RequestError(f"'{name}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"'{name}' must be an integer") from None
+    if not 1 <= value <= high:
+        raise RequestError(f"'{name}' must be between 1 and {high}")
+    return value
+
+def str_field(body, name, required=True, max_length=None):
+    value = body.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or not value.strip():
+        raise RequestError(f"'{name}' must be a non-empty string")
+    if max_length is not None and len(value) > max_length:
+        raise RequestError(f"'{name}' must be at most {max_length} characters")
+    return value.strip()
+
+def _hit_json(hit):
+    return dict(hit._asdict())
+
+class QueryService:
+    """The loaded artifacts plus the question-answering operations the front ends need."""
+    def __init__(self, index_dir="data/index", chunk_dir="data/chunks",
+                 store_dir="data/graph_store", graph_dir="data/graphs", max_sessions=256):
+        self.artifact_dirs = (index_dir, chunk_dir, store_dir, graph_dir)
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()      # session id -> MemoryManager, least recently used first
+        self._sessions_lock = threading.Lock()
+        self.started = time.time()
+        self.ready = False
+        self.error = None
+        self.load_seconds = None
+        self._loader = None
+
+    # --- lifecycle ---
+    def load(self):
+        start = time.perf_counter()
+        try:
+            index_dir, chunk_dir, store_dir, graph_dir = self.artifact_dirs
+            self.indexer = load_or_build(index_dir, chunk_dir)
+            if not self.indexer:
+                raise RuntimeError("No valid chunks to index. Please check your PDF extraction and chunking steps.")
+            self.graph = load_graph_store(store_dir, graph_dir)
+            self.retriever = Retriever(indexer=self.indexer, graph=self.graph)
+            self.reasoner = GraphReasoner(self.graph) if self.graph else None
+            self.tuner = InstructionTuner()
+            self.summarizer = Summarizer(indexer=self.indexer)
+            self.llm = llm_from_env()
+            if getattr(self.llm, 'cache', None) is not None:
+                self.llm.cache.set_index_version(self.indexer.version)
+            registry.warmup(*WARMUP_MODELS)
+            self.nlp = registry.get_optional('spacy')
+            self.ready = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def start_loading(self):
+        """Load artifacts in a background thread so /health answers immediately."""
+        self._loader = threading.Thread(target=self.load, daemon=True)
+        self._loader.start()
+        return self
+
+    def status(self):
+        info = {'ready': self.ready, 'error': self.error, 'uptime': time.time() - self.started,
+                'load_seconds': self.load_seconds}
+        if self.ready:
+            info.update(index_version=self.indexer.version, chunks=len(self.indexer.ids),
+                        nodes=self.graph.number_of_nodes() if self.graph else 0,
+                        edges=self.graph.number_of_edges() if self.graph else 0)
+        return info
+
+    def solver(self, session_id=None):
+        """A solver over the session's retrieval memory; without a session id, over a fresh one."""
+        if session_id is None:
+            return LogicalFormSolver()
+        with self._sessions_lock:
+            memory = self._sessions.pop(session_id, None) or MemoryManager()
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return LogicalFormSolver(memory)
+
+    # --- operations ---
+    def retrieve(self, question, k=3, hops=2, session_id=None):
+        answers = self.solver(session_id).solve(question, self.retriever, k=k, hops=hops)
+        return [{'index': i, 'sub_question': ans['sub_question'], 'depends_on': ans['depends_on'],
+                 'hits': [_hit_json(hit) for hit in ans['hits']], 'timing': ans['timing']}
+                for i, ans in enumerate(answers)]
+
+    def answer_events(self, question, k=3, hops=2, session_id=None):
+        """
+        Event dicts for one question: a 'plan' event, 'token' events as the LLM
+        streams (all sub-questions run concurrently, emitted in order) with an
+        'end' event closing each sub-question's tokens, then an 'answer' event
+        per sub-question with summary, reasoning trace and the LLM call's error
+        (None if it succeeded), and finally 'done'.
+        """
+        answers = self.solver(session_id).solve(question, self.retriever, k=k, hops=hops)
+        built = [self.tuner.build(ans['sub_question'], ans['hits'] or ans['context']) for ans in answers]
+        yield {'type': 'plan', 'sub_questions': [
+            {'index': i, 'sub_question': ans['sub_question'], 'depends_on': ans['depends_on'],
+             'timing': ans['timing'], 'context': packed.text, 'citations': packed.citations,
+             'context_tokens': packed.tokens, 'dropped_chunks': packed.dropped}
+            for i, (ans, (_, packed)) in enumerate(zip(answers, built))]}
+        prompts = [prompt for prompt, _ in built]
+        hints = [{'question': ans['sub_question'], 'chunk_ids': list(packed.citations.values())}
+                 for ans, (_, packed) in zip(answers, built)]
+        responses, errors = [], []
+        for idx, deltas in answer_streams(self.llm, prompts, hints):
+            parts, error = [], None
+            try:
+                for delta in deltas:
+                    parts.append(delta)
+                    yield {'type': 'token', 'index': idx, 'text': delta}
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            responses.append(''.join(parts))
+            errors.append(error)
+            yield {'type': 'end', 'index': idx}
+        # All answers are summarized together, each ranked against its own sub-question
+        explained = self.explain_batch(responses, [ans['sub_question'] for ans in answers])
+        for idx, result in enumerate(explained):
+            yield dict(type='answer', index=idx, error=errors[idx], **result)
+        yield {'type': 'done'}
+
+    def explain(self, response, query=None):
+        """Summary of an LLM response (focused on query), its highlighted form and the graph reasoning trace."""
+        return self.explain_batch([response], [query])[0]
+
+    def explain_batch(self, responses, queries):
+        """explain() for several responses, with one batched summarization."""
+        summaries = self.summarizer.summarize_batch(responses, queries)
+        return [self._explain(response, summary) for response, summary in zip(responses, summaries)]
+
+    def _explain(self, response, summary):
+        matcher = self.retriever.matcher
+        result = {'response': response, 'summary': summary,
+                  'highlighted': matcher.highlight(summary) if matcher else summary,
+                  'entities': [], 'ner_entities': [], 'trace': None, 'closest': []}
+        if not self.reasoner:
+            return result
+        # Graph entities the answer mentions (one automaton pass over the summary)
+        entities = list(dict.fromkeys(node for m in matcher.find(summary) for node in sorted(m.nodes)))
+        result['entities'] = entities
+        if len(entities) >= 2:
+            result['trace'] = self.reasoner.explain_answer(entities)
+            if result['trace'] == "No path found.":
+                nodes = list(self.graph.nodes)
+                result['closest'] = [[ent, difflib.get_close_matches(ent, nodes, n=3, cutoff=0.6)]
+                                     for ent in entities]
+        elif not entities and self.nlp is not None:
+            result['ner_entities'] = sorted({ent.text for ent in self.nlp(summary).ents})
+        return result
+
+    def paths(self, source, target, k=3, max_hops=3, edge_types=None):
+        if not self.reasoner:
+            return []
+        found = self.reasoner.find_paths(source, target, k=k, max_hops=max_hops, edge_types=edge_types)
+        return [{'nodes': list(p.nodes), 'relations': list(p.relations)} for p in found]
+
+def create_app(service):
+    app = Flask(__name__)
+
+    def params():
+        body = request.get_json(silent=True)
+        if body is None:
+            return {}
+        if not isinstance(body, dict):
+            raise RequestError("request body must be a JSON object")
+        return body
+
+    def not_ready():
+        return jsonify(service.status()), 503
+
+    def question_args(body):
+        if not isinstance(body.get('question'), str) or not body['question'].strip():
+            raise RequestError("'question' is required")
+        return (body['question'].strip(), int_field(body, 'k', 3, MAX_K), int_field(body, 'hops', 2, MAX_HOPS),
+                str_field(body, 'session_id', required=False, max_length=MAX_SESSION_ID))
+
+    @app.errorhandler(RequestError)
+    def bad_request(e):
+        return jsonify({'error': str(e)}), 400
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'uptime': time.time() - service.started})
+
+    @app.get('/ready')
+    def ready():
+        return (jsonify(service.status()), 200) if service.ready else not_ready()
+
+    @app.post('/retrieve')
+    def retrieve():
+        if not service.ready:
+            return not_ready()
+        args = question_args(params())
+        return jsonify({'question': args[0], 'sub_questions': service.retrieve(*args)})
+
+    @app.post('/answer')
+    def answer():
+        if not service.ready:
+            return not_ready()
+        args = question_args(params())
+        lines = (json.dumps(event) + '\n' for event in service.answer_events(*args))
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    @app.post('/path')
+    def path():
+        if not service.ready:
+            return not_ready()
+        body = params()
+        source, target = str_field(body, 'source'), str_field(body, 'target')
+        edge_types = body.get('edge_types')
+        if edge_types is not None and (not isinstance(edge_types, list)
+                                       or not all(isinstance(t, str) for t in edge_types)):
+            raise RequestError("'edge_types' must be a list of strings")
+        paths = service.paths(source, target, k=int_field(body, 'k', 3, MAX_K),
+                              max_hops=int_field(body, 'max_hops', 3, MAX_PATH_HOPS), edge_types=edge_types)
+        return jsonify({'paths': paths})
+
+    return app
+
+def serve(host=None, port=None):
+    host = host or os.getenv('KAG_SERVICE_HOST', DEFAULT_HOST)
+    port = int(port or os.getenv('KAG_SERVICE_PORT', DEFAULT_PORT))
+    service = QueryService().start_loading()
+    create_app(service).run(host=host, port=port, threaded=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KAG query service")
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    args = parser.parse_args()
+    serve(args.host, args.port)
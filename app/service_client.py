@@ -0,0 +1,87 @@
+"""
+Client for the KAG query service, shared by the CLI and Streamlit front ends.
+connect() returns an HTTP client when a service is running and otherwise falls
+back to an in-process service, so the front ends work either way.
+Each client is one retrieval-memory session unless a session_id is passed.
+"""
+import os
+import json
+import uuid
+import requests
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+class ServiceError(RuntimeError):
+    pass
+
+class QueryClient:
+    def __init__(self, base_url=None, timeout=120):
+        self.base_url = (base_url or os.getenv('KAG_SERVICE_URL', DEFAULT_URL)).rstrip('/')
+        self.timeout = timeout
+        self.session_id = uuid.uuid4().hex
+
+    def _post(self, path, payload, stream=False):
+        resp = requests.post(self.base_url + path, json=payload, timeout=self.timeout, stream=stream)
+        if resp.status_code != 200:
+            raise ServiceError(f"{path} failed ({resp.status_code}): {resp.text[:200]}")
+        return resp
+
+    def health(self, timeout=None):
+        return requests.get(self.base_url + '/health', timeout=timeout or self.timeout).json()
+
+    def ready(self):
+        resp = requests.get(self.base_url + '/ready', timeout=self.timeout)
+        return resp.status_code == 200, resp.json()
+
+    def retrieve(self, question, k=3, hops=2, session_id=None):
+        return self._post('/retrieve', {'question': question, 'k': k, 'hops': hops,
+                                        'session_id': session_id or self.session_id}).json()['sub_questions']
+
+    def answer(self, question, k=3, hops=2, session_id=None):
+        """Yield the service's answer events (see app.service.QueryService.answer_events)."""
+        resp = self._post('/answer', {'question': question, 'k': k, 'hops': hops,
+                                      'session_id': session_id or self.session_id}, stream=True)
+        with resp:
+            for line in resp.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+
+    def path(self, source, target, k=3, max_hops=3, edge_types=None):
+        return self._post('/path', {'source': source, 'target': target, 'k': k, 'max_hops': max_hops,
+                                    'edge_types': edge_types}).json()['paths']
+
+class LocalClient:
+    """Same interface as QueryClient over an in-process QueryService."""
+    def __init__(self, service):
+        self.service = service
+        self.session_id = uuid.uuid4().hex
+
+    def health(self, timeout=None):
+        return {'status': 'ok'}
+
+    def ready(self):
+        return self.service.ready, self.service.status()
+
+    def retrieve(self, question, k=3, hops=2, session_id=None):
+        return self.service.retrieve(question, k=k, hops=hops, session_id=session_id or self.session_id)
+
+    def answer(self, question, k=3, hops=2, session_id=None):
+        # Round-trip through JSON so callers see exactly what the HTTP service sends
+        for event in self.service.answer_events(question, k=k, hops=hops,
+                                                session_id=session_id or self.session_id):
+            yield json.loads(json.dumps(event))
+
+    def path(self, source, target, k=3, max_hops=3, edge_types=None):
+        return self.service.paths(source, target, k=k, max_hops=max_hops, edge_types=edge_types)
+
+def connect(base_url=None, fallback=True):
+    """QueryClient if the service answers /health, else (with fallback) a LocalClient that loads artifacts once."""
+    client = QueryClient(base_url)
+    try:
+        client.health(timeout=0.5)
+        return client
+    except requests.RequestException:
+        if not fallback:
+            raise
+    from app.service import QueryService
+    return LocalClient(QueryService().load())
@@ -1,41 +1,27 @@
 """
 Streamlit interface for interactive question answering using the KAG system.
+Questions go to the query service (app/service.py); the index, graph, NER model
+and LLM client are loaded there once instead of on every Streamlit rerun.
 """
 import streamlit as st
-from builder.indexer import process_dir as index_process
-from solver.retriever import Retriever
-from solver.logical_form_solver import LogicalFormSolver
-from model.azure_openai_client import AzureOpenAIClient
-from model.instruction_tuner import InstructionTuner
-from model.summarizer import Summarizer
-from solver.graph_reasoner import GraphReasoner
-import pickle
+from builder.graph_store import load_or_build as load_graph_store
+from app.service_client import connect
 import os
-import networkx as nx
 import json
-import spacy
+import uuid
 
-nlp = spacy.load("en_core_web_sm")
+@st.cache_resource
+def get_client():
+    """Service client shared by all sessions (in-process service if none is running)."""
+    return connect()
 
-def load_graphs(graph_dir):
+@st.cache_resource
+def load_graphs(graph_dir, store_dir="data/graph_store"):
     """
-    Fast load: Only load the first .gpickle file for performance.
-    For large-scale, consider merging offline and loading a single file.
+    Load the merged corpus graph (memory-mapped GraphStore). It is built from
+    graph_dir's per-document records shards only if the store is missing.
     """
-    for fname in os.listdir(graph_dir):
-        if fname.endswith('.gpickle'):
-            with open(os.path.join(graph_dir, fname), 'rb') as f:
-                return pickle.load(f)
-    return None
-# Optionally, to load all and merge (slow):
-#    graphs = []
-#    for fname in os.listdir(graph_dir):
-#        if fname.endswith('.gpickle'):
-#            with open(os.path.join(graph_dir, fname), 'rb') as f:
-#                graphs.append(pickle.load(f))
-#    if graphs:
-#        return nx.compose_all(graphs)
-#    return None
+    return load_graph_store(store_dir, graph_dir)
 
 def retrain_from_feedback(feedback_file="data/feedback.json"):
     """Stub for active learning/retraining from user feedback."""
@@ -92,24 +78,17 @@ def store_feedback(question, answer, rating, feedback_file="data/feedback.json")
     with open(feedback_file, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
-def extract_entities_spacy(text):
-    """Extract entities from text using spaCy NER."""
-    doc = nlp(text)
-    return list(set(ent.text for ent in doc.ents))
-
 def main():
     st.title("KAG: Knowledge-Augmented Graph QA")
     st.write("Ask questions over your document knowledge graph!")
 
-    # Load indexer and graph
-    indexer = index_process("data/chunks")
-    graph = load_graphs("data/graphs")
-    retriever = Retriever(indexer=indexer, graph=graph)
-    solver = LogicalFormSolver()
-    llm = AzureOpenAIClient()
-    tuner = InstructionTuner()
-    summarizer = Summarizer()
-    reasoner = GraphReasoner(graph) if graph else None
+    client = get_client()
+    ready, status = client.ready()
+    if not ready:
+        st.error(f"Query service is not ready: {status.get('error') or 'still loading'}")
+        return
+    # Memory-mapped merged graph, only for the explorer and analytics views
+    graph = load_graphs("data/graphs") if status.get('nodes') else None
 
     # --- UI/UX: Interactive Graph Explorer and Analytics ---
     if graph:
@@ -126,32 +105,47 @@ def main():
 
     get_answer_clicked = st.button("Get Answer", key="get_answer_main")
     if get_answer_clicked and question and graph:
-        answers = solver.solve(question, retriever, k=k, hops=hops)
-        for idx, ans in enumerate(answers):
-            prompt = tuner.build_prompt(ans['sub_question'], ans['context'])
-            response = llm.generate(prompt)
-            summary = summarizer.summarize(response)
-            st.markdown(f"**Sub-question:** {ans['sub_question']}")
-            st.markdown(f"**Answer:** {summary}")
-            with st.expander("Show context"):
-                st.write(ans['context'])
-            # --- Reasoning trace ---
-            if reasoner:
-                # Use spaCy NER for entity extraction
-                summary_entities = extract_entities_spacy(summary)
-                graph_nodes = list(graph.nodes)
-                # Find which extracted entities are in the graph
-                present_entities = [e for e in summary_entities if e in graph_nodes]
+        # The client is shared by all browser sessions; retrieval memory is kept per browser session
+        session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+        events = client.answer(question, k=k, hops=hops, session_id=session_id)
+        plan = next(events)['sub_questions']
+        # All sub-questions are answered concurrently by the service; each streams in as its turn comes
+        slots = []
+        for idx, sq in enumerate(plan):
+            st.markdown(f"**Sub-question:** {sq['sub_question']}")
+            placeholder = st.empty()
+            def tokens():
+                for event in events:
+                    if event['type'] == 'token':
+                        yield event['text']
+                    elif event['type'] == 'end':
+                        return
+            with placeholder:
+                st.write_stream(tokens())
+            slots.append((placeholder, st.container()))
+        # Summaries and reasoning traces arrive together once every answer has streamed
+        results = {event['index']: event for event in events if event['type'] == 'answer'}
+        for idx, (sq, (placeholder, box)) in enumerate(zip(plan, slots)):
+            result = results.get(idx, {})
+            summary = result.get('summary', '')
+            with box:
+                placeholder.markdown(f"**Answer:** {result.get('highlighted', summary)}")
+                if result.get('error'):
+                    st.error(f"Answer generation failed: {result['error']}")
+                with st.expander("Show context"):
+                    timing = sq['timing']
+                    st.caption(f"{sq['context_tokens']} context tokens, {sq['dropped_chunks']} chunks dropped; "
+                               f"retrieval {timing['seconds'] * 1000:.1f} ms"
+                               f"{' (from session memory)' if timing['memory_hit'] else ''}")
+                    st.text(sq['context'])
+                # --- Reasoning trace ---
+                present_entities = result.get('entities', [])
                 if len(present_entities) >= 2:
-                    trace = reasoner.explain_answer(present_entities)
+                    trace = result['trace']
                     if trace == "No path found.":
                         # Show closest nodes (by string similarity)
-                        import difflib
-                        closest = []
-                        for ent in present_entities:
-                            matches = difflib.get_close_matches(ent, graph_nodes, n=3, cutoff=0.6)
-                            if matches:
-                                closest.append(f"{ent} → {matches}")
+                        closest = [f"{ent} → {matches}" for ent, matches in result['closest'] if matches]
+                        graph_nodes = list(graph.nodes)
                         st.warning(f"No path found. Closest nodes: {closest if closest else 'None'}")
                         st.info(f"Graph nodes: {graph_nodes[:10]} ... (total {len(graph_nodes)})")
                         st.info(f"Graph edges: {list(graph.edges)[:10]} ... (total {len(graph.edges)})")
@@ -162,13 +156,13 @@ def main():
                     st.info(f"Entity found: {present_entities[0]}")
                 else:
                     st.warning("Not enough entities in answer for reasoning trace. No entities found in graph.")
-                    st.info(f"Entities extracted from answer: {summary_entities}")
-            # --- Feedback ---
-            rating = st.radio(f"Rate this answer to '{ans['sub_question']}':", ["👍", "👎", "🤔"], key=f"rating_{idx}")
-            if st.button(f"Submit Feedback for '{ans['sub_question']}'", key=f"submit_{idx}"):
-                store_feedback(ans['sub_question'], summary, rating)
-                st.success("Feedback submitted!")
-                log_audit_event("user", "feedback", {"question": ans['sub_question'], "rating": rating})
+                    st.info(f"Entities extracted from answer: {result.get('ner_entities', [])}")
+                # --- Feedback ---
+                rating = st.radio(f"Rate this answer to '{sq['sub_question']}':", ["👍", "👎", "🤔"], key=f"rating_{idx}")
+                if st.button(f"Submit Feedback for '{sq['sub_question']}'", key=f"submit_{idx}"):
+                    store_feedback(sq['sub_question'], summary, rating)
+                    st.success("Feedback submitted!")
+                    log_audit_event("user", "feedback", {"question": sq['sub_question'], "rating": rating})
     elif get_answer_clicked and not graph:
         st.warning("No graph data found. Please upload graph data files.")
     # --- Evaluation/Feedback: Retraining ---
@@ -4,16 +4,35 @@ Visualize the knowledge graph using NetworkX and Matplotlib.
 import networkx as nx
 import matplotlib.pyplot as plt
 import os
+import pickle
+from builder.graph_records import GraphRecords, RECORDS_SUFFIX
+
+GRAPHS_DIR = os.path.join(os.path.dirname(__file__), '../data/graphs')
+
+def load_graph(graph_path):
+    """A document graph from its records shard, or from a legacy .gpickle."""
+    if graph_path.endswith(RECORDS_SUFFIX):
+        return GraphRecords.load(graph_path).to_networkx()
+    with open(graph_path, 'rb') as f:
+        return pickle.load(f)
+
+def graph_paths(graphs_dir):
+    """One file per document: the records shard where there is one, else the .gpickle."""
+    paths = {}
+    for fname in sorted(os.listdir(graphs_dir)):
+        if fname.endswith(RECORDS_SUFFIX):
+            paths[fname[:-len(RECORDS_SUFFIX)]] = fname
+        elif fname.endswith('.gpickle'):
+            paths.setdefault(fname[:-len('.gpickle')], fname)
+    return [os.path.join(graphs_dir, fname) for fname in paths.values()]
 
 def visualize_graph(graph_path):
-    G = nx.read_gpickle(graph_path)
+    G = load_graph(graph_path)
     plt.figure(figsize=(10,7))
     nx.draw(G, with_labels=True, node_color='lightblue', edge_color='gray')
     plt.show()
 
 if __name__ == "__main__":
-    graphs_dir = "../data/graphs"
-    for fname in os.listdir(graphs_dir):
-        if fname.endswith('.gpickle'):
-            print(f"Visualizing {fname}")
-            visualize_graph(os.path.join(graphs_dir, fname))
+    for path in graph_paths(GRAPHS_DIR):
+        print(f"Visualizing {os.path.basename(path)}")
+        visualize_graph(path)
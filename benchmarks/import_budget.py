@@ -0,0 +1,78 @@
+"""
+Import-time budget check for the entry points.
+Each module is imported in a fresh interpreter under `python -X importtime`;
+its cumulative import time is compared with a budget, and the slowest
+imports it pulls in are listed. Exits non-zero if any budget is exceeded.
+
+Usage:
+    python -m benchmarks.import_budget [--budget 1.0] [--top 5] [--json] [module ...]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Entry points and their budgets in seconds
+ENTRY_POINTS = {
+    'main': 0.2,
+    'ingestion.pipeline': 2.5,
+    'builder.graph_builder': 1.0,
+    'builder.metadata_extractor': 1.0,
+    'app.query_interface': 1.0,
+    'app.service': 4.0,
+}
+
+def import_profile(module):
+    """[(module name, self us, cumulative us)] from one `python -X importtime -c 'import module'` run."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def check(module, budget, top=5):
+    rows = import_profile(module)
+    total = next((cum for name, _, cum in rows if name == module), sum(s for _, s, _ in rows)) / 1e6
+    # Heaviest top-level imports (least indented names are direct dependencies)
+    slowest = sorted(((name, cum / 1e6) for name, _, cum in rows if name != module),
+                     key=lambda r: -r[1])[:top]
+    return {'module': module, 'seconds': total, 'budget': budget, 'ok': total <= budget,
+            'slowest': slowest}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('modules', nargs='*', help='modules to check (default: all entry points)')
+    parser.add_argument('--budget', type=float, help='override every budget (seconds)')
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    modules = args.modules or list(ENTRY_POINTS)
+    results = []
+    for module in modules:
+        budget = args.budget if args.budget is not None else ENTRY_POINTS.get(module, 1.0)
+        try:
+            results.append(check(module, budget, args.top))
+        except RuntimeError as e:
+            results.append({'module': module, 'seconds': None, 'budget': budget, 'ok': False,
+                            'slowest': [], 'error': str(e)})
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            if r['seconds'] is None:
+                print(f"FAIL {r['module']:<28} {r['error']}")
+                continue
+            status = 'ok  ' if r['ok'] else 'FAIL'
+            print(f"{status} {r['module']:<28} {r['seconds']:6.2f}s (budget {r['budget']:.2f}s)")
+            for name, seconds in r['slowest']:
+                print(f"       {name.strip():<40} {seconds:6.2f}s")
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
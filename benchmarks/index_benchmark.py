@@ -0,0 +1,110 @@
+"""
+Recall / latency / memory benchmark for the SimpleIndexer backends.
+Ground truth is exact TF-IDF cosine (index_type='sparse'); every other backend
+is scored by recall@k against it, on data/chunks and on synthetic scaled-up copies.
+
+Usage:
+    python -m benchmarks.index_benchmark --scales 1 10 --k 5 --queries 200
+"""
+import argparse
+import json
+import random
+import time
+import numpy as np
+
+from builder.indexer import SimpleIndexer, read_chunks
+
+# (label, index_type, build params, list of search-param settings to sweep)
+CONFIGS = [
+    ('flat', 'flat', {}, [{}]),
+    ('lsa', 'lsa', {}, [{}]),
+    ('ivf', 'ivf', {}, [{'nprobe': p} for p in (1, 4, 16, 64)]),
+    ('hnsw', 'hnsw', {}, [{'ef_search': ef} for ef in (16, 64, 256)]),
+    ('ivfpq', 'ivfpq', {'pq_m': 16}, [{'nprobe': p} for p in (4, 16, 64)]),
+]
+
+def scale_corpus(texts, scale, rng):
+    """Original chunks plus (scale - 1) perturbed copies (word dropout + local shuffles)."""
+    out = list(texts)
+    for _ in range(scale - 1):
+        for text in texts:
+            words = [w for w in text.split() if rng.random() > 0.15]
+            for i in range(0, len(words) - 1, 7):
+                j = min(len(words) - 1, i + rng.randrange(3))
+                words[i], words[j] = words[j], words[i]
+            out.append(' '.join(words) or text)
+    return out
+
+def make_queries(texts, n, rng):
+    """Short word windows sampled from random chunks."""
+    queries = []
+    for _ in range(n):
+        words = rng.choice(texts).split()
+        width = rng.randint(3, 8)
+        start = rng.randrange(max(1, len(words) - width))
+        queries.append(' '.join(words[start:start + width]))
+    return queries
+
+def timed_search(indexer, queries, k):
+    """Per-query latency through the public search_hits_batch; results are chunk IDs."""
+    results, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = indexer.search_hits_batch([q], k)[0]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([hit.chunk_id for hit in hits])
+    return results, np.array(latencies)
+
+def recall_at_k(results, truth, k):
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / max(1, min(k, len(t))) for r, t in zip(results, truth)]))
+
+def run(scales, k, n_queries, seed):
+    rng = random.Random(seed)
+    _, base = read_chunks('data/chunks')
+    rows = []
+    for scale in scales:
+        texts = scale_corpus(base, scale, rng)
+        queries = make_queries(texts, n_queries, rng)
+        ids = [str(i) for i in range(len(texts))]
+        exact = SimpleIndexer(index_type='sparse')
+        exact.fit(texts, ids)
+        truth, lat = timed_search(exact, queries, k)
+        rows.append({'scale': scale, 'n_chunks': len(texts), 'index': 'sparse (exact)', 'search': {},
+                     'recall': 1.0, 'p50_ms': float(np.percentile(lat, 50)),
+                     'p99_ms': float(np.percentile(lat, 99)), 'mem_mb': exact.nbytes() / 2**20, 'build_s': None})
+        for label, index_type, build_params, sweeps in CONFIGS:
+            indexer = SimpleIndexer(index_type=index_type, **build_params)
+            t0 = time.perf_counter()
+            indexer.fit(texts, ids)
+            build_s = time.perf_counter() - t0
+            for search_params in sweeps:
+                indexer.set_search_params(**search_params)
+                results, lat = timed_search(indexer, queries, k)
+                rows.append({'scale': scale, 'n_chunks': len(texts), 'index': label, 'search': search_params,
+                             'recall': recall_at_k(results, truth, k),
+                             'p50_ms': float(np.percentile(lat, 50)), 'p99_ms': float(np.percentile(lat, 99)),
+                             'mem_mb': indexer.nbytes() / 2**20, 'build_s': build_s})
+    return rows
+
+def print_table(rows, k):
+    print(f"{'scale':>5} {'chunks':>8} {'index':<16} {'search':<18} {'recall@' + str(k):>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'mem MB':>8} {'build s':>8}")
+    for r in rows:
+        search = ','.join(f"{key}={val}" for key, val in r['search'].items())
+        build = f"{r['build_s']:.2f}" if r['build_s'] is not None else '-'
+        print(f"{r['scale']:>5} {r['n_chunks']:>8} {r['index']:<16} {search:<18} {r['recall']:>9.3f} "
+              f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['mem_mb']:>8.2f} {build:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the result rows to this file")
+    args = parser.parse_args()
+    rows = run(args.scales, args.k, args.queries, args.seed)
+    print_table(rows, args.k)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
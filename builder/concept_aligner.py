@@ -3,6 +3,8 @@ Aligns concepts (synonyms, types) for knowledge graph consistency.
 """
 import json
 import os
+import hashlib
+from builder.entity_resolution import alias_table
 
 # Example synonym map
 SYNONYM_MAP = {
@@ -10,22 +12,43 @@ SYNONYM_MAP = {
     "ML": "Machine Learning",
 }
 
+# Stage version recorded in the ingestion manifest; changes with the synonym map.
+ALIGN_VERSION = "2+" + hashlib.sha1(json.dumps(SYNONYM_MAP, sort_keys=True).encode()).hexdigest()[:8]
+
+def align_version():
+    """ALIGN_VERSION plus the alias table version, so a new table re-aligns every document."""
+    return f"{ALIGN_VERSION}+{alias_table().version}"
+
 def align_concepts(meta):
+    aliases = alias_table()
     aligned = []
     for ent, label in meta.get("entities", []):
-        ent_aligned = SYNONYM_MAP.get(ent, ent)
+        ent_aligned = aliases.canonical(SYNONYM_MAP.get(ent, ent))
         aligned.append((ent_aligned, label))
-    return {"entities": aligned}
+    # Keep the other metadata (e.g. chunk-level mentions) alongside the aligned entities
+    return {**meta, "entities": aligned}
 
-def process_dir(input_dir, output_dir):
+def process_dir(input_dir, output_dir, manifest=None):
     os.makedirs(output_dir, exist_ok=True)
     for fname in os.listdir(input_dir):
         if fname.endswith('.json'):
-            with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
+            in_path = os.path.join(input_dir, fname)
+            out_path = os.path.join(output_dir, fname)
+            doc_id = fname[:-len('.json')]
+            if manifest and manifest.is_current('align', doc_id, [in_path], align_version()):
+                continue
+            with open(in_path, encoding='utf-8') as f:
                 meta = json.load(f)
             aligned = align_concepts(meta)
-            with open(os.path.join(output_dir, fname), 'w', encoding='utf-8') as f:
+            with open(out_path, 'w', encoding='utf-8') as f:
                 json.dump(aligned, f, indent=2)
+            if manifest:
+                # Alignment usually rewrites its input in place, so the written file is what
+                # the next run must compare against.
+                recorded_inputs = [out_path] if os.path.abspath(out_path) == os.path.abspath(in_path) else [in_path]
+                manifest.record('align', doc_id, recorded_inputs, [out_path], align_version())
+    if manifest:
+        manifest.save()
 
 if __name__ == "__main__":
     process_dir("../data/output_json", "../data/output_json")
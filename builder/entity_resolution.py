@@ -0,0 +1,253 @@
+"""
+Corpus-level entity resolution.
+Every entity surface form in the metadata is normalized (case, accents,
+punctuation, honorifics, list numbering); forms with the same normalized key
+merge directly. Distinct keys are then blocked with MinHash LSH over character
+trigrams, so only keys sharing a band bucket are compared, scored by trigram
+Jaccard within each block, and clustered with union-find. The result is an
+alias table (normalized key -> canonical name, score) written to
+data/aliases.json, which canonicalize_entity, cross_doc_coref and
+align_concepts consult with one dict lookup.
+"""
+import os
+import re
+import json
+import zlib
+import hashlib
+import unicodedata
+from collections import Counter, defaultdict
+import numpy as np
+
+ALIASES_PATH = 'data/aliases.json'
+# Bump when normalization, blocking or scoring changes
+RESOLUTION_VERSION = "1"
+
+_HONORIFICS = {'the', 'mr', 'mrs', 'ms', 'dr', 'm/s', 'shri', 'sri', 'smt', 'thiru', 'tmt', 'selvi'}
+_NUMBERING = re.compile(r'^\s*\d+\s*[.)]\s*(?=\D)')
+_PUNCT = re.compile(r"[^\w/&]+")
+_HASH_BOUND = 1 << 61
+
+def normalize_name(name):
+    """Matching key of a surface form: 'STATE OF X.', '1.State of  X' -> 'state of x'."""
+    name = unicodedata.normalize('NFKD', _NUMBERING.sub('', name))
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).casefold()
+    tokens = _PUNCT.sub(' ', name).split()
+    while len(tokens) > 1 and tokens[0] in _HONORIFICS:
+        tokens = tokens[1:]
+    return ' '.join(tokens)
+
+def shingles(key, n=3):
+    padded = f" {key} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+_ROMAN = re.compile(r'^[ivxlc]+$')
+
+def _numbers(key):
+    return frozenset(t for t in key.split() if any(ch.isdigit() for ch in t))
+
+def _marks(key):
+    """Initials and roman numerals: 'n balakrishnan' -> {'n'}, 'ii additional judge' -> {'ii'}."""
+    return frozenset(t for t in key.split() if len(t) <= 2 or _ROMAN.match(t))
+
+class AliasTable:
+    """Normalized key -> (canonical name, score); names without an entry resolve to themselves."""
+    def __init__(self, aliases=None, source=None):
+        self.aliases = aliases or {}
+        self.source = source
+        self.version = hashlib.sha1(json.dumps(self.aliases, sort_keys=True).encode()).hexdigest()[:8]
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def resolve(self, name):
+        """(canonical name, confidence) for a surface form."""
+        entry = self.aliases.get(normalize_name(name))
+        return (entry[0], entry[1]) if entry else (name, 1.0)
+
+    def canonical(self, name):
+        return self.resolve(name)[0]
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.getenv('KAG_ALIASES', ALIASES_PATH)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format_version') != RESOLUTION_VERSION:
+            return cls()
+        return cls({k: tuple(v) for k, v in data['aliases'].items()}, data.get('source'))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'format_version': RESOLUTION_VERSION, 'version': self.version, 'source': self.source,
+                       'aliases': self.aliases}, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, path)
+
+_table = None
+
+def alias_table():
+    """The process-wide alias table, loaded on first use."""
+    global _table
+    if _table is None:
+        _table = AliasTable.load()
+    return _table
+
+def set_alias_table(table):
+    global _table
+    _table = table
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+        return min(ri, rj)
+
+class EntityResolver:
+    def __init__(self, threshold=0.75, num_perm=32, bands=8, max_bucket=50, min_length=4, seed=13):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_bucket = max_bucket
+        self.min_length = min_length
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _HASH_BOUND, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _HASH_BOUND, num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 63, num_perm // bands, dtype=np.uint64) | np.uint64(1)
+
+    def signatures(self, shingle_sets):
+        """MinHash signatures (len(sets) x num_perm) for all sets in one vectorized pass."""
+        lengths = np.array([len(s) for s in shingle_sets])
+        values = np.fromiter((zlib.crc32(sh.encode()) for s in shingle_sets for sh in s),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        sigs = np.empty((len(shingle_sets), self.num_perm), dtype=np.uint64)
+        for p in range(self.num_perm):
+            # a*x+b overflows uint64 by design: a fixed random mixing of the 32-bit shingle hash
+            hashed = (self._a[p] * values + self._b[p]) >> np.uint64(20)
+            sigs[:, p] = np.minimum.reduceat(hashed, offsets)
+        return sigs
+
+    def candidate_pairs(self, sigs):
+        """Index pairs that share at least one LSH band bucket (buckets over max_bucket are skipped)."""
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            keys = (sigs[:, band * rows:(band + 1) * rows] * self._band_mix).sum(axis=1)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+            for group in np.split(order, bounds):
+                if 1 < len(group) <= self.max_bucket:
+                    members = sorted(group.tolist())
+                    pairs.update((i, j) for n, i in enumerate(members) for j in members[n + 1:])
+        return pairs
+
+    def resolve(self, counts, labels=None):
+        """
+        AliasTable for counts ({surface form: occurrences}); labels ({surface:
+        NER label}) keep fuzzy merges within one label.
+        """
+        labels = labels or {}
+        forms_by_key = defaultdict(Counter)
+        for form, n in counts.items():
+            key = normalize_name(form)
+            if key:
+                forms_by_key[key][form] += n
+        keys = sorted(forms_by_key)
+        key_label = {}
+        for key in keys:
+            votes = Counter()
+            for form, n in forms_by_key[key].items():
+                votes[labels.get(form)] += n
+            key_label[key] = votes.most_common(1)[0][0]
+        fuzzy = [i for i, key in enumerate(keys) if len(key) >= self.min_length]
+        sets = [shingles(keys[i]) for i in fuzzy]
+        uf = _UnionFind(len(keys))
+        # Cluster root -> its initials; clusters with different non-empty initials never merge,
+        # so 'n balakrishnan' and 'm balakrishnan' cannot chain through 'balakrishnan'
+        marks = {}
+        score = {}
+        if len(fuzzy) > 1:
+            for a, b in sorted(self.candidate_pairs(self.signatures(sets))):
+                i, j = fuzzy[a], fuzzy[b]
+                # Never merge across labels, or names that differ in a number ("Section 96"/"Section 97")
+                if key_label[keys[i]] != key_label[keys[j]] or _numbers(keys[i]) != _numbers(keys[j]):
+                    continue
+                sim = len(sets[a] & sets[b]) / len(sets[a] | sets[b])
+                if sim < self.threshold:
+                    continue
+                mark_i = marks.get(uf.find(i), _marks(keys[i]))
+                mark_j = marks.get(uf.find(j), _marks(keys[j]))
+                if mark_i and mark_j and mark_i != mark_j:
+                    continue
+                marks[uf.union(i, j)] = mark_i or mark_j
+                for k in (i, j):
+                    score[k] = max(score.get(k, 0.0), sim)
+        clusters = defaultdict(list)
+        for i in range(len(keys)):
+            clusters[uf.find(i)].append(i)
+        aliases = {}
+        for members in clusters.values():
+            forms = Counter()
+            for i in members:
+                for form, n in forms_by_key[keys[i]].items():
+                    forms[_NUMBERING.sub('', form).strip()] += n
+            # Most frequent spelling wins; prefer mixed case over ALL CAPS, then the longer form
+            canonical = max(forms, key=lambda f: (forms[f], not f.isupper(), len(f), f))
+            canonical_key = normalize_name(canonical)
+            for i in members:
+                aliases[keys[i]] = (canonical, 1.0 if keys[i] == canonical_key else round(score.get(i, 1.0), 3))
+        return AliasTable(aliases)
+
+def _metadata_names(input_dir):
+    """(counts, labels) of entity surface forms over all metadata files."""
+    counts, labels = Counter(), {}
+    for fname in sorted(os.listdir(input_dir)):
+        if not fname.endswith('.json'):
+            continue
+        with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
+            meta = json.load(f)
+        # Raw mention text survives in-place alignment; older metadata only has entities
+        pairs = [(m["text"], m["label"]) for m in meta["mentions"]] if meta.get("mentions") else meta.get("entities", [])
+        for name, label in pairs:
+            counts[name] += 1
+            labels.setdefault(name, label)
+    return counts, labels
+
+def process_dir(input_dir, alias_path=ALIASES_PATH, resolver=None):
+    """Resolve the entities of every metadata file in input_dir and write the alias table."""
+    counts, labels = _metadata_names(input_dir)
+    source = hashlib.sha1(json.dumps(sorted(counts.items())).encode()).hexdigest()
+    current = AliasTable.load(alias_path)
+    if current.source == source:
+        print("[EntityResolution] Alias table is up to date.")
+        set_alias_table(current)
+        return current
+    table = (resolver or EntityResolver()).resolve(counts, labels)
+    table.source = source
+    table.save(alias_path)
+    set_alias_table(table)
+    merged = len(table) - len({canonical for canonical, _ in table.aliases.values()})
+    print(f"[EntityResolution] {sum(counts.values())} mentions, {len(counts)} names, "
+          f"{len(table)} keys; {merged} merged into another name.")
+    return table
+
+if __name__ == "__main__":
+    process_dir("data/output_json", "data/aliases.json")
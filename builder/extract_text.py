@@ -1,11 +1,13 @@
 """
 Extract & clean PDF text to plain text files using OCR (pytesseract + pdf2image).
+batch_extract(..., parallel=True) spreads pages over a process pool and resumes
+from per-page results; see batch_extract_parallel for the knobs.
 """
 import os
 import pdfplumber
 import pytesseract
 from pdf2image import convert_from_path
-from PIL import Image
+from PIL import Image, ImageStat
 
 def extract_text_from_pdf(pdf_path, output_path):
     text = ""
@@ -27,7 +29,9 @@ def extract_text_from_pdf(pdf_path, output_path):
         f.write(text)
     print(f"[Extract] Written to: {output_path}\n---")
 
-def batch_extract(input_dir, output_dir):
+def batch_extract(input_dir, output_dir, parallel=False, **kwargs):
+    if parallel:
+        return batch_extract_parallel(input_dir, output_dir, **kwargs)
     os.makedirs(output_dir, exist_ok=True)
     for fname in os.listdir(input_dir):
         if fname.lower().endswith('.pdf'):
@@ -36,6 +40,130 @@ def batch_extract(input_dir, output_dir):
                 os.path.join(output_dir, fname.replace('.pdf', '.txt'))
             )
 
+# --- Parallel, page-level extraction ---
+# Pages are the unit of work: each page's text is written to
+# <page_dir>/<doc>/page_NNNN.txt as soon as it is known, so a crashed or
+# interrupted run resumes from the pages it has not finished yet.
+
+def _page_path(page_dir, page_no):
+    return os.path.join(page_dir, f"page_{page_no:04d}.txt")
+
+def _write_page(page_dir, page_no, text):
+    path = _page_path(page_dir, page_no)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+def _is_blank_image(img, threshold):
+    """Grayscale thumbnail pre-check: a near-uniform page has almost no pixel variance."""
+    thumb = img.convert('L')
+    thumb.thumbnail((128, 128))
+    return ImageStat.Stat(thumb).stddev[0] < threshold
+
+def _scan_pdf(args):
+    """Write text-layer pages; return the pages that still need OCR."""
+    pdf_path, page_dir, skip_blank = args
+    os.makedirs(page_dir, exist_ok=True)
+    ocr_pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+        for i, page in enumerate(pdf.pages):
+            page_no = i + 1
+            if os.path.exists(_page_path(page_dir, page_no)):
+                continue
+            page_text = page.extract_text() or ''
+            if page_text.strip():
+                _write_page(page_dir, page_no, page_text)
+            elif skip_blank and not (page.images or page.rects or page.curves or page.lines):
+                # Nothing drawn on the page at all: skip rasterizing it.
+                _write_page(page_dir, page_no, '')
+            else:
+                ocr_pages.append(page_no)
+    return pdf_path, n_pages, ocr_pages
+
+def _ocr_pages(args):
+    """Rasterize a contiguous page range in one pdf2image call, then OCR each page."""
+    pdf_path, page_dir, first, last, dpi, skip_blank, blank_threshold = args
+    images = convert_from_path(pdf_path, first_page=first, last_page=last, dpi=dpi, grayscale=True)
+    for page_no, img in zip(range(first, last + 1), images):
+        if skip_blank and _is_blank_image(img, blank_threshold):
+            _write_page(page_dir, page_no, '')
+            continue
+        _write_page(page_dir, page_no, pytesseract.image_to_string(img))
+    return pdf_path, last - first + 1
+
+def _page_runs(pages, max_len):
+    """Split sorted page numbers into contiguous runs of at most max_len pages."""
+    runs = []
+    for p in pages:
+        if runs and p == runs[-1][1] + 1 and runs[-1][1] - runs[-1][0] + 1 < max_len:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+    return runs
+
+def batch_extract_parallel(input_dir, output_dir, workers=None, dpi=300, page_dir=None,
+                           skip_blank=True, blank_threshold=2.0, pages_per_task=4):
+    """
+    Extract every PDF in input_dir with a process pool: text layers are read
+    per document, OCR-needed pages are grouped into contiguous runs that are
+    rasterized in one pass each and OCRed in parallel across all documents.
+    A failing scan or OCR task only drops its own document; every document
+    whose pages all came through is written. Returns the failed PDF paths.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    os.makedirs(output_dir, exist_ok=True)
+    page_root = page_dir or os.path.join(output_dir, '.pages')
+    pdfs = {os.path.join(input_dir, fname): fname[:-len('.pdf')]
+            for fname in sorted(os.listdir(input_dir)) if fname.lower().endswith('.pdf')}
+    doc_page_dir = {pdf: os.path.join(page_root, doc) for pdf, doc in pdfs.items()}
+    n_pages, failed, tasks = {}, set(), []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_scan_pdf, (pdf, doc_page_dir[pdf], skip_blank)): pdf for pdf in pdfs}
+        for future in as_completed(futures):
+            pdf = futures[future]
+            try:
+                _, n_pages[pdf], pages = future.result()
+            except Exception as e:
+                print(f"[Extract] Scan of {os.path.basename(pdf)} failed: {e}")
+                failed.add(pdf)
+                continue
+            tasks.extend((pdf, doc_page_dir[pdf], first, last, dpi, skip_blank, blank_threshold)
+                         for first, last in _page_runs(pages, pages_per_task))
+        print(f"[Extract] {len(pdfs)} PDFs, {sum(n_pages.values())} pages, "
+              f"{sum(t[3] - t[2] + 1 for t in tasks)} pages to OCR in {len(tasks)} tasks")
+        futures = {pool.submit(_ocr_pages, task): task for task in tasks}
+        for future in as_completed(futures):
+            pdf, _, first, last = futures[future][:4]
+            try:
+                _, done = future.result()
+            except Exception as e:
+                print(f"[Extract] OCR of {os.path.basename(pdf)} pages {first}-{last} failed: {e}")
+                failed.add(pdf)
+                continue
+            print(f"[Extract] OCR: {done} pages of {os.path.basename(pdf)}")
+    for pdf_path, doc in pdfs.items():
+        if pdf_path in failed:
+            continue
+        paths = [_page_path(doc_page_dir[pdf_path], page_no)
+                 for page_no in range(1, n_pages[pdf_path] + 1)]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            print(f"[Extract] Skipping {doc}: {len(missing)} pages missing")
+            failed.add(pdf_path)
+            continue
+        texts = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                texts.append(f.read())
+        output_path = os.path.join(output_dir, doc + '.txt')
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(t + "\n" for t in texts if t))
+        print(f"[Extract] Written to: {output_path}")
+    if failed:
+        print(f"[Extract] {len(failed)} of {len(pdfs)} PDFs failed: "
+              + ", ".join(sorted(os.path.basename(p) for p in failed)))
+    return sorted(failed)
+
 if __name__ == "__main__":
-    batch_extract("data/raw_pdfs", "data/extracted_texts")
-    pass
+    batch_extract("data/raw_pdfs", "data/extracted_texts", parallel=True)
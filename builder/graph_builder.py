@@ -4,182 +4,404 @@ Convert extracted metadata to knowledge graph format (nodes/edges) and push to N
 import json
 import os
 import networkx as nx
-import pickle
 from builder.neo4j_connector import Neo4jConnector
-import re
 import multiprocessing
-import requests
 import hashlib
+from collections import Counter
+from builder.link_cache import LinkCache, backend_from_spec, canonical_key
+from builder.relation_extractor import RebelExtractor, Triple
+from builder.relation_rules import DOCUMENT, RuleEngine, find_mentions
+from builder.entity_resolution import alias_table, set_alias_table
+from builder.graph_records import GraphRecords, RECORDS_SUFFIX
+from builder.graph_store import GraphStore, shard_paths
+from builder.semantic_chunker import CHUNK_SEPARATOR, chunk_id, read_chunks
 
-# --- Advanced Relation Extraction ---
-def extract_relations(text, entities):
+# Stage version recorded in the ingestion manifest; bump when graph construction changes.
+GRAPH_VERSION = "4"
+
+# In-process front cache: canonical surface form -> linked name
+_entity_cache = {}
+# Persistent cache shared by all processes, and the KB backend used for misses
+_link_cache = None
+_link_backend = None
+
+def configure_linking(cache_path=None, backend=None):
     """
-    Extract relations using patterns and (optionally) transformer models.
-    Returns list of (src, relation, tgt).
+    Select the persistent link cache and KB backend. backend is a backend
+    object or a spec string ('wikidata', 'wikidata-search', 'dict:<path>', 'none');
+    defaults come from KAG_LINK_CACHE and KAG_LINK_BACKEND.
     """
-    relations = []
-    # Simple pattern: 'X sued Y', 'X acquired Y', 'X vs Y'
-    patterns = [
-        (r"(\b[A-Z][a-z]+\b) (sued|acquired|merged with|vs) (\b[A-Z][a-z]+\b)", 1, 2, 3),
-    ]
-    for pat, s_idx, rel_idx, t_idx in patterns:
-        for m in re.finditer(pat, text):
-            src = m.group(s_idx)
-            rel = m.group(rel_idx).upper().replace(' ', '_')
-            tgt = m.group(t_idx)
-            relations.append((src, rel, tgt))
-    # TODO: Integrate transformer-based RE (e.g., spaCy, transformers)
-    # Example: Use a pre-trained RE model to extract (src, rel, tgt)
-    # ...
-    return relations
+    global _link_cache, _link_backend
+    _link_cache = LinkCache(cache_path or os.getenv('KAG_LINK_CACHE', 'data/link_cache.sqlite'))
+    if backend is None or isinstance(backend, str):
+        backend = backend_from_spec(backend or os.getenv('KAG_LINK_BACKEND'))
+    _link_backend = backend
 
-WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+# Windowed REBEL extractor; only the parent runs the model, pool workers read its cache
+_rebel = None
 
-_entity_cache = {}
+def configure_relation_extraction(batch_size=None, num_threads=None, cache_path=None, enabled=None):
+    """
+    Configure transformer relation extraction. Defaults come from
+    KAG_REBEL (set to 0 to disable), KAG_REBEL_BATCH_SIZE, KAG_REBEL_THREADS
+    and KAG_REBEL_CACHE. Returns the extractor, or None when disabled.
+    """
+    global _rebel
+    if enabled is None:
+        enabled = os.getenv('KAG_REBEL', '1') != '0'
+    if not enabled:
+        _rebel = None
+        return None
+    _rebel = RebelExtractor(
+        batch_size=batch_size or int(os.getenv('KAG_REBEL_BATCH_SIZE', 8)),
+        num_threads=num_threads or int(os.getenv('KAG_REBEL_THREADS', 0)) or None,
+        cache_path=cache_path,
+    )
+    return _rebel
+
+# Relation rules, compiled once per process
+_rule_engine = None
+
+def rule_engine():
+    global _rule_engine
+    if _rule_engine is None:
+        _rule_engine = RuleEngine.from_config()
+    return _rule_engine
+
+def graph_version():
+    """Manifest version of the graph stage: code version plus the relation rules and alias table."""
+    return f"{GRAPH_VERSION}+{rule_engine().version}+{alias_table().version}"
 
 def cross_doc_coref(entity, doc_id=None):
-    """Stub for cross-document coreference resolution. Returns canonical entity for the corpus."""
-    # TODO: Use a coreference model or KB to resolve entity across docs
-    return entity
+    """Canonical name of entity for the corpus, from the entity-resolution alias table."""
+    return alias_table().canonical(entity)
 
 def canonicalize_entity(entity, candidates=None):
-    """Stub for full canonicalization pipeline. Returns (canonical_entity, confidence_score)."""
-    # TODO: Use clustering, string similarity, and KB linking for canonicalization
-    return entity, 1.0
+    """Returns (canonical_entity, confidence_score) from the alias table (builder.entity_resolution)."""
+    return alias_table().resolve(entity)
+
+def _hash_name(canon):
+    return f"{canon}__{hashlib.md5(canon.encode()).hexdigest()[:8]}"
+
+def link_entities(entities, doc_id=None):
+    """
+    Batched link_entity: returns {entity: linked name} for every entity.
+    Each unique canonical form is looked up in the in-process cache, then the
+    persistent cache, and all remaining misses go to the KB backend in one call.
+    """
+    canon_of = {ent: canonicalize_entity(cross_doc_coref(ent, doc_id))[0] for ent in set(entities)}
+    pending = {}
+    for canon in set(canon_of.values()):
+        if canon not in _entity_cache:
+            pending.setdefault(canonical_key(canon), []).append(canon)
+    if pending:
+        if _link_cache is None:
+            configure_linking()
+        resolved = _link_cache.get_many(pending)
+        misses = [key for key in pending if key not in resolved]
+        if misses:
+            try:
+                found = _link_backend.lookup_many([pending[key][0] for key in misses])
+                found = {canonical_key(name): kb_id for name, kb_id in found.items()}
+                fresh = {key: found.get(key) for key in misses}
+                _link_cache.put_many(fresh)
+                resolved.update(fresh)
+            except Exception as e:
+                # KB unreachable: fall back for this run without caching a negative result
+                print(f"[GraphBuilder] Entity linking backend failed: {e}")
+        for key, canons in pending.items():
+            for canon in canons:
+                # Fallback: hash-based canonicalization
+                _entity_cache[canon] = resolved.get(key) or _hash_name(canon)
+    return {ent: _entity_cache[canon] for ent, canon in canon_of.items()}
 
 def link_entity(entity, doc_id=None):
     """
     Link entity to external KB (Wikidata), cross-doc coref, and canonicalize with confidence.
     Returns canonical entity name or Wikidata QID if found, else a hash-based canonical name.
     """
-    entity = cross_doc_coref(entity, doc_id)
-    canon, conf = canonicalize_entity(entity)
-    if canon in _entity_cache:
-        return _entity_cache[canon]
-    # Try Wikidata search
-    params = {
-        'action': 'wbsearchentities',
-        'search': canon,
-        'language': 'en',
-        'format': 'json',
-        'limit': 1
-    }
-    try:
-        resp = requests.get(WIKIDATA_API, params=params, timeout=2)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data.get('search'):
-                qid = data['search'][0]['id']
-                _entity_cache[canon] = qid
-                return qid
-    except Exception:
-        pass
-    # Fallback: hash-based canonicalization
-    canon_hash = f"{canon}__{hashlib.md5(canon.encode()).hexdigest()[:8]}"
-    _entity_cache[canon] = canon_hash
-    return canon_hash
-
-def build_graph(meta, text=None):
+    return link_entities([entity], doc_id)[entity]
+
+def chunk_mentions(meta, chunks):
+    """
+    {chunk_id: mentions} for chunks from the NER offsets in meta. Chunks with no
+    recorded mentions (metadata written before offsets were kept, or raw text
+    instead of chunks) fall back to locating the entity names in the text.
+    """
+    by_chunk = {}
+    for m in meta.get("mentions", []):
+        by_chunk.setdefault(m["chunk_id"], []).append(m)
+    entities = meta.get("entities", [])
+    return {cid: by_chunk.get(cid) or find_mentions(text, entities) for cid, text in chunks}
+
+def build_graph(meta, chunks=None, triples=None, doc_id=None, cooccur_window='sentence'):
+    """
+    Graph for one document. chunks are its (chunk_id, text) pairs; rule-based
+    relations and weighted CO_OCCUR edges (per sentence, or per chunk with
+    cooccur_window='chunk') come from them. triples are precomputed
+    relation_extractor.Triple records. Relation edges carry their chunk ID;
+    relations on the document itself attach to a DOCUMENT node named doc_id.
+    """
     G = nx.MultiDiGraph()  # Directed, multi-edge graph for richer relations
     entities = meta.get("entities", [])
+    chunks = chunks or []
+    mentions = chunk_mentions(meta, chunks)
+    relations = extract_relations(chunks, mentions) + list(triples or [])
+    if doc_id is None:
+        relations = [t for t in relations if DOCUMENT not in (t.head, t.tail)]
+    cooccur = Counter()
+    for cid, text in chunks:
+        cooccur.update(rule_engine().cooccurrence(text, mentions[cid], window=cooccur_window))
+    # Link every distinct name (entities, relation endpoints, co-occurring mentions) in one batch
+    names = [ent for ent, _ in entities] + [x for t in relations for x in (t.head, t.tail) if x != DOCUMENT]
+    linked = link_entities(names + [x for pair in cooccur for x in pair])
+    linked[DOCUMENT] = doc_id
     for ent, label in entities:
-        ent_canon = link_entity(ent)
+        ent_canon = linked[ent]
         G.add_node(ent_canon, label=label)
-    # Add simple co-occurrence edges
-    ents = [link_entity(ent) for ent, _ in entities]
-    for i in range(len(ents)-1):
-        G.add_edge(ents[i], ents[i+1], type='CO_OCCUR')
-    # Add extracted relations if text is provided
-    if text:
-        for src, rel, tgt in extract_relations(text, entities):
-            G.add_edge(link_entity(src), link_entity(tgt), type=rel)
+        # Keep the mention text so canonical IDs (QIDs, hashed names) can be found in chunks
+        surfaces = G.nodes[ent_canon].setdefault('surface', [])
+        if ent not in surfaces:
+            surfaces.append(ent)
+    if doc_id is not None and any(DOCUMENT in (t.head, t.tail) for t in relations):
+        G.add_node(doc_id, label='DOCUMENT')
+    # One co-occurrence edge per entity pair, weighted by the number of shared windows
+    weights = Counter()
+    for (a, b), n in cooccur.items():
+        u, v = sorted((linked[a], linked[b]))
+        if u != v:
+            weights[(u, v)] += n
+    for (u, v), n in weights.items():
+        G.add_edge(u, v, type='CO_OCCUR', weight=n)
+    for t in relations:
+        G.add_edge(linked[t.head], linked[t.tail], type=t.relation, chunk_id=t.chunk_id)
     return G
 
+def push_graphs_to_neo4j(graphs, db, prune=False):
+    """
+    Bulk-load graphs into Neo4j; parallel edges of one type collapse into one
+    weighted relationship. With prune=True the graphs are the whole corpus, and
+    nodes and relationships they no longer contain are deleted.
+    """
+    nodes = {}
+    weights = {}
+    for G in graphs:
+        for node, data in G.nodes(data=True):
+            nodes.setdefault(node, (data.get('label', 'Entity'), {'surface': list(data.get('surface', []))}))
+        for u, v, edge_data in G.edges(data=True):
+            key = (u, v, edge_data.get('type', 'RELATED_TO'))
+            weights[key] = weights.get(key, 0) + edge_data.get('weight', 1)
+    return db.bulk_load(
+        ((name, label, props) for name, (label, props) in nodes.items()),
+        ((u, v, rel_type, {'weight': w}) for (u, v, rel_type), w in weights.items()),
+        prune=prune,
+    )
+
 def push_graph_to_neo4j(G, db):
-    for node, data in G.nodes(data=True):
-        db.create_node(data.get('label', 'Entity'), {'name': node})
-    for u, v, edge_data in G.edges(data=True):
-        rel_type = edge_data.get('type', 'RELATED_TO')
-        with db.driver.session() as session:
-            session.run(f"""
-                MATCH (a {{name: $u}}), (b {{name: $v}})
-                MERGE (a)-[r:{rel_type}]->(b)
-            """, u=u, v=v)
+    return push_graphs_to_neo4j([G], db)
 
-def process_file(args):
-    fname, input_dir, output_dir, text_dir = args
-    import json
-    import pickle
-    import os
-    meta_path = os.path.join(input_dir, fname)
-    with open(meta_path, encoding='utf-8') as f:
-        meta = json.load(f)
-    text = None
+def shard_path(output_dir, fname):
+    return os.path.join(output_dir, fname.replace('.json', RECORDS_SUFFIX))
+
+def _document_chunks(fname, text_dir, chunk_dir):
+    """A document's (chunk_id, text) pairs from chunk_dir, else its whole text from text_dir, else []."""
+    doc_id = fname[:-len('.json')]
+    chunk_file = os.path.join(chunk_dir, fname.replace('.json', '.txt')) if chunk_dir else None
+    if chunk_file and os.path.exists(chunk_file):
+        return read_chunks(chunk_file, doc_id)
     if text_dir:
         text_file = os.path.join(text_dir, fname.replace('.json', '.txt'))
         if os.path.exists(text_file):
             with open(text_file, encoding='utf-8') as tf:
-                text = tf.read()
-    G = build_graph(meta, text)
-    gpickle_path = os.path.join(output_dir, fname.replace('.json', '.gpickle'))
-    with open(gpickle_path, 'wb') as f:
-        pickle.dump(G, f)
-    return G
+                return [(chunk_id(doc_id, 0), tf.read())]
+    return []
+
+def _init_worker(link_cache_path, link_backend, aliases, rebel_settings):
+    """
+    Pool initializer: the parent's link cache and backend, alias table and
+    REBEL cache, passed explicitly so workers match the parent under any
+    start method (spawn does not inherit module globals).
+    """
+    global _rebel
+    configure_linking(link_cache_path, link_backend)
+    set_alias_table(aliases)
+    _rebel = RebelExtractor(**rebel_settings) if rebel_settings else None
+
+def process_file(args):
+    """
+    Map step: build one document's graph and write it as a records shard.
+    Returns only (fname, nodes, edges), so nothing large crosses the pool.
+    """
+    fname, input_dir, output_dir, text_dir, chunk_dir, triples = args
+    doc_id = fname[:-len('.json')]
+    meta_path = os.path.join(input_dir, fname)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    chunks = _document_chunks(fname, text_dir, chunk_dir)
+    if chunk_dir and chunks and triples is None and _rebel is not None:
+        # The parent already ran the model; this only reads its per-chunk cache
+        found = _rebel.cached(chunks)
+        triples = [t for cid, _ in chunks for t in found.get(cid, [])]
+    G = build_graph(meta, chunks, triples, doc_id=doc_id)
+    records = GraphRecords.from_graph(G)
+    records.save(shard_path(output_dir, fname))
+    return fname, len(records), records.number_of_edges()
+
+def _graph_inputs(fname, input_dir, text_dir, chunk_dir=None):
+    inputs = [os.path.join(input_dir, fname)]
+    for extra_dir in (text_dir, chunk_dir):
+        if extra_dir:
+            extra_file = os.path.join(extra_dir, fname.replace('.json', '.txt'))
+            if os.path.exists(extra_file):
+                inputs.append(extra_file)
+    return inputs
+
+def extract_chunk_relations(files, chunk_dir, docs_per_batch=64):
+    """
+    Yield (fname, [Triple]) from the chunk files of the given metadata files.
+    All chunks of docs_per_batch documents go to the extractor together, so
+    model batches stay full while memory stays bounded.
+    """
+    extractor = _rebel if _rebel is not None else configure_relation_extraction()
+    if extractor is None:
+        return
+    for i in range(0, len(files), docs_per_batch):
+        chunks = {}
+        for fname in files[i:i + docs_per_batch]:
+            path = os.path.join(chunk_dir, fname.replace('.json', '.txt'))
+            if os.path.exists(path):
+                chunks[fname] = read_chunks(path, fname[:-len('.json')])
+        found = extractor.extract(chunk for doc_chunks in chunks.values() for chunk in doc_chunks)
+        for fname, doc_chunks in chunks.items():
+            yield fname, [t for cid, _ in doc_chunks for t in found.get(cid, [])]
+    stats = extractor.stats
+    print(f"[GraphBuilder] Relation extraction: {stats['chunks']} chunks, {stats['cached']} cached, "
+          f"{stats['windows']} windows inferred.")
 
-def process_dir(input_dir, output_dir, text_dir=None, num_workers=4):
+def _link_in_batches(names, batch_size=50000):
+    """link_entities over an iterable of names, batch_size distinct names at a time."""
+    pending = set()
+    for name in names:
+        pending.add(name)
+        if len(pending) >= batch_size:
+            link_entities(pending)
+            pending = set()
+    if pending:
+        link_entities(pending)
+
+def process_dir(input_dir, output_dir, text_dir=None, num_workers=4, manifest=None, chunk_dir=None,
+                chunksize=None):
+    """
+    Map-reduce graph construction. Pool workers turn documents into records
+    shards (imap_unordered, chunksize documents per task); shards of documents
+    no longer in input_dir are deleted. All shards are then reduced into one
+    GraphStore and bulk-loaded into Neo4j, so relationship weights count every
+    document, and nodes and relationships absent from it are pruned. The
+    full corpus graph is merged from all shards by the graph_store stage.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    db = Neo4jConnector()
     files = [fname for fname in os.listdir(input_dir) if fname.endswith('.json')]
-    args = [(fname, input_dir, output_dir, text_dir) for fname in files]
-    with multiprocessing.Pool(num_workers) as pool:
-        graphs = pool.map(process_file, args)
-    # Push all graphs to Neo4j (sequentially, to avoid connection issues)
-    for G in graphs:
-        push_graph_to_neo4j(G, db)
+    docs = {fname[:-len('.json')] for fname in files}
+    removed = [path for path in shard_paths(output_dir)
+               if os.path.basename(path)[:-len(RECORDS_SUFFIX)] not in docs]
+    if manifest:
+        files = [fname for fname in files
+                 if not manifest.is_current('graph', fname[:-len('.json')],
+                                            _graph_inputs(fname, input_dir, text_dir, chunk_dir), graph_version())]
+    if not files and not removed:
+        print("[GraphBuilder] All graphs are up to date.")
+        return
+    for path in removed:
+        os.remove(path)
+        if manifest:
+            manifest.forget('graph', os.path.basename(path)[:-len(RECORDS_SUFFIX)])
+    if removed:
+        print(f"[GraphBuilder] Removed {len(removed)} graph shards of deleted documents.")
+    if files:
+        # Link every name the workers will resolve (entities, and the mention texts that become
+        # rule relation endpoints and co-occurrence pairs) once in the parent; workers then only
+        # hit the shared cache.
+        def surface_forms():
+            for fname in files:
+                with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
+                    meta = json.load(f)
+                yield from (ent for ent, _ in meta.get("entities", []))
+                mentions = chunk_mentions(meta, _document_chunks(fname, text_dir, chunk_dir))
+                yield from (m["text"] for chunk in mentions.values() for m in chunk)
+        _link_in_batches(surface_forms())
+        # Transformer relations are inferred here, batched across documents, with one model copy.
+        # With the per-chunk cache on, workers read the triples back from it instead of the parent
+        # holding them for every document.
+        triples = {}
+        extractor = (_rebel if _rebel is not None else configure_relation_extraction()) if chunk_dir else None
+        if extractor is not None:
+            keep = extractor.cache is None
+            def endpoints():
+                for fname, doc_triples in extract_chunk_relations(files, chunk_dir):
+                    if keep:
+                        triples[fname] = doc_triples
+                    yield from (x for t in doc_triples for x in (t.head, t.tail))
+            _link_in_batches(endpoints())
+        args = ((fname, input_dir, output_dir, text_dir, chunk_dir, triples.get(fname)) for fname in files)
+        chunksize = chunksize or max(1, min(64, len(files) // (num_workers * 4)))
+        n_docs = n_nodes = n_edges = 0
+        if _link_cache is None:
+            configure_linking()
+        init_args = (_link_cache.path, _link_backend, alias_table(),
+                     extractor.settings() if extractor is not None else None)
+        with multiprocessing.Pool(num_workers, initializer=_init_worker, initargs=init_args) as pool:
+            for _, nodes, edges in pool.imap_unordered(process_file, args, chunksize=chunksize):
+                n_docs += 1
+                n_nodes += nodes
+                n_edges += edges
+        print(f"[GraphBuilder] Wrote {n_docs} graph shards ({n_nodes} nodes, {n_edges} edges).")
+    # Reduce: merge all shards, unchanged ones included, so a relationship shared with an
+    # unchanged document keeps that document's weight; then replace the Neo4j graph with it
+    merged = GraphStore.from_shards(shard_paths(output_dir))
+    db = Neo4jConnector()
+    n_nodes, n_edges = push_graphs_to_neo4j([merged], db, prune=True)
+    print(f"[GraphBuilder] Loaded {n_nodes} nodes and {n_edges} relationships into Neo4j.")
     db.close()
+    if manifest:
+        for fname in files:
+            manifest.record('graph', fname[:-len('.json')], _graph_inputs(fname, input_dir, text_dir, chunk_dir),
+                            [shard_path(output_dir, fname)], graph_version())
+        manifest.save()
 
 # --- Truly Advanced Relation Extraction (Transformer-based, Event, Temporal, Coreference) ---
 from typing import List, Tuple
-try:
-    from transformers import pipeline
-    _re_model = pipeline('relation-extraction', model='Babelscape/rebel-large', device=-1)
-except Exception:
-    _re_model = None
-
-def transformer_relation_extraction(text: str) -> List[Tuple[str, str, str]]:
-    """Use a transformer model to extract (src, rel, tgt) triples from text."""
-    if not _re_model:
-        return []
-    try:
-        results = _re_model(text)
-        triples = [(r['head'], r['type'], r['tail']) for r in results]
-        return triples
-    except Exception:
+
+def transformer_relation_extraction(text: str, doc_id: str = 'text') -> List[Tuple[str, str, str]]:
+    """
+    Use a transformer model to extract (src, rel, tgt) triples from text. Text
+    containing CHUNK_SEPARATOR is treated as chunks; every chunk is covered by
+    sentence-aligned windows (see builder.relation_extractor).
+    """
+    extractor = _rebel if _rebel is not None else configure_relation_extraction()
+    if extractor is None:
         return []
+    chunks = [(chunk_id(doc_id, n), part) for n, part in enumerate(text.split(CHUNK_SEPARATOR))]
+    found = extractor.extract(chunks)
+    return [(t.head, t.relation, t.tail) for cid, _ in chunks for t in found.get(cid, [])]
 
 def extract_events_temporal_coref(text: str, entities: List[Tuple[str, str]]):
     """Stub for event, temporal, and coreference extraction."""
     # TODO: Integrate event extraction (e.g., using OpenIE, AllenNLP), temporal taggers, and coreference models
     return []
 
-# Update extract_relations to use all methods
-
-def extract_relations(text, entities):
+def extract_relations(chunks, mentions):
+    """
+    Rule-based Triples for a document's (chunk_id, text) chunks, one pass of the
+    compiled rule pattern per chunk, aligned to mentions ({chunk_id: mentions}).
+    Transformer relations are extracted separately, in the parent (extract_chunk_relations).
+    """
+    engine = rule_engine()
     relations = []
-    # Regex-based
-    patterns = [
-        (r"(\b[A-Z][a-z]+\b) (sued|acquired|merged with|vs) (\b[A-Z][a-z]+\b)", 1, 2, 3),
-    ]
-    for pat, s_idx, rel_idx, t_idx in patterns:
-        for m in re.finditer(pat, text):
-            src = m.group(s_idx)
-            rel = m.group(rel_idx).upper().replace(' ', '_')
-            tgt = m.group(t_idx)
-            relations.append((src, rel, tgt))
-    # Transformer-based
-    relations.extend(transformer_relation_extraction(text))
-    # Event/temporal/coref
-    relations.extend(extract_events_temporal_coref(text, entities))
+    for cid, text in chunks:
+        relations.extend(engine.extract(cid, text, mentions.get(cid, [])))
+        # Event/temporal/coref
+        entities = [(m['text'], m['label']) for m in mentions.get(cid, [])]
+        relations.extend(Triple(src, rel, tgt, cid) for src, rel, tgt in extract_events_temporal_coref(text, entities))
     return relations
 
 # --- Scalability/Robustness: Distributed, Sharding, Real-time, Error Recovery ---
@@ -190,4 +412,5 @@ def extract_relations(text, entities):
 
 if __name__ == "__main__":
     # Now expects the extracted text dir for relation extraction
-    process_dir("../data/output_json", "../data/graphs", text_dir="../data/extracted_texts")
+    process_dir("../data/output_json", "../data/graphs", text_dir="../data/extracted_texts",
+                chunk_dir="../data/chunks")
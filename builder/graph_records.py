@@ -0,0 +1,95 @@
+"""
+Compact node and edge records for one document's graph: the map output of
+graph construction. Names, labels, surface forms, edge types and chunk IDs
+are interned in a local string table; nodes and edges are int32/float32
+columns. Saved as one uncompressed .npz per document, and merged into the
+corpus graph by GraphStore.from_shards.
+"""
+import numpy as np
+
+from builder.string_table import StringTable
+
+RECORDS_SUFFIX = '.records.npz'
+# Bump when the column layout changes
+RECORDS_FORMAT_VERSION = 1
+
+class GraphRecords:
+    def __init__(self, strings, node_name, node_label, surface_node, surface_string,
+                 edge_src, edge_dst, edge_type, edge_weight, edge_chunk):
+        self.strings = strings                # local string table (list of str)
+        self.node_name = node_name            # node row -> string ID of its name
+        self.node_label = node_label          # node row -> string ID of its label
+        self.surface_node = surface_node      # (node row, string ID) pairs of surface forms
+        self.surface_string = surface_string
+        self.edge_src = edge_src              # node rows
+        self.edge_dst = edge_dst
+        self.edge_type = edge_type            # string ID of the edge type
+        self.edge_weight = edge_weight
+        self.edge_chunk = edge_chunk          # string ID of the source chunk, -1 if none
+
+    @classmethod
+    def from_graph(cls, G):
+        """Records of a networkx graph as built by graph_builder.build_graph."""
+        ids = {}
+        def intern(s):
+            return ids.setdefault(s, len(ids))
+        rows = {node: i for i, node in enumerate(G.nodes)}
+        node_name = [intern(node) for node in G.nodes]
+        node_label, surface_node, surface_string = [], [], []
+        for node, data in G.nodes(data=True):
+            node_label.append(intern(data.get('label', 'Entity')))
+            surface = data.get('surface', [])
+            for form in [surface] if isinstance(surface, str) else surface:
+                surface_node.append(rows[node])
+                surface_string.append(intern(form))
+        src, dst, etype, weight, chunk = [], [], [], [], []
+        for u, v, data in G.edges(data=True):
+            src.append(rows[u])
+            dst.append(rows[v])
+            etype.append(intern(data.get('type', 'RELATED_TO')))
+            weight.append(data.get('weight', 1))
+            chunk.append(intern(data['chunk_id']) if data.get('chunk_id') else -1)
+        i32 = lambda values: np.asarray(values, dtype=np.int32)
+        return cls(list(ids), i32(node_name), i32(node_label), i32(surface_node), i32(surface_string),
+                   i32(src), i32(dst), i32(etype), np.asarray(weight, dtype=np.float32), i32(chunk))
+
+    def __len__(self):
+        return len(self.node_name)
+
+    def number_of_edges(self):
+        return len(self.edge_src)
+
+    def save(self, path):
+        table = StringTable.from_strings(self.strings)
+        with open(path, 'wb') as f:
+            np.savez(f, format_version=np.int32(RECORDS_FORMAT_VERSION),
+                     string_blob=table.blob, string_offsets=table.offsets,
+                     node_name=self.node_name, node_label=self.node_label,
+                     surface_node=self.surface_node, surface_string=self.surface_string,
+                     edge_src=self.edge_src, edge_dst=self.edge_dst, edge_type=self.edge_type,
+                     edge_weight=self.edge_weight, edge_chunk=self.edge_chunk)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['format_version']) != RECORDS_FORMAT_VERSION:
+                raise ValueError(f"Unsupported graph records format {int(data['format_version'])} in {path}")
+            strings = StringTable(data['string_blob'], data['string_offsets']).tolist()
+            return cls(strings, *(data[name] for name in (
+                'node_name', 'node_label', 'surface_node', 'surface_string',
+                'edge_src', 'edge_dst', 'edge_type', 'edge_weight', 'edge_chunk')))
+
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.MultiDiGraph()
+        names = [self.strings[i] for i in self.node_name]
+        for name, label in zip(names, self.node_label):
+            G.add_node(name, label=self.strings[label], surface=[])
+        for row, s in zip(self.surface_node, self.surface_string):
+            G.nodes[names[row]]['surface'].append(self.strings[s])
+        for u, v, t, w, c in zip(self.edge_src, self.edge_dst, self.edge_type, self.edge_weight, self.edge_chunk):
+            data = {'type': self.strings[t], 'weight': float(w)}
+            if c >= 0:
+                data['chunk_id'] = self.strings[c]
+            G.add_edge(names[u], names[v], **data)
+        return G
@@ -0,0 +1,407 @@
+"""
+Merged, compact knowledge-graph store for the whole corpus.
+Nodes get interned integer IDs (in sorted-name order, so a name lookup is a
+binary search over the string table). Adjacency is one CSR array set per edge
+type, in both directions, saved as .npy files that load memory-mapped.
+GraphStore also exposes the small slice of the networkx API the app uses.
+"""
+import os
+import json
+import bisect
+import pickle
+import hashlib
+import shutil
+import numpy as np
+
+from builder.string_table import StringTable
+from builder.graph_records import GraphRecords, RECORDS_SUFFIX
+
+STORE_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# Separator for the per-node surface-form lists in the surfaces string table
+SURFACE_SEP = '\x1f'
+
+def _csr(src, dst, weight, n_nodes):
+    """Sorted, de-duplicated CSR (indptr, indices, weights); parallel edges add up their weights."""
+    if len(src):
+        key = src.astype(np.int64) * n_nodes + dst
+        key, inverse = np.unique(key, return_inverse=True)
+        weight = np.bincount(inverse, weights=weight).astype(np.float32)
+        src, dst = key // n_nodes, key % n_nodes
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    return indptr, dst.astype(np.int32), np.asarray(weight, dtype=np.float32)
+
+class GraphStore:
+    def __init__(self, names, surfaces, node_label, label_names, edge_types, out_adj, in_adj):
+        self.names = names              # StringTable: node ID -> name (sorted)
+        self.surfaces = surfaces        # StringTable: node ID -> SURFACE_SEP-joined surface forms
+        self.node_label = node_label    # int32 array: node ID -> label ID
+        self.label_names = label_names  # label ID -> label string
+        self.edge_types = edge_types    # edge type ID -> type string
+        self.out_adj = out_adj          # type ID -> (indptr, indices, weights)
+        self.in_adj = in_adj
+        self._degree = None
+        self._version = None
+
+    # --- construction ---
+    @classmethod
+    def from_records(cls, nodes, edges):
+        """
+        nodes: iterable of (name, label, surface forms); edges: iterable of
+        (src, tgt, type, weight). Edge endpoints missing from nodes are added
+        with label 'Entity'.
+        """
+        node_info = {}
+        for name, label, surfaces in nodes:
+            info = node_info.setdefault(name, [label, []])
+            info[1].extend(s for s in surfaces if s not in info[1])
+        edge_rows = {}
+        for u, v, etype, weight in edges:
+            for name in (u, v):
+                node_info.setdefault(name, ['Entity', []])
+            edge_rows.setdefault(etype, []).append((u, v, weight))
+        names = sorted(node_info)
+        ids = {name: i for i, name in enumerate(names)}
+        label_names = sorted({info[0] for info in node_info.values()})
+        label_ids = {label: i for i, label in enumerate(label_names)}
+        node_label = np.array([label_ids[node_info[n][0]] for n in names], dtype=np.int32)
+        surfaces = [SURFACE_SEP.join(node_info[n][1]) for n in names]
+        edge_types = sorted(edge_rows)
+        out_adj, in_adj = {}, {}
+        for t, etype in enumerate(edge_types):
+            rows = edge_rows[etype]
+            src = np.array([ids[u] for u, _, _ in rows], dtype=np.int64)
+            dst = np.array([ids[v] for _, v, _ in rows], dtype=np.int64)
+            w = np.array([w for _, _, w in rows], dtype=np.float64)
+            out_adj[t] = _csr(src, dst, w, len(names))
+            in_adj[t] = _csr(dst, src, w, len(names))
+        return cls(StringTable.from_strings(names), StringTable.from_strings(surfaces),
+                   node_label, label_names, edge_types, out_adj, in_adj)
+
+    @classmethod
+    def from_graphs(cls, graphs):
+        """Merge networkx graphs (e.g. the per-document gpickles) into one store."""
+        graphs = list(graphs)
+        def nodes():
+            for G in graphs:
+                for node, data in G.nodes(data=True):
+                    surface = data.get('surface', [])
+                    yield node, data.get('label', 'Entity'), [surface] if isinstance(surface, str) else surface
+        def edges():
+            for G in graphs:
+                for u, v, data in G.edges(data=True):
+                    yield u, v, data.get('type', 'RELATED_TO'), data.get('weight', 1)
+        return cls.from_records(nodes(), edges())
+
+    @classmethod
+    def from_shards(cls, paths):
+        """
+        Reduce step: merge per-document GraphRecords files into one store.
+        Shards are read one at a time; names are interned into global IDs as
+        they appear and edge columns are remapped with array lookups, so only
+        the global string tables and edge arrays are held in memory.
+        """
+        gids, type_ids = {}, {}
+        labels, surfaces = [], []
+        src_parts, dst_parts, type_parts, weight_parts = [], [], [], []
+        for path in paths:
+            rec = GraphRecords.load(path)
+            strings = rec.strings
+            node_gid = np.empty(len(rec), dtype=np.int64)
+            for row, (name, label) in enumerate(zip(rec.node_name.tolist(), rec.node_label.tolist())):
+                gid = gids.setdefault(strings[name], len(gids))
+                if gid == len(labels):
+                    labels.append(strings[label])
+                    surfaces.append([])
+                node_gid[row] = gid
+            for row, s in zip(rec.surface_node.tolist(), rec.surface_string.tolist()):
+                forms = surfaces[node_gid[row]]
+                if strings[s] not in forms:
+                    forms.append(strings[s])
+            if rec.number_of_edges():
+                local_types = np.unique(rec.edge_type)
+                type_map = np.zeros(int(local_types.max()) + 1, dtype=np.int32)
+                for t in local_types.tolist():
+                    type_map[t] = type_ids.setdefault(strings[t], len(type_ids))
+                src_parts.append(node_gid[rec.edge_src])
+                dst_parts.append(node_gid[rec.edge_dst])
+                type_parts.append(type_map[rec.edge_type])
+                weight_parts.append(rec.edge_weight.astype(np.float64))
+        names = sorted(gids)
+        n = len(names)
+        # Global IDs are in first-seen order; the store wants sorted-name order
+        order = [gids[name] for name in names]
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+        label_names = sorted(set(labels))
+        label_ids = {label: i for i, label in enumerate(label_names)}
+        node_label = np.array([label_ids[labels[g]] for g in order], dtype=np.int32)
+        surface_rows = [SURFACE_SEP.join(surfaces[g]) for g in order]
+        concat = lambda parts, dtype: np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+        src = rank[concat(src_parts, np.int64)]
+        dst = rank[concat(dst_parts, np.int64)]
+        etype = concat(type_parts, np.int32)
+        weight = concat(weight_parts, np.float64)
+        edge_types = sorted(type_ids)
+        out_adj, in_adj = {}, {}
+        for t, name in enumerate(edge_types):
+            mask = etype == type_ids[name]
+            out_adj[t] = _csr(src[mask], dst[mask], weight[mask], n)
+            in_adj[t] = _csr(dst[mask], src[mask], weight[mask], n)
+        return cls(StringTable.from_strings(names), StringTable.from_strings(surface_rows),
+                   node_label, label_names, edge_types, out_adj, in_adj)
+
+    @property
+    def version(self):
+        """Hash of the store's names, surface forms, labels and edges; recorded in the saved manifest."""
+        if self._version is None:
+            h = hashlib.sha1(json.dumps([self.label_names, self.edge_types]).encode('utf-8'))
+            arrays = [self.names.blob, self.names.offsets, self.surfaces.blob, self.surfaces.offsets,
+                      self.node_label]
+            arrays += [arr for t in range(len(self.edge_types)) for arr in self.out_adj[t]]
+            for arr in arrays:
+                h.update(np.ascontiguousarray(arr).data)
+            self._version = h.hexdigest()[:16]
+        return self._version
+
+    # --- persistence ---
+    def save(self, store_dir):
+        staging = store_dir.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        self.names.save(os.path.join(staging, 'names'))
+        self.surfaces.save(os.path.join(staging, 'surfaces'))
+        np.save(os.path.join(staging, 'node_label.npy'), np.asarray(self.node_label, dtype=np.int32))
+        for direction, adj in (('out', self.out_adj), ('in', self.in_adj)):
+            for t, arrays in adj.items():
+                for part, arr in zip(('indptr', 'indices', 'weights'), arrays):
+                    np.save(os.path.join(staging, f'adj.{t}.{direction}.{part}.npy'), arr)
+        manifest = {
+            'format_version': STORE_FORMAT_VERSION,
+            'version': self.version,
+            'n_nodes': len(self.names),
+            'labels': self.label_names,
+            'edge_types': self.edge_types,
+            'n_edges': {etype: int(len(self.out_adj[t][1])) for t, etype in enumerate(self.edge_types)},
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        # Stale files from a previous, larger type set are harmless; manifest goes last.
+        os.makedirs(store_dir, exist_ok=True)
+        for name in sorted(os.listdir(staging), key=lambda n: n == MANIFEST_FILE):
+            os.replace(os.path.join(staging, name), os.path.join(store_dir, name))
+        os.rmdir(staging)
+
+    @classmethod
+    def load(cls, store_dir, mmap=True):
+        with open(os.path.join(store_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph store format {manifest.get('format_version')} in {store_dir}")
+        mode = 'r' if mmap else None
+        adj = {'out': {}, 'in': {}}
+        for direction in adj:
+            for t in range(len(manifest['edge_types'])):
+                adj[direction][t] = tuple(
+                    np.load(os.path.join(store_dir, f'adj.{t}.{direction}.{part}.npy'), mmap_mode=mode)
+                    for part in ('indptr', 'indices', 'weights'))
+        store = cls(StringTable.load(os.path.join(store_dir, 'names'), mmap=mmap),
+                    StringTable.load(os.path.join(store_dir, 'surfaces'), mmap=mmap),
+                    np.load(os.path.join(store_dir, 'node_label.npy'), mmap_mode=mode),
+                    manifest['labels'], manifest['edge_types'], adj['out'], adj['in'])
+        if len(store.names) != manifest['n_nodes']:
+            raise ValueError(f"Graph store in {store_dir} is incomplete")
+        store._version = manifest.get('version')
+        return store
+
+    # --- ID helpers ---
+    def node_id(self, name):
+        """Interned ID of a node name, or None."""
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return i
+        return None
+
+    def node_data(self, i):
+        surfaces = self.surfaces[i]
+        return {'label': self.label_names[self.node_label[i]],
+                'surface': surfaces.split(SURFACE_SEP) if surfaces else []}
+
+    def out_edges(self, i):
+        """(neighbour ID, type ID, weight) for every outgoing edge of node ID i."""
+        for t, (indptr, indices, weights) in self.out_adj.items():
+            for j in range(indptr[i], indptr[i + 1]):
+                yield int(indices[j]), t, float(weights[j])
+
+    def in_edges(self, i):
+        for t, (indptr, indices, weights) in self.in_adj.items():
+            for j in range(indptr[i], indptr[i + 1]):
+                yield int(indices[j]), t, float(weights[j])
+
+    # --- networkx-compatible view ---
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    @property
+    def edges(self):
+        return _EdgeView(self)
+
+    @property
+    def degree(self):
+        if self._degree is None:
+            deg = np.zeros(len(self.names), dtype=np.int64)
+            for adj in (self.out_adj, self.in_adj):
+                for indptr, _, _ in adj.values():
+                    deg += np.diff(indptr)
+            self._degree = deg
+        return [(self.names[i], int(d)) for i, d in enumerate(self._degree)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return self.node_id(name) is not None
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return int(sum(len(indices) for _, indices, _ in self.out_adj.values()))
+
+    def has_node(self, name):
+        return name in self
+
+    def successors(self, name):
+        i = self.node_id(name)
+        if i is None:
+            raise KeyError(name)
+        return iter(dict.fromkeys(self.names[j] for j, _, _ in self.out_edges(i)))
+
+    def predecessors(self, name):
+        i = self.node_id(name)
+        if i is None:
+            raise KeyError(name)
+        return iter(dict.fromkeys(self.names[j] for j, _, _ in self.in_edges(i)))
+
+    def has_edge(self, u, v):
+        i, j = self.node_id(u), self.node_id(v)
+        return i is not None and j is not None and any(n == j for n, _, _ in self.out_edges(i))
+
+    def __getitem__(self, name):
+        """Adjacency like MultiDiGraph: {neighbour: {key: {'type': ..., 'weight': ...}}}."""
+        i = self.node_id(name)
+        if i is None:
+            raise KeyError(name)
+        adj = {}
+        for j, t, w in self.out_edges(i):
+            keyed = adj.setdefault(self.names[j], {})
+            keyed[len(keyed)] = {'type': self.edge_types[t], 'weight': w}
+        return adj
+
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.MultiDiGraph()
+        for i, name in enumerate(self.names):
+            G.add_node(name, **self.node_data(i))
+        for u, v, data in self.edges(data=True):
+            G.add_edge(u, v, **data)
+        return G
+
+class _NodeView:
+    def __init__(self, store):
+        self._store = store
+    def __iter__(self):
+        return iter(self._store.names)
+    def __len__(self):
+        return len(self._store.names)
+    def __contains__(self, name):
+        return name in self._store
+    def __getitem__(self, name):
+        i = self._store.node_id(name)
+        if i is None:
+            raise KeyError(name)
+        return self._store.node_data(i)
+    def __call__(self, data=False):
+        if not data:
+            return iter(self)
+        return ((name, self._store.node_data(i)) for i, name in enumerate(self._store.names))
+
+class _EdgeView:
+    def __init__(self, store):
+        self._store = store
+    def __iter__(self):
+        return ((u, v) for u, v, _ in self(data=True))
+    def __len__(self):
+        return self._store.number_of_edges()
+    def __call__(self, data=False):
+        store = self._store
+        def rows():
+            for t, (indptr, indices, weights) in store.out_adj.items():
+                for i in np.flatnonzero(np.diff(indptr)):
+                    u = store.names[i]
+                    for j in range(indptr[i], indptr[i + 1]):
+                        yield u, store.names[int(indices[j])], {'type': store.edge_types[t], 'weight': float(weights[j])}
+        if data:
+            return rows()
+        return ((u, v) for u, v, _ in rows())
+
+def shard_paths(graph_dir):
+    return [os.path.join(graph_dir, fname) for fname in sorted(os.listdir(graph_dir))
+            if fname.endswith(RECORDS_SUFFIX)]
+
+def process_dir(graph_dir, store_dir, manifest=None):
+    """
+    Merge every per-document records shard in graph_dir into one GraphStore at
+    store_dir. Graph directories from before the records format (.gpickle
+    files only) are still merged through from_graphs.
+    """
+    paths = shard_paths(graph_dir)
+    legacy = not paths
+    if legacy:
+        paths = [os.path.join(graph_dir, fname) for fname in sorted(os.listdir(graph_dir))
+                 if fname.endswith('.gpickle')]
+    version = str(STORE_FORMAT_VERSION)
+    if manifest and manifest.is_current('graph_store', '__corpus__', paths, version) \
+            and os.path.exists(os.path.join(store_dir, MANIFEST_FILE)):
+        print("[GraphStore] Merged graph is up to date.")
+        return GraphStore.load(store_dir)
+    if legacy:
+        graphs = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                graphs.append(pickle.load(f))
+        store = GraphStore.from_graphs(graphs)
+    else:
+        store = GraphStore.from_shards(paths)
+    store.save(store_dir)
+    print(f"[GraphStore] Merged {len(paths)} graphs: {store.number_of_nodes()} nodes, "
+          f"{store.number_of_edges()} edges -> {store_dir}")
+    if manifest:
+        manifest.record('graph_store', '__corpus__', paths, [os.path.join(store_dir, MANIFEST_FILE)], version)
+        manifest.save()
+    return store
+
+def load_store(store_dir, mmap=True):
+    """Load a saved graph store, or return None if there is none."""
+    if not os.path.exists(os.path.join(store_dir, MANIFEST_FILE)):
+        return None
+    return GraphStore.load(store_dir, mmap=mmap)
+
+def load_or_build(store_dir, graph_dir):
+    """Open the merged store if present; otherwise merge graph_dir's shards and save it."""
+    try:
+        store = load_store(store_dir)
+    except (ValueError, OSError) as e:
+        print(f"[GraphStore] Could not load {store_dir} ({e}); rebuilding.")
+        store = None
+    if store is None and os.path.isdir(graph_dir):
+        store = process_dir(graph_dir, store_dir)
+    return store
+
+if __name__ == "__main__":
+    process_dir("data/graphs", "data/graph_store")
@@ -2,40 +2,397 @@
 Store semantic chunks in a vector database (Pinecone or FAISS).
 """
 import os
+import json
+import hashlib
+import shutil
+from collections import namedtuple
 import faiss
 import numpy as np
+import scipy.sparse as sp
 
 # Dummy embedder for demonstration
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from builder.semantic_chunker import CHUNK_SEPARATOR, chunk_id
+from builder.string_table import StringTable
+
+# Bump whenever the on-disk layout written by SimpleIndexer.save changes.
+INDEX_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+INDEX_TYPES = ('flat', 'sparse', 'lsa', 'ivf', 'hnsw', 'ivfpq')
+# Training/tuning parameters for the LSA-based backends.
+ANN_DEFAULTS = {
+    'svd_components': 256,  # LSA dimensionality
+    'nlist': None,          # IVF lists; None picks ~4*sqrt(n_chunks)
+    'nprobe': 8,            # IVF lists visited per query
+    'hnsw_m': 32,           # HNSW graph degree
+    'ef_construction': 80,
+    'ef_search': 64,        # HNSW candidate list size per query
+    'pq_m': 16,             # PQ sub-quantizers (code size = pq_m * pq_nbits bits)
+    'pq_nbits': 8,
+}
+# Vectorizer settings that affect transform() and must survive a save/load.
+VECTORIZER_PARAMS = ('lowercase', 'token_pattern', 'ngram_range', 'stop_words',
+                     'norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+
+# A retrieved chunk; score is higher-is-better, hop is the retrieval hop that found it.
+Hit = namedtuple('Hit', ['chunk_id', 'text', 'score', 'hop'], defaults=(1,))
+
+def content_version(ids, texts):
+    """Hash of chunk IDs and texts; changes whenever the indexed corpus does."""
+    h = hashlib.sha1()
+    for cid, text in zip(ids, texts):
+        h.update(cid.encode('utf-8'))
+        h.update(b'\0')
+        h.update(text.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+def _top_k(scores, cols, k):
+    """Partial sort: O(nnz) selection of the k best scores, then sort just those."""
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(cols[i]), float(scores[i])) for i in top]
+
+def _read_faiss_index(path, mmap):
+    if mmap:
+        # Index types without mmap support fall back to a regular read.
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except (RuntimeError, AttributeError):
+            pass
+    return faiss.read_index(path)
 
 class SimpleIndexer:
-    def __init__(self):
+    """
+    TF-IDF chunk index. index_type selects the search engine:
+    - 'flat': dense vectors in faiss.IndexFlatL2 (exact L2).
+    - 'sparse': CSR postings (term x chunk); cosine via a sparse product, so
+      memory scales with non-zeros and latency with the query terms' postings.
+    - 'lsa', 'ivf', 'hnsw', 'ivfpq': cosine over a TruncatedSVD (LSA) projection
+      of the TF-IDF matrix, searched exactly ('lsa') or approximately with
+      FAISS IVF-Flat, HNSW or IVF-PQ.
+    Approximate backends take the tuning parameters in ANN_DEFAULTS as keyword
+    arguments; nprobe and ef_search can be changed after fit via set_search_params.
+    """
+    def __init__(self, index_type='flat', **params):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}")
+        unknown = set(params) - set(ANN_DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown index parameters: {sorted(unknown)}")
+        self.index_type = index_type
+        self.params = {**ANN_DEFAULTS, **params}
         self.vectorizer = TfidfVectorizer()
         self.index = None
+        self.postings = None
+        self.projection = None
         self.texts = []
-    def fit(self, texts):
-        X = self.vectorizer.fit_transform(texts).toarray().astype('float32')
-        self.index = faiss.IndexFlatL2(X.shape[1])
-        self.index.add(X)
+        self.ids = []
+        self.version = None
+        # Set by load(mmap=True): the FAISS file the (read-only) index maps
+        self._mapped_path = None
+    def fit(self, texts, ids=None):
+        X = self.vectorizer.fit_transform(texts)
+        if self.index_type == 'sparse':
+            # Rows are already L2-normalized by the vectorizer, so dot products are cosines.
+            self.postings = X.T.tocsr().astype(np.float32)
+        elif self.index_type == 'flat':
+            X = X.toarray().astype('float32')
+            self.index = faiss.IndexFlatL2(X.shape[1])
+            self.index.add(X)
+        else:
+            self._fit_projection(X)
+            Xd = self._embed(X)
+            self.index = self._build_ann_index(Xd)
+            self.index.add(Xd)
+            self.set_search_params()
         self.texts = texts
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(texts))]
+        self.version = content_version(self.ids, self.texts)
     def search(self, query, k=3):
-        Xq = self.vectorizer.transform([query]).toarray().astype('float32')
-        D, I = self.index.search(Xq, k)
-        return [self.texts[i] for i in I[0]]
+        return self.search_batch([query], k=k)[0]
+
+    def search_batch(self, queries, k=3):
+        """Vectorize and search all queries in one matrix operation; one result list per query."""
+        if not queries:
+            return []
+        return [[hit.text for hit in hits] for hits in self.search_hits_batch(queries, k)]
+
+    def search_hits_batch(self, queries, k=3):
+        """Like search_batch, but each result is a Hit carrying the chunk ID and score."""
+        if not queries:
+            return []
+        rows = self._search_rows(self.vectorizer.transform(queries), k)
+        return [[Hit(self.ids[i], self.texts[i], score) for i, score in hits] for hits in rows]
+
+    def add(self, texts, ids):
+        """
+        Append chunks without refitting. Vocabulary and IDF stay as fitted, so terms
+        first seen in the new chunks are not searchable until the next full fit.
+        """
+        X = self.vectorizer.transform(texts)
+        if self._mapped_path is not None:
+            # Memory-mapped inverted lists are read-only; take a writable in-memory copy first
+            self.index = faiss.read_index(self._mapped_path)
+            self._mapped_path = None
+            self.set_search_params()
+        if self.index_type == 'sparse':
+            self.postings = sp.hstack([self.postings, X.T.astype(np.float32)], format='csr')
+        elif self.index_type == 'flat':
+            self.index.add(X.toarray().astype('float32'))
+        else:
+            self.index.add(self._embed(X))
+        self.texts = list(self.texts) + list(texts)
+        self.ids = list(self.ids) + list(ids)
+        self.version = content_version(self.ids, self.texts)
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """Update query-time knobs (IVF nprobe, HNSW efSearch) without rebuilding."""
+        if nprobe is not None:
+            self.params['nprobe'] = nprobe
+        if ef_search is not None:
+            self.params['ef_search'] = ef_search
+        if self.index_type in ('ivf', 'ivfpq'):
+            self.index.nprobe = self.params['nprobe']
+        elif self.index_type == 'hnsw':
+            self.index.hnsw.efSearch = self.params['ef_search']
+
+    def nbytes(self):
+        """Approximate resident size of the search structure (excluding chunk texts)."""
+        if self.index_type == 'sparse':
+            return sum(getattr(self.postings, part).nbytes for part in ('data', 'indices', 'indptr'))
+        size = int(faiss.serialize_index(self.index).nbytes)
+        if self.projection is not None:
+            size += self.projection.nbytes
+        return size
+
+    def _fit_projection(self, X):
+        # TruncatedSVD needs n_components < n_features; IVF-PQ needs dim % pq_m == 0.
+        dim = max(1, min(self.params['svd_components'], X.shape[1] - 1, X.shape[0] - 1))
+        if self.index_type == 'ivfpq':
+            dim = max(self.params['pq_m'], dim - dim % self.params['pq_m'])
+        svd = TruncatedSVD(n_components=dim, random_state=0)
+        svd.fit(X)
+        self.projection = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+    def _embed(self, X):
+        """Project sparse TF-IDF rows into the LSA space and L2-normalize them for cosine."""
+        Xd = np.ascontiguousarray(X @ self.projection, dtype=np.float32)
+        faiss.normalize_L2(Xd)
+        return Xd
 
-def process_dir(input_dir):
-    texts = []
-    for fname in os.listdir(input_dir):
+    def _build_ann_index(self, Xd):
+        n, dim = Xd.shape
+        metric = faiss.METRIC_INNER_PRODUCT
+        if self.index_type == 'lsa':
+            return faiss.IndexFlatIP(dim)
+        if self.index_type == 'hnsw':
+            index = faiss.IndexHNSWFlat(dim, self.params['hnsw_m'], metric)
+            index.hnsw.efConstruction = self.params['ef_construction']
+            return index
+        # IVF needs at least one training point per list; default nlist ~ 4 * sqrt(n).
+        nlist = self.params['nlist'] or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        self.params['nlist'] = nlist
+        quantizer = faiss.IndexFlatIP(dim)
+        if self.index_type == 'ivf':
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            # Each PQ codebook needs 2**nbits training points; shrink it for small corpora.
+            nbits = max(1, min(self.params['pq_nbits'], int(np.log2(n))))
+            self.params['pq_nbits'] = nbits
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, self.params['pq_m'], nbits, metric)
+        index.train(Xd)
+        return index
+
+    def _search_rows(self, Xq, k):
+        """Top-k (chunk position, score) pairs for each row of the sparse query matrix Xq."""
+        if self.index_type == 'sparse':
+            scores = (Xq.astype(np.float32) @ self.postings).tocsr()
+            return [_top_k(scores.data[scores.indptr[r]:scores.indptr[r + 1]],
+                           scores.indices[scores.indptr[r]:scores.indptr[r + 1]], k)
+                    for r in range(Xq.shape[0])]
+        if self.index_type == 'flat':
+            D, I = self.index.search(Xq.toarray().astype('float32'), k)
+            # Negated L2 distance so that higher is better for every index type.
+            D = -D
+        else:
+            D, I = self.index.search(self._embed(Xq), k)
+        return [[(int(i), float(d)) for i, d in zip(I[r], D[r]) if i >= 0] for r in range(len(I))]
+
+    def save(self, index_dir):
+        """
+        Write the fitted index as a versioned artifact directory:
+        manifest, vocabulary, IDF weights, FAISS index, chunk texts and IDs.
+        Files are staged in a sibling directory and moved into place one by one,
+        so processes that already mapped the previous files keep a consistent copy.
+        """
+        staging = index_dir.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        vocab = self.vectorizer.vocabulary_
+        terms = [None] * len(vocab)
+        for term, col in vocab.items():
+            terms[col] = term
+        StringTable.from_strings(terms).save(os.path.join(staging, 'vocab'))
+        np.save(os.path.join(staging, 'idf.npy'), np.asarray(self.vectorizer.idf_, dtype=np.float64))
+        if self.index_type == 'sparse':
+            for part in ('data', 'indices', 'indptr'):
+                np.save(os.path.join(staging, f'postings.{part}.npy'), getattr(self.postings, part))
+        else:
+            faiss.write_index(self.index, os.path.join(staging, 'faiss.index'))
+        if self.projection is not None:
+            np.save(os.path.join(staging, 'projection.npy'), self.projection)
+        StringTable.from_strings(list(self.texts)).save(os.path.join(staging, 'texts'))
+        StringTable.from_strings(list(self.ids)).save(os.path.join(staging, 'ids'))
+        params = self.vectorizer.get_params()
+        manifest = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'index_version': self.version,
+            'index_type': self.index_type,
+            'params': self.params,
+            'n_chunks': len(self.texts),
+            'n_features': len(terms),
+            'vectorizer': {p: params[p] for p in VECTORIZER_PARAMS},
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.makedirs(index_dir, exist_ok=True)
+        # Manifest goes last: a reader never sees a manifest newer than its data.
+        names = sorted(os.listdir(staging), key=lambda n: n == MANIFEST_FILE)
+        for name in names:
+            os.replace(os.path.join(staging, name), os.path.join(index_dir, name))
+        os.rmdir(staging)
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """Open an artifact written by save(); large arrays are memory-mapped when mmap=True."""
+        with open(os.path.join(index_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format {manifest.get('format_version')} in {index_dir}")
+        indexer = cls(index_type=manifest.get('index_type', 'flat'), **manifest.get('params', {}))
+        params = dict(manifest['vectorizer'])
+        params['ngram_range'] = tuple(params['ngram_range'])
+        indexer.vectorizer.set_params(**params)
+        terms = StringTable.load(os.path.join(index_dir, 'vocab'), mmap=False).tolist()
+        indexer.vectorizer.vocabulary_ = {term: col for col, term in enumerate(terms)}
+        indexer.vectorizer.idf_ = np.load(os.path.join(index_dir, 'idf.npy'))
+        if indexer.index_type == 'sparse':
+            parts = [np.load(os.path.join(index_dir, f'postings.{part}.npy'), mmap_mode='r' if mmap else None)
+                     for part in ('data', 'indices', 'indptr')]
+            indexer.postings = sp.csr_matrix(tuple(parts), shape=(len(terms), manifest['n_chunks']), copy=False)
+        else:
+            path = os.path.join(index_dir, 'faiss.index')
+            indexer.index = _read_faiss_index(path, mmap)
+            indexer._mapped_path = path if mmap else None
+        if os.path.exists(os.path.join(index_dir, 'projection.npy')):
+            indexer.projection = np.load(os.path.join(index_dir, 'projection.npy'))
+            indexer.set_search_params()
+        indexer.texts = StringTable.load(os.path.join(index_dir, 'texts'), mmap=mmap)
+        indexer.ids = StringTable.load(os.path.join(index_dir, 'ids'), mmap=mmap)
+        indexer.version = manifest['index_version']
+        if len(indexer.texts) != manifest['n_chunks']:
+            raise ValueError(f"Index artifact in {index_dir} is incomplete")
+        return indexer
+
+def read_chunks(input_dir, doc_ids=None):
+    """Return (ids, texts) for every non-empty chunk in the chunk files of input_dir (optionally only doc_ids)."""
+    ids, texts = [], []
+    for fname in sorted(os.listdir(input_dir)):
         if fname.endswith('.txt'):
+            doc_id = fname[:-len('.txt')]
+            if doc_ids is not None and doc_id not in doc_ids:
+                continue
             with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
-                texts.extend(f.read().split('\n---\n'))
-    # Remove empty or whitespace-only texts
-    texts = [t.strip() for t in texts if t.strip()]
+                parts = f.read().split(CHUNK_SEPARATOR)
+            # Remove empty or whitespace-only texts
+            for n, part in enumerate(parts):
+                if part.strip():
+                    ids.append(chunk_id(doc_id, n))
+                    texts.append(part.strip())
+    return ids, texts
+
+def process_dir(input_dir, index_dir=None, index_type='sparse', manifest=None, **index_params):
+    if manifest and index_dir:
+        return update_dir(input_dir, index_dir, manifest, index_type=index_type, **index_params)
+    ids, texts = read_chunks(input_dir)
     if not texts:
         print("[Indexer] No valid text chunks found in directory. Skipping indexing.")
         return None
-    indexer = SimpleIndexer()
-    indexer.fit(texts)
+    indexer = SimpleIndexer(index_type=index_type, **index_params)
+    indexer.fit(texts, ids=ids)
+    if index_dir:
+        indexer.save(index_dir)
+        print(f"[Indexer] Saved {len(texts)} chunks to {index_dir} (version {indexer.version}).")
+    return indexer
+
+def update_dir(input_dir, index_dir, manifest, index_type='sparse', max_append_ratio=0.5, **index_params):
+    """
+    Incremental indexing driven by the ingestion manifest. New documents are
+    appended to the saved index; a changed or removed document, a missing or
+    foreign artifact, or appending more than max_append_ratio of the indexed
+    chunks (vocabulary/IDF drift) triggers a full refit instead.
+    """
+    version = f"{INDEX_FORMAT_VERSION}+{index_type}"
+    docs = {fname[:-len('.txt')]: os.path.join(input_dir, fname)
+            for fname in sorted(os.listdir(input_dir)) if fname.endswith('.txt')}
+    indexed = set(manifest.doc_ids('index'))
+    stale = [d for d in docs if not manifest.is_current('index', d, [docs[d]], version)]
+    removed = indexed - set(docs)
+    new = [d for d in stale if d not in indexed]
+    artifact = os.path.join(index_dir, MANIFEST_FILE)
+    indexer = None
+    # Append only onto the exact artifact the manifest describes.
+    if indexed and len(new) == len(stale) and not removed and os.path.exists(artifact) and all(
+            manifest.entry('index', d)['outputs'].get(artifact) == manifest.hash(artifact) for d in indexed):
+        try:
+            indexer = load_index(index_dir, mmap=not stale)
+        except (ValueError, OSError, RuntimeError):
+            indexer = None
+        if indexer is not None and indexer.index_type != index_type:
+            indexer = None
+    if indexer is not None and not stale:
+        print(f"[Indexer] Index is up to date ({len(indexer.texts)} chunks).")
+        return indexer
+    if indexer is not None:
+        ids, texts = read_chunks(input_dir, doc_ids=set(new))
+        if len(texts) > max_append_ratio * len(indexer.texts):
+            indexer = None
+        elif texts:
+            indexer.add(texts, ids)
+            indexer.save(index_dir)
+            print(f"[Indexer] Appended {len(texts)} chunks from {len(new)} new documents (version {indexer.version}).")
+    if indexer is None:
+        indexer = process_dir(input_dir, index_dir=index_dir, index_type=index_type, **index_params)
+        for d in removed:
+            manifest.forget('index', d)
+    if indexer is not None:
+        # Re-record every document: the artifact hash changed with the save.
+        for d in docs:
+            manifest.record('index', d, [docs[d]], [artifact], version)
+        manifest.save()
+    return indexer
+
+def load_index(index_dir, mmap=True):
+    """Load a saved index artifact, or return None if there is none."""
+    if not os.path.exists(os.path.join(index_dir, MANIFEST_FILE)):
+        return None
+    return SimpleIndexer.load(index_dir, mmap=mmap)
+
+def load_or_build(index_dir, chunk_dir, index_type='sparse'):
+    """Open the saved index if present; otherwise fit it from chunk_dir and save it."""
+    try:
+        indexer = load_index(index_dir)
+    except (ValueError, OSError, RuntimeError) as e:
+        print(f"[Indexer] Could not load {index_dir} ({e}); rebuilding.")
+        indexer = None
+    if indexer is None:
+        indexer = process_dir(chunk_dir, index_dir=index_dir, index_type=index_type)
     return indexer
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""
+Persistent entity-linking cache and pluggable knowledge-base backends.
+The cache is a SQLite file (WAL mode) shared safely by pool workers; negative
+results expire after a TTL so unresolved names are retried eventually.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import requests
+
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+NEGATIVE_TTL = 7 * 24 * 3600
+
+def canonical_key(entity):
+    """Cache key for a surface form: whitespace-collapsed and case-folded."""
+    return re.sub(r'\s+', ' ', entity).strip().casefold()
+
+class LinkCache:
+    def __init__(self, path, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._conn = None
+        self._pid = None
+
+    @property
+    def conn(self):
+        # One connection per process: SQLite handles must not cross a fork.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS links "
+                               "(key TEXT PRIMARY KEY, kb_id TEXT, updated REAL NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys):
+        """Return {key: kb_id or None} for cached keys; expired negatives count as misses."""
+        found = {}
+        now = time.time()
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, kb_id, updated FROM links WHERE key IN ({','.join('?' * len(batch))})", batch)
+            for key, kb_id, updated in rows:
+                if kb_id is not None or now - updated < self.negative_ttl:
+                    found[key] = kb_id
+        return found
+
+    def put_many(self, results):
+        """Store {key: kb_id or None}; None records a negative result."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO links (key, kb_id, updated) VALUES (?, ?, ?)",
+                                  [(key, kb_id, now) for key, kb_id in results.items()])
+
+class WikidataBackend:
+    """Batched exact-title lookup via wbgetentities (up to 50 English Wikipedia titles per request)."""
+    batch_size = 50
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def lookup_many(self, names):
+        """Return {name: QID} for the names that resolved; raises on network errors."""
+        results = {}
+        for i in range(0, len(names), self.batch_size):
+            batch = names[i:i + self.batch_size]
+            titles = {name[:1].upper() + name[1:]: name for name in batch}
+            resp = requests.get(WIKIDATA_API, params={
+                'action': 'wbgetentities', 'sites': 'enwiki', 'titles': '|'.join(titles),
+                'props': 'sitelinks', 'sitefilter': 'enwiki', 'format': 'json',
+            }, timeout=self.timeout)
+            resp.raise_for_status()
+            for qid, entity in resp.json().get('entities', {}).items():
+                title = entity.get('sitelinks', {}).get('enwiki', {}).get('title')
+                if 'missing' not in entity and title in titles:
+                    results[titles[title]] = qid
+        return results
+
+class WikidataSearchBackend:
+    """Fuzzy wbsearchentities lookup; one request per name, so prefer WikidataBackend for bulk runs."""
+    def __init__(self, timeout=2):
+        self.timeout = timeout
+
+    def lookup_many(self, names):
+        results = {}
+        for name in names:
+            resp = requests.get(WIKIDATA_API, params={
+                'action': 'wbsearchentities', 'search': name, 'language': 'en', 'format': 'json', 'limit': 1,
+            }, timeout=self.timeout)
+            resp.raise_for_status()
+            hits = resp.json().get('search')
+            if hits:
+                results[name] = hits[0]['id']
+        return results
+
+class DictionaryBackend:
+    """Offline stand-in: a JSON file mapping surface forms to KB IDs."""
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as f:
+            self.table = {canonical_key(k): v for k, v in json.load(f).items()}
+
+    def lookup_many(self, names):
+        return {name: self.table[canonical_key(name)] for name in names if canonical_key(name) in self.table}
+
+class NullBackend:
+    """Resolves nothing; every entity falls back to its hash-based canonical name."""
+    def lookup_many(self, names):
+        return {}
+
+def backend_from_spec(spec):
+    """'wikidata' (default), 'wikidata-search', 'dict:<path.json>' or 'none'."""
+    spec = spec or 'wikidata'
+    if spec == 'wikidata':
+        return WikidataBackend()
+    if spec == 'wikidata-search':
+        return WikidataSearchBackend()
+    if spec.startswith('dict:'):
+        return DictionaryBackend(spec[len('dict:'):])
+    if spec == 'none':
+        return NullBackend()
+    raise ValueError(f"Unknown link backend {spec!r}")
@@ -0,0 +1,76 @@
+"""
+Content-hash manifest for incremental ingestion.
+Records, per document and stage, the hashes of the stage inputs and outputs and
+the stage/model version, so each stage can skip documents that are up to date.
+"""
+import os
+import json
+import hashlib
+
+MANIFEST_FORMAT_VERSION = 1
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.docs = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format_version') == MANIFEST_FORMAT_VERSION:
+                self.docs = data.get('docs', {})
+        # (path, mtime, size) -> hash, so a file is hashed at most once per run
+        self._hashes = {}
+
+    def hash(self, path):
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        if key not in self._hashes:
+            self._hashes[key] = file_hash(path)
+        return self._hashes[key]
+
+    def entry(self, stage, doc_id):
+        return self.docs.get(doc_id, {}).get(stage)
+
+    def doc_ids(self, stage):
+        return [doc_id for doc_id, stages in self.docs.items() if stage in stages]
+
+    def is_current(self, stage, doc_id, inputs, version):
+        """
+        True if stage already ran on exactly these inputs with this version and
+        its recorded outputs still exist. Output contents are not re-checked,
+        because later stages may legitimately rewrite them (e.g. in-place alignment).
+        """
+        entry = self.entry(stage, doc_id)
+        if not entry or entry['version'] != version:
+            return False
+        if set(entry['inputs']) != set(inputs):
+            return False
+        for path in inputs:
+            if not os.path.exists(path) or self.hash(path) != entry['inputs'][path]:
+                return False
+        return all(os.path.exists(path) for path in entry['outputs'])
+
+    def record(self, stage, doc_id, inputs, outputs, version):
+        """Record a finished stage; pass outputs as inputs for stages that rewrite files in place."""
+        self.docs.setdefault(doc_id, {})[stage] = {
+            'version': version,
+            'inputs': {path: self.hash(path) for path in inputs},
+            'outputs': {path: self.hash(path) for path in outputs if os.path.exists(path)},
+        }
+
+    def forget(self, stage, doc_id):
+        self.docs.get(doc_id, {}).pop(stage, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'format_version': MANIFEST_FORMAT_VERSION, 'docs': self.docs}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
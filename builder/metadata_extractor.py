@@ -2,25 +2,108 @@
 Extract metadata (NER, skills, experience) from text chunks.
 """
 import os
-import spacy
 import json
+from importlib import metadata
+from builder.semantic_chunker import read_chunks
+from model import registry
 
-nlp = spacy.load("en_core_web_sm")
+# Only doc.ents is used: skip everything but the entity recognizer. In the
+# en_core_web_* pipelines "ner" has its own internal tok2vec layer.
+NER_EXCLUDED = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+NER_MODEL = "en_core_web_sm"
+# Loaded on first use and shared with every other user of the registry entry
+registry.register('spacy_ner', registry.spacy_model(NER_MODEL, exclude=NER_EXCLUDED))
+
+def nlp():
+    return registry.get('spacy_ner')
+
+def metadata_version():
+    """
+    Stage version recorded in the ingestion manifest: extractor logic + spaCy
+    model. The model version is read from its package metadata, so checking
+    the manifest does not load the model.
+    """
+    try:
+        model_version = metadata.version(NER_MODEL)
+    except metadata.PackageNotFoundError:
+        model_version = nlp().meta['version']
+    # Same string as spaCy's meta name ("core_web_sm"), so existing manifests stay valid
+    return f"2+{NER_MODEL.partition('_')[2]}-{model_version}"
 
 def extract_metadata(text):
-    doc = nlp(text)
+    doc = nlp()(text)
     entities = [(ent.text, ent.label_) for ent in doc.ents]
     return {"entities": entities}
 
-def process_dir(input_dir, output_dir):
+def extract_metadata_stream(records, batch_size=64, n_process=1):
+    """
+    Run NER over an iterable of (chunk_id, text) with nlp.pipe and yield
+    (chunk_id, mentions) in input order. Each mention carries its chunk ID and
+    character offsets within that chunk.
+    """
+    stream = ((text, cid) for cid, text in records)
+    for doc, cid in nlp().pipe(stream, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        yield cid, [{"text": ent.text, "label": ent.label_, "chunk_id": cid,
+                     "start": ent.start_char, "end": ent.end_char} for ent in doc.ents]
+
+def _chunk_records(paths):
+    """(doc_id, chunk_id, text) for every non-empty chunk of each (doc_id, path)."""
+    for doc_id, path in paths:
+        for cid, text in read_chunks(path, doc_id):
+            yield doc_id, cid, text
+
+def _write_metadata(path, mentions):
+    meta = {"entities": [(m["text"], m["label"]) for m in mentions], "mentions": mentions}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+def process_dir(input_dir, output_dir, manifest=None, batch_size=64, n_process=1):
+    """
+    Stream the chunks of every stale document through one nlp.pipe call, so
+    batches span documents and n_process > 1 spreads NER over several cores.
+    """
     os.makedirs(output_dir, exist_ok=True)
+    version = metadata_version()
+    pending = []
     for fname in os.listdir(input_dir):
         if fname.endswith('.txt'):
-            with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
-                text = f.read()
-            meta = extract_metadata(text)
-            with open(os.path.join(output_dir, fname.replace('.txt', '.json')), 'w', encoding='utf-8') as f:
-                json.dump(meta, f, indent=2)
+            in_path = os.path.join(input_dir, fname)
+            doc_id = fname[:-len('.txt')]
+            if manifest and manifest.is_current('metadata', doc_id, [in_path], version):
+                continue
+            pending.append((doc_id, in_path))
+    in_paths = dict(pending)
+    out_paths = {doc_id: os.path.join(output_dir, doc_id + '.json') for doc_id in in_paths}
+    doc_of_chunk = {}
+    def records():
+        for doc_id, cid, text in _chunk_records(pending):
+            doc_of_chunk[cid] = doc_id
+            yield cid, text
+
+    def finish(doc_id, mentions):
+        _write_metadata(out_paths[doc_id], mentions)
+        if manifest:
+            manifest.record('metadata', doc_id, [in_paths[doc_id]], [out_paths[doc_id]], version)
+
+    current, mentions, written = None, [], set()
+    # Results come back in input order, so a document is complete when the next one starts.
+    for cid, chunk_mentions in extract_metadata_stream(records(), batch_size=batch_size, n_process=n_process):
+        doc_id = doc_of_chunk.pop(cid)
+        if doc_id != current:
+            if current is not None:
+                finish(current, mentions)
+                written.add(current)
+            current, mentions = doc_id, []
+        mentions.extend(chunk_mentions)
+    if current is not None:
+        finish(current, mentions)
+        written.add(current)
+    for doc_id in in_paths:
+        if doc_id not in written:
+            finish(doc_id, [])
+    if manifest:
+        manifest.save()
 
 if __name__ == "__main__":
     process_dir("../data/chunks", "../data/output_json")
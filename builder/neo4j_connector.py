@@ -2,11 +2,29 @@
 Neo4j database handler for storing and querying the knowledge graph.
 """
 from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
 import os
+import re
+import time
+import uuid
+from collections import defaultdict
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '../config/.env'))
 
+# Every loaded node also gets this label; its unique name constraint backs all MERGE/MATCH lookups.
+BASE_LABEL = 'Entity'
+
+def cypher_name(name, default):
+    """Labels and relationship types cannot be parameters; reduce them to safe identifiers."""
+    ident = re.sub(r'\W+', '_', str(name or '')).strip('_')
+    if not ident:
+        return default
+    return ident if not ident[0].isdigit() else '_' + ident
+
+def _batches(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
 
 class Neo4jConnector:
     def __init__(self):
@@ -19,7 +37,92 @@ class Neo4jConnector:
     def create_node(self, label, properties):
         with self.driver.session() as session:
             session.run(f"CREATE (n:{label} $props)", props=properties)
-    # Add more methods as needed
+
+    def ensure_schema(self, labels=()):
+        """
+        Uniqueness constraint on name for Entity and for each label (idempotent).
+        Entity's backs every MERGE/MATCH; the per-label ones back label-scoped
+        lookups. Names embed the exact label, so 'Law' and 'LAW' do not collide.
+        """
+        with self.driver.session() as session:
+            session.run(f"CREATE CONSTRAINT entity_name_unique IF NOT EXISTS "
+                        f"FOR (n:{BASE_LABEL}) REQUIRE n.name IS UNIQUE")
+            for label in sorted(set(labels) - {BASE_LABEL}):
+                escaped = label.replace('`', '``')
+                session.run(f"CREATE CONSTRAINT `uniq_{escaped}_name` IF NOT EXISTS "
+                            f"FOR (n:`{escaped}`) REQUIRE n.name IS UNIQUE")
+
+    def bulk_load(self, nodes, edges, batch_size=10000, max_retries=3, prune=False):
+        """
+        Idempotent bulk load. nodes: iterable of (name, label, props);
+        edges: iterable of (src, tgt, rel_type, props). Rows are grouped by
+        label / relationship type and written with UNWIND + MERGE in explicit
+        write transactions of batch_size rows; failed batches are retried.
+        With prune=True the rows are the whole graph: everything written is
+        stamped with a new load ID, and entities and relationships of earlier
+        loads that were not rewritten are deleted afterwards.
+        """
+        stamp = {'load_id': uuid.uuid4().hex} if prune else {}
+        nodes_by_label = defaultdict(list)
+        for name, label, props in nodes:
+            nodes_by_label[cypher_name(label, BASE_LABEL)].append({'name': name, 'props': {**(props or {}), **stamp}})
+        edges_by_type = defaultdict(list)
+        for u, v, rel_type, props in edges:
+            edges_by_type[cypher_name(rel_type, 'RELATED_TO').upper()].append(
+                {'u': u, 'v': v, 'props': {**(props or {}), **stamp}})
+        self.ensure_schema(nodes_by_label)
+        with self.driver.session() as session:
+            for label, rows in nodes_by_label.items():
+                extra = f", n:`{label}`" if label != BASE_LABEL else ""
+                query = (f"UNWIND $rows AS row MERGE (n:{BASE_LABEL} {{name: row.name}}) "
+                         f"SET n += row.props{extra}")
+                for batch in _batches(rows, batch_size):
+                    self._write_batch(session, query, batch, max_retries)
+            for rel_type, rows in edges_by_type.items():
+                query = (f"UNWIND $rows AS row "
+                         f"MATCH (a:{BASE_LABEL} {{name: row.u}}) MATCH (b:{BASE_LABEL} {{name: row.v}}) "
+                         f"MERGE (a)-[r:`{rel_type}`]->(b) SET r += row.props")
+                for batch in _batches(rows, batch_size):
+                    self._write_batch(session, query, batch, max_retries)
+        if prune:
+            self.prune(stamp['load_id'], batch_size, max_retries)
+        return sum(map(len, nodes_by_label.values())), sum(map(len, edges_by_type.values()))
+
+    def prune(self, load_id, batch_size=10000, max_retries=3):
+        """Delete the relationships and entities not written by load load_id, batch_size at a time."""
+        removed = {}
+        with self.driver.session() as session:
+            for kind, match, delete in (
+                    ('relationships', f"MATCH (:{BASE_LABEL})-[x]->(:{BASE_LABEL})", "DELETE x"),
+                    ('nodes', f"MATCH (x:{BASE_LABEL})", "DETACH DELETE x")):
+                query = (f"{match} WHERE coalesce(x.load_id, '') <> $load_id "
+                         f"WITH x LIMIT $limit {delete} RETURN count(*) AS deleted")
+                removed[kind] = 0
+                while True:
+                    deleted = self._write(session, query, max_retries, load_id=load_id, limit=batch_size)['deleted']
+                    removed[kind] += deleted
+                    if deleted < batch_size:
+                        break
+        if any(removed.values()):
+            print(f"[Neo4j] Pruned {removed['nodes']} nodes and {removed['relationships']} relationships "
+                  f"no longer in the graph.")
+        return removed['nodes'], removed['relationships']
+
+    def _write_batch(self, session, query, rows, max_retries):
+        return self._write(session, query, max_retries, rows=rows)
+
+    def _write(self, session, query, max_retries, **params):
+        """Run query in a write transaction, retrying transient failures; returns its single record, if any."""
+        for attempt in range(max_retries + 1):
+            try:
+                return session.execute_write(lambda tx: tx.run(query, **params).single())
+            except (TransientError, ServiceUnavailable, SessionExpired) as e:
+                if attempt == max_retries:
+                    raise
+                rows = params.get('rows')
+                what = f"Batch of {len(rows)} rows" if rows is not None else "Write"
+                print(f"[Neo4j] {what} failed ({e}); retrying.")
+                time.sleep(2 ** attempt)
 
 if __name__ == "__main__":
     db = Neo4jConnector()
@@ -0,0 +1,210 @@
+"""
+Chunk-windowed transformer relation extraction (REBEL).
+Each chunk is split into sentence-aligned windows that fit the model input;
+all windows of all uncached chunks go through the seq2seq pipeline in
+batches, the generated linearized triplets are parsed, and triples are
+de-duplicated per chunk across overlapping windows. Results are cached per
+chunk-content hash, so unchanged chunks are never re-inferred.
+"""
+import os
+import re
+import json
+import hashlib
+import sqlite3
+from collections import namedtuple
+from model import registry
+
+REBEL_MODEL = 'Babelscape/rebel-large'
+# Bump when windowing, parsing or normalization changes (invalidates the cache)
+EXTRACTOR_VERSION = "1"
+
+Triple = namedtuple('Triple', ['head', 'relation', 'tail', 'chunk_id'])
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;])\s+|\n{2,}')
+
+def _load_rebel(model_name=REBEL_MODEL):
+    from transformers import pipeline
+    return pipeline('text2text-generation', model=model_name, tokenizer=model_name, device=-1)
+
+registry.register('rebel', _load_rebel)
+
+def relation_type(label):
+    """REBEL relation label ('place of birth') as an edge type ('PLACE_OF_BIRTH')."""
+    return re.sub(r'\W+', '_', label.strip()).strip('_').upper()
+
+def parse_triplets(decoded):
+    """Parse REBEL's linearized output: <triplet> head <subj> tail <obj> relation ..."""
+    triplets = []
+    head = tail = relation = ''
+    current = None
+    for token in decoded.replace('<s>', '').replace('<pad>', '').replace('</s>', '').split():
+        if token == '<triplet>':
+            if relation:
+                triplets.append((head.strip(), relation.strip(), tail.strip()))
+                relation = ''
+            head, current = '', 'head'
+        elif token == '<subj>':
+            if relation:
+                triplets.append((head.strip(), relation.strip(), tail.strip()))
+            tail, current = '', 'tail'
+        elif token == '<obj>':
+            relation, current = '', 'relation'
+        elif current == 'head':
+            head += ' ' + token
+        elif current == 'tail':
+            tail += ' ' + token
+        elif current == 'relation':
+            relation += ' ' + token
+    if head and relation and tail:
+        triplets.append((head.strip(), relation.strip(), tail.strip()))
+    return [t for t in triplets if all(t)]
+
+def sentence_windows(text, max_tokens=256, overlap=1, count=None):
+    """
+    Sentence-aligned windows of at most max_tokens (by count, default ~1.3 tokens
+    per word), consecutive windows sharing `overlap` sentences. A sentence longer
+    than the limit becomes its own window and is truncated by the model.
+    """
+    count = count or (lambda s: int(len(s.split()) * 1.3) + 1)
+    sentences = [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+    sizes = [count(s) for s in sentences]
+    windows, start = [], 0
+    while start < len(sentences):
+        end, total = start, 0
+        while end < len(sentences) and (end == start or total + sizes[end] <= max_tokens):
+            total += sizes[end]
+            end += 1
+        windows.append(' '.join(sentences[start:end]))
+        if end >= len(sentences):
+            break
+        start = max(start + 1, end - overlap)
+    return windows
+
+class TripleCache:
+    """SQLite cache: chunk-content hash -> extracted (head, relation, tail) list."""
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    @property
+    def conn(self):
+        # One connection per process, as in builder.link_cache.LinkCache
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS triples (key TEXT PRIMARY KEY, triples TEXT NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys):
+        found, keys = {}, list(keys)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, triples FROM triples WHERE key IN ({','.join('?' * len(batch))})", batch)
+            found.update((key, [tuple(t) for t in json.loads(value)]) for key, value in rows)
+        return found
+
+    def put_many(self, results):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO triples (key, triples) VALUES (?, ?)",
+                                  [(key, json.dumps(value)) for key, value in results.items()])
+
+class RebelExtractor:
+    def __init__(self, model_name=REBEL_MODEL, batch_size=8, num_threads=None, max_window_tokens=256,
+                 overlap_sentences=1, max_new_tokens=256, cache_path=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.max_window_tokens = max_window_tokens
+        self.overlap_sentences = overlap_sentences
+        self.max_new_tokens = max_new_tokens
+        cache_path = cache_path or os.getenv('KAG_REBEL_CACHE', 'data/rebel_cache.sqlite')
+        self.cache = TripleCache(cache_path) if cache_path != 'none' else None
+        self.stats = {'chunks': 0, 'cached': 0, 'windows': 0}
+
+    def settings(self):
+        """Constructor arguments that recreate this extractor in another process."""
+        return {'model_name': self.model_name, 'batch_size': self.batch_size, 'num_threads': self.num_threads,
+                'max_window_tokens': self.max_window_tokens, 'overlap_sentences': self.overlap_sentences,
+                'max_new_tokens': self.max_new_tokens, 'cache_path': self.cache.path if self.cache else 'none'}
+
+    def chunk_key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{EXTRACTOR_VERSION}\0{self.max_window_tokens}\0"
+                              f"{self.overlap_sentences}\0{text}".encode('utf-8')).hexdigest()
+
+    def _model(self):
+        if self.model_name == REBEL_MODEL:
+            model = registry.get_optional('rebel')
+        else:
+            name = f'rebel:{self.model_name}'
+            registry.register(name, lambda: _load_rebel(self.model_name))
+            model = registry.get_optional(name)
+        if model is not None and self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+        return model
+
+    def _infer(self, model, windows):
+        """Triplets for each window, generated in batches."""
+        outputs = model(windows, batch_size=self.batch_size, return_tensors=True, return_text=False,
+                        max_new_tokens=self.max_new_tokens, truncation=True)
+        decoded = model.tokenizer.batch_decode([out['generated_token_ids'] for out in outputs],
+                                               skip_special_tokens=False)
+        return [parse_triplets(text) for text in decoded]
+
+    def cached(self, chunks):
+        """{chunk_id: [Triple]} for the (chunk_id, text) pairs already in the cache; never runs the model."""
+        if not self.cache:
+            return {}
+        keys = {cid: self.chunk_key(text) for cid, text in chunks}
+        found = self.cache.get_many(set(keys.values()))
+        return {cid: [Triple(h, r, t, cid) for h, r, t in found[key]] for cid, key in keys.items() if key in found}
+
+    def extract(self, chunks):
+        """
+        {chunk_id: [Triple]} for an iterable of (chunk_id, text). Cached chunks
+        are answered from the cache; the rest are inferred together. If the
+        model is unavailable, uncached chunks get no triples (and are not cached).
+        """
+        chunks = [(cid, text) for cid, text in chunks if text and text.strip()]
+        keys = {cid: self.chunk_key(text) for cid, text in chunks}
+        cached = self.cache.get_many(set(keys.values())) if self.cache else {}
+        self.stats['chunks'] += len(chunks)
+        results = {}
+        todo = []
+        for cid, text in chunks:
+            if keys[cid] in cached:
+                self.stats['cached'] += 1
+                results[cid] = [Triple(h, r, t, cid) for h, r, t in cached[keys[cid]]]
+            else:
+                todo.append((cid, text))
+        if not todo:
+            return results
+        model = self._model()
+        if model is None:
+            results.update((cid, []) for cid, _ in todo)
+            return results
+        count = lambda s: len(model.tokenizer.tokenize(s))
+        owners, windows = [], []
+        for cid, text in todo:
+            for window in sentence_windows(text, self.max_window_tokens, self.overlap_sentences, count):
+                owners.append(cid)
+                windows.append(window)
+        self.stats['windows'] += len(windows)
+        per_chunk = {cid: {} for cid, _ in todo}
+        for cid, triplets in zip(owners, self._infer(model, windows)):
+            for head, relation, tail in triplets:
+                # Overlapping windows repeat triples; keep the first spelling of each
+                key = (head.casefold(), relation_type(relation), tail.casefold())
+                per_chunk[cid].setdefault(key, (head, relation_type(relation), tail))
+        fresh = {}
+        for cid, _ in todo:
+            triples = list(per_chunk[cid].values())
+            results[cid] = [Triple(h, r, t, cid) for h, r, t in triples]
+            fresh[keys[cid]] = triples
+        if self.cache:
+            self.cache.put_many(fresh)
+        return results
@@ -0,0 +1,181 @@
+"""
+Rule-based relation extraction for legal text.
+Rule sets are loaded from config/relation_rules.json. All trigger phrases of
+all rules are compiled once into a single prefix-factored pattern, so one
+regex pass per chunk finds every trigger however many rules there are. Each
+trigger is then aligned to the nearest NER mention on the rule's side(s),
+within the same sentence and max_gap characters.
+
+Rule fields: relation, triggers, head/tail ('left', 'right' or 'document'),
+optional head_labels/tail_labels restricting the mention's NER label.
+"""
+import os
+import re
+import json
+import hashlib
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from builder.relation_extractor import Triple
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), '../config/relation_rules.json')
+# Stands for the document itself as a relation endpoint (e.g. "disposed on <DATE>")
+DOCUMENT = '<document>'
+SIDES = ('left', 'right', 'document')
+
+# Sentence ends, except after single capitals and common honorifics ("S.M.", "Mr.")
+_SENTENCE_END = re.compile(r'(?<!\b[A-Z])(?<!\bM[rs])(?<!\bMrs)(?<!\bDr)(?<!\bNo)[.!?](?:\s+|$)|\n\s*\n')
+
+def normalize_trigger(phrase):
+    return ' '.join(phrase.casefold().split())
+
+def sentence_spans(text):
+    """[(start, end)] of the sentences in text."""
+    spans, start = [], 0
+    for m in _SENTENCE_END.finditer(text):
+        if m.end() > start:
+            spans.append((start, m.end()))
+        start = m.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+def _trie_pattern(phrases):
+    """
+    Character trie of the phrases as one regex: shared prefixes are factored
+    out, so matching cost at each position depends on the branching of the
+    trie, not on the number of phrases. Spaces match any whitespace run.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    def emit(node):
+        alternatives = []
+        for ch in sorted(c for c in node if c):
+            child = node[ch]
+            atom = r'\s+' if ch == ' ' else re.escape(ch)
+            if child.keys() == {''}:
+                alternatives.append(atom)
+            else:
+                rest = emit({c: n for c, n in child.items() if c})
+                alternatives.append(f"{atom}(?:{rest})?" if '' in child else atom + rest)
+        return alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+    return emit(trie)
+
+def load_rules(path=None):
+    """The parsed rule config (KAG_RELATION_RULES or config/relation_rules.json)."""
+    path = path or os.getenv('KAG_RELATION_RULES', RULES_PATH)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def find_mentions(text, entities):
+    """
+    Mentions of the given (text, label) entities in text, for metadata written
+    before NER offsets were recorded. One pass of a combined pattern.
+    """
+    labels = {}
+    for ent, label in entities:
+        if ent.strip():
+            labels.setdefault(ent, label)
+    if not labels:
+        return []
+    pattern = re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(e) for e in sorted(labels, key=len, reverse=True))
+                         + r')(?!\w)')
+    return [{"text": m.group(), "label": labels[m.group()], "start": m.start(), "end": m.end()}
+            for m in pattern.finditer(text)]
+
+class RuleEngine:
+    def __init__(self, config):
+        self.max_gap = config.get('max_gap', 80)
+        self.cooccur_exclude = set(config.get('cooccur_exclude_labels', ()))
+        self.rules = []
+        for set_name, rules in config.get('rule_sets', {}).items():
+            for rule in rules:
+                if rule['head'] not in SIDES or rule['tail'] not in SIDES or rule['head'] == rule['tail']:
+                    raise ValueError(f"Rule {rule['relation']} in {set_name!r}: head/tail must be two of {SIDES}")
+                self.rules.append({**rule, 'rule_set': set_name,
+                                   'head_labels': set(rule.get('head_labels', ())),
+                                   'tail_labels': set(rule.get('tail_labels', ()))})
+        # Normalized trigger phrase -> rules it fires
+        self.by_trigger = defaultdict(list)
+        for rule in self.rules:
+            for trigger in rule['triggers']:
+                self.by_trigger[normalize_trigger(trigger)].append(rule)
+        self.pattern = re.compile(rf"(?<!\w){_trie_pattern(self.by_trigger)}(?!\w)", re.IGNORECASE) \
+            if self.by_trigger else None
+        self.version = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:8]
+
+    @classmethod
+    def from_config(cls, path=None):
+        return cls(load_rules(path))
+
+    def _nearest(self, mentions, starts, pos, side, labels, bounds):
+        """Closest mention on side of pos, inside bounds (the sentence) and max_gap."""
+        lo, hi = bounds
+        if side == 'left':
+            i = bisect_right(starts, pos) - 1
+            while i >= 0 and mentions[i]['start'] >= lo and pos - mentions[i]['end'] <= self.max_gap:
+                m = mentions[i]
+                if m['end'] <= pos and (not labels or m['label'] in labels):
+                    return m
+                i -= 1
+        else:
+            i = bisect_left(starts, pos)
+            while i < len(mentions) and mentions[i]['end'] <= hi and mentions[i]['start'] - pos <= self.max_gap:
+                m = mentions[i]
+                if not labels or m['label'] in labels:
+                    return m
+                i += 1
+        return None
+
+    def extract(self, chunk_id, text, mentions):
+        """Triples for one chunk; mentions are its NER spans (text, label, start, end)."""
+        if self.pattern is None or not text:
+            return []
+        mentions = sorted(mentions, key=lambda m: m['start'])
+        starts = [m['start'] for m in mentions]
+        sentences = sentence_spans(text)
+        sentence_starts = [s for s, _ in sentences]
+        triples = []
+        for m in self.pattern.finditer(text):
+            bounds = sentences[max(bisect_right(sentence_starts, m.start()) - 1, 0)]
+            for rule in self.by_trigger[normalize_trigger(m.group())]:
+                ends = {}
+                for role in ('head', 'tail'):
+                    side = rule[role]
+                    if side == 'document':
+                        ends[role] = DOCUMENT
+                        continue
+                    pos = m.start() if side == 'left' else m.end()
+                    found = self._nearest(mentions, starts, pos, side, rule[f'{role}_labels'], bounds)
+                    if found is None:
+                        break
+                    ends[role] = found['text']
+                if len(ends) == 2 and ends['head'] != ends['tail']:
+                    triples.append(Triple(ends['head'], rule['relation'], ends['tail'], chunk_id))
+        return list(dict.fromkeys(triples))
+
+    def cooccurrence(self, text, mentions, window='sentence'):
+        """
+        Counter of (a, b) entity-text pairs (a < b) that occur in the same
+        sentence, or anywhere in the chunk with window='chunk'.
+        """
+        mentions = [m for m in mentions if m['label'] not in self.cooccur_exclude]
+        if window == 'chunk':
+            groups = [mentions]
+        else:
+            sentences = sentence_spans(text)
+            sentence_starts = [s for s, _ in sentences]
+            grouped = defaultdict(list)
+            for m in mentions:
+                grouped[max(bisect_right(sentence_starts, m['start']) - 1, 0)].append(m)
+            groups = grouped.values()
+        pairs = Counter()
+        for group in groups:
+            names = sorted({m['text'] for m in group})
+            for i, a in enumerate(names):
+                for b in names[i + 1:]:
+                    pairs[(a, b)] += 1
+        return pairs
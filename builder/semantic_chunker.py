@@ -4,6 +4,20 @@ Break text into semantic chunks for downstream processing.
 import os
 import re
 
+CHUNK_SEPARATOR = '\n---\n'
+# Bump when chunk_text output changes, so the manifest re-chunks every document.
+CHUNKER_VERSION = "1"
+
+def chunk_id(doc_id, n):
+    """Stable chunk identifier: source document name plus chunk position."""
+    return f"{doc_id}#{n}"
+
+def read_chunks(path, doc_id):
+    """(chunk_id, text) for every non-empty chunk in a chunk file."""
+    with open(path, encoding='utf-8') as f:
+        parts = f.read().split(CHUNK_SEPARATOR)
+    return [(chunk_id(doc_id, n), part.strip()) for n, part in enumerate(parts) if part.strip()]
+
 def chunk_text(text, chunk_size=500):
     sentences = re.split(r'(?<=[.!?]) +', text)
     chunks, chunk = [], ''
@@ -17,15 +31,24 @@ def chunk_text(text, chunk_size=500):
         chunks.append(chunk.strip())
     return chunks
 
-def process_dir(input_dir, output_dir):
+def process_dir(input_dir, output_dir, manifest=None):
     os.makedirs(output_dir, exist_ok=True)
     for fname in os.listdir(input_dir):
         if fname.endswith('.txt'):
-            with open(os.path.join(input_dir, fname), encoding='utf-8') as f:
+            in_path = os.path.join(input_dir, fname)
+            out_path = os.path.join(output_dir, fname)
+            doc_id = fname[:-len('.txt')]
+            if manifest and manifest.is_current('chunk', doc_id, [in_path], CHUNKER_VERSION):
+                continue
+            with open(in_path, encoding='utf-8') as f:
                 text = f.read()
             chunks = chunk_text(text)
-            with open(os.path.join(output_dir, fname), 'w', encoding='utf-8') as f:
-                f.write('\n---\n'.join(chunks))
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(CHUNK_SEPARATOR.join(chunks))
+            if manifest:
+                manifest.record('chunk', doc_id, [in_path], [out_path], CHUNKER_VERSION)
+    if manifest:
+        manifest.save()
 
 if __name__ == "__main__":
     process_dir("data/extracted_texts", "data/chunks")
@@ -0,0 +1,61 @@
+"""
+Compact on-disk string table: one UTF-8 blob plus an offsets array.
+Both files can be memory-mapped so several processes share one copy.
+"""
+import os
+import numpy as np
+
+
+class StringTable:
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.blob[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self):
+        data = bytes(self.blob)
+        bounds = self.offsets.tolist()
+        return [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    def save(self, path_prefix):
+        # The blob is written raw (not .npy) so it can be mapped without a header.
+        with open(path_prefix + '.bin', 'wb') as f:
+            f.write(np.asarray(self.blob, dtype=np.uint8).tobytes())
+        np.save(path_prefix + '.offsets.npy', np.asarray(self.offsets, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path_prefix, mmap=True):
+        offsets = np.load(path_prefix + '.offsets.npy', mmap_mode='r' if mmap else None)
+        blob_path = path_prefix + '.bin'
+        if os.path.getsize(blob_path) == 0:
+            blob = np.zeros(0, dtype=np.uint8)
+        elif mmap:
+            blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            blob = np.fromfile(blob_path, dtype=np.uint8)
+        return cls(blob, offsets)
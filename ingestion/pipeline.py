@@ -1,18 +1,30 @@
 """
 Full pipeline: PDF → Chunk → Graph + Vector
 """
+import os
+
 from builder.extract_text import batch_extract
 from builder.semantic_chunker import process_dir as chunk_process
 from builder.metadata_extractor import process_dir as meta_process
+from builder.entity_resolution import process_dir as resolve_process
 from builder.concept_aligner import process_dir as align_process
 from builder.graph_builder import process_dir as graph_process
+from builder.graph_store import process_dir as store_process
 from builder.indexer import process_dir as index_process
+from builder.manifest import Manifest
 
 if __name__ == "__main__":
-    # batch_extract("data/raw_pdfs", "data/extracted_texts")
-    chunk_process("data/extracted_texts", "data/chunks")
-    meta_process("data/chunks", "data/output_json")
-    align_process("data/output_json", "data/output_json")
-    graph_process("data/output_json", "data/graphs")
-    index_process("data/chunks")
-    print("Pipeline complete.")
+    # Each stage consults the manifest and only processes new or changed documents.
+    manifest = Manifest("data/manifest.json")
+    # PDF extraction (OCR) is the slow stage; opt in with KAG_EXTRACT=1.
+    if os.getenv('KAG_EXTRACT', '0') == '1':
+        batch_extract("data/raw_pdfs", "data/extracted_texts", parallel=True, workers=None, dpi=300)
+    chunk_process("data/extracted_texts", "data/chunks", manifest=manifest)
+    meta_process("data/chunks", "data/output_json", manifest=manifest)
+    # Corpus-level entity resolution; align and graph consult the alias table it writes
+    resolve_process("data/output_json", "data/aliases.json")
+    align_process("data/output_json", "data/output_json", manifest=manifest)
+    graph_process("data/output_json", "data/graphs", manifest=manifest, chunk_dir="data/chunks")
+    store_process("data/graphs", "data/graph_store", manifest=manifest)
+    index_process("data/chunks", index_dir="data/index", manifest=manifest)
+    print("Pipeline complete.")
\ No newline at end of file
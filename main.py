@@ -2,7 +2,8 @@
 Single entrypoint for the KAG system.
 Usage:
     python main.py pipeline      # Run the full data pipeline
-    python main.py query         # Run extraction, chunking, metadata, and start the CLI for question answering
+    python main.py serve         # Start the query service (loads index, graph and models once)
+    python main.py query         # Start the CLI for question answering (client of the query service)
     python main.py visualize     # Visualize the knowledge graph
 """
 import sys
@@ -18,20 +19,21 @@ def ensure_data_dirs():
 if __name__ == "__main__":
     ensure_data_dirs()
     if len(sys.argv) < 2:
-        print("Usage: python main.py [pipeline|query|visualize]")
+        print("Usage: python main.py [pipeline|serve|query|visualize]")
         sys.exit(1)
     cmd = sys.argv[1].lower()
     if cmd == "pipeline":
         subprocess.run([sys.executable, "ingestion/pipeline.py"])
+    elif cmd == "serve":
+        from app.service import serve
+        serve()
     elif cmd == "query":
-        # Run extraction, chunking, and metadata steps consecutively before CLI
-        subprocess.run([sys.executable, "builder/extract_text.py"])
-        subprocess.run([sys.executable, "builder/semantic_chunker.py"])
-        subprocess.run([sys.executable, "builder/metadata_extractor.py"])
-        subprocess.run([sys.executable, "app/query_interface.py"])
+        # Artifacts come from `main.py pipeline`; the CLI only talks to the query service
+        from app.query_interface import main as query_main
+        query_main()
     elif cmd == "visualize":
-        subprocess.run([sys.executable, "app/visualization.py"])
+        subprocess.run([sys.executable, "-m", "app.visualization"])
     else:
         print(f"Unknown command: {cmd}")
-        print("Usage: python main.py [pipeline|query|visualize]")
+        print("Usage: python main.py [pipeline|serve|query|visualize]")
         sys.exit(1)
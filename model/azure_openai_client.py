@@ -3,22 +3,70 @@ Azure OpenAI LLM handler for text generation.
 """
 import openai
 import os
+import random
+import asyncio
 from dotenv import load_dotenv
+from model.response_cache import cache_from_env, exact_key, near_key, hint_chunk_ids
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '../config/.env'))
 
+_DEFAULT = object()
+ERROR_RESPONSE = "[LLM Error: Unable to generate response]"
+# Errors worth retrying: throttling and transient transport failures
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
 
+def retry_delay(attempt, error=None, base=1.0, cap=30.0):
+    """Backoff before retry number attempt: the server's Retry-After if given, else full-jitter exponential."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return min(float(headers.get('retry-after')), cap)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(cap, base * 2 ** attempt))
 
 class AzureOpenAIClient:
-    def __init__(self):
+    def __init__(self, cache=_DEFAULT, max_concurrency=None, max_retries=5):
         self.client = openai.AzureOpenAI(
             api_key=os.getenv('AZURE_OPENAI_API_KEY'),
             azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
             api_version=os.getenv('AZURE_OPENAI_API_VERSION')
         )
+        # ResponseCache, or None to always call the deployment
+        self.cache = cache_from_env() if cache is _DEFAULT else cache
+        self.max_concurrency = max_concurrency or int(os.getenv('KAG_LLM_CONCURRENCY', '4'))
+        self.max_retries = max_retries
+        self._async = None    # (event loop, async client, semaphore)
 
-    def generate(self, prompt, max_tokens=1024, temperature=0.2):
+    def _cache_keys(self, deployment, prompt, max_tokens, temperature, cache_hint):
+        if self.cache is None:
+            return []
+        keys = [exact_key(deployment, prompt, max_tokens, temperature)]
+        if cache_hint and cache_hint.get('question'):
+            keys.append(near_key(deployment, cache_hint['question'], hint_chunk_ids(cache_hint)))
+        return keys
+
+    def _cached(self, keys):
+        for key in keys:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        return None
+
+    def _store(self, keys, text):
+        for key in keys:
+            self.cache.put(key, text)
+
+    def generate(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        """
+        Generate a completion for prompt. cache_hint ({'question', 'chunk_ids'} or
+        {'question', 'context'}) also lets a repeated question over the same
+        chunks reuse an earlier answer even if the prompt text differs.
+        """
         deployment = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+        keys = self._cache_keys(deployment, prompt, max_tokens, temperature, cache_hint)
+        cached = self._cached(keys)
+        if cached is not None:
+            return cached
         try:
             response = self.client.chat.completions.create(
                 model=deployment,
@@ -26,7 +74,89 @@ class AzureOpenAIClient:
                 max_tokens=max_tokens,
                 temperature=temperature
             )
-            return response.choices[0].message.content.strip()
+            text = response.choices[0].message.content.strip()
         except Exception as e:
             print(f"[AzureOpenAIClient] Error: {e}")
-            return "[LLM Error: Unable to generate response]"
+            return ERROR_RESPONSE
+        self._store(keys, text)
+        return text
+
+    def close(self):
+        self.client.close()
+
+    # --- async ---
+    def _loop_state(self):
+        """
+        (async client, semaphore), created on first use. The async HTTP pool and the
+        semaphore belong to one event loop, so all async calls must come from the
+        same loop: model.llm_dispatch's process-wide dispatch loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async is None:
+            self._async = (loop, openai.AsyncAzureOpenAI(
+                api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+                azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+                api_version=os.getenv('AZURE_OPENAI_API_VERSION')
+            ), asyncio.Semaphore(self.max_concurrency))
+        elif self._async[0] is not loop:
+            raise RuntimeError("AzureOpenAIClient async calls must run on one event loop; "
+                               "dispatch them through model.llm_dispatch")
+        return self._async[1:]
+
+    async def aclose(self):
+        """Close the async client; call on the loop it was used on."""
+        if self._async is not None:
+            _, aclient, _ = self._async
+            self._async = None
+            await aclient.close()
+
+    async def astream(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        """
+        Async generator of response text deltas. At most max_concurrency requests
+        are in flight per client; throttled or failed requests are retried
+        with backoff as long as no tokens have been yielded yet. The error is
+        raised once retries run out, after tokens were sent, or when it is not
+        retryable (model.llm_dispatch reports it per prompt).
+        """
+        deployment = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+        keys = self._cache_keys(deployment, prompt, max_tokens, temperature, cache_hint)
+        cached = self._cached(keys)
+        if cached is not None:
+            yield cached
+            return
+        aclient, semaphore = self._loop_state()
+        parts = []
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    stream = await aclient.chat.completions.create(
+                        model=deployment,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+                    break
+                except RETRYABLE_ERRORS as e:
+                    # Tokens already went out, or retries are exhausted: let the dispatcher report it
+                    if parts or attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(retry_delay(attempt, e))
+        self._store(keys, ''.join(parts).strip())
+
+    async def agenerate(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        """Full response text; raises like astream (only generate falls back to ERROR_RESPONSE)."""
+        parts = [delta async for delta in self.astream(prompt, max_tokens, temperature, cache_hint)]
+        return ''.join(parts).strip()
+
+def llm_from_env():
+    """AzureOpenAIClient, or the offline MockLLMClient when KAG_LLM_BACKEND=mock."""
+    if os.getenv('KAG_LLM_BACKEND', 'azure') == 'mock':
+        from model.mock_llm import MockLLMClient
+        return MockLLMClient()
+    return AzureOpenAIClient()
@@ -0,0 +1,110 @@
+"""
+Token-budgeted context packing for LLM prompts.
+Retrieved chunks are ordered by retrieval score, near-duplicates are dropped
+(word-shingle Jaccard), and the rest are added as citation-tagged blocks until
+the token budget is spent; the chunk that crosses the budget is trimmed at a
+sentence boundary.
+"""
+import re
+from collections import namedtuple
+
+# Packed prompt context: text is the block string, citations maps tag -> chunk ID.
+PackedContext = namedtuple('PackedContext', ['text', 'citations', 'tokens', 'dropped'])
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w+')
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, otherwise estimates ~4 characters per token."""
+    def __init__(self, encoding='cl100k_base'):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception:
+            self._encoding = None
+
+    def __call__(self, text):
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return max(1, (len(text) + 3) // 4) if text else 0
+
+def shingles(text, n=5):
+    words = _WORD.findall(text.casefold())
+    if len(words) <= n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class ContextPacker:
+    def __init__(self, budget=1500, dedup_threshold=0.8, shingle_size=5, min_block_tokens=24, counter=None):
+        self.budget = budget                    # tokens for all context blocks together
+        self.dedup_threshold = dedup_threshold  # Jaccard at or above this counts as a duplicate
+        self.shingle_size = shingle_size
+        self.min_block_tokens = min_block_tokens
+        self.count_tokens = counter or TokenCounter()
+
+    def _ranked(self, hits):
+        """Hits (or plain strings) as (chunk_id, text) in score order, first-hop chunks first."""
+        rows = []
+        for pos, hit in enumerate(hits):
+            if isinstance(hit, str):
+                rows.append((1, 0.0, pos, f"c{pos + 1}", hit))
+            else:
+                rows.append((getattr(hit, 'hop', 1), -hit.score, pos, hit.chunk_id, hit.text))
+        rows.sort(key=lambda row: row[:3])
+        return [(cid, text) for _, _, _, cid, text in rows]
+
+    def _fit(self, text, budget):
+        """Longest sentence prefix of text within budget tokens ('' if none fits)."""
+        kept = []
+        for sentence in _SENTENCE_END.split(text):
+            if self.count_tokens(' '.join(kept + [sentence])) > budget:
+                break
+            kept.append(sentence)
+        return ' '.join(kept)
+
+    def _truncate_words(self, text, budget):
+        words = text.split()
+        lo, hi = 0, len(words)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.count_tokens(' '.join(words[:mid])) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return ' '.join(words[:lo])
+
+    def pack(self, hits):
+        """Pack hits (Hit-like objects with chunk_id/text/score, or strings) into a PackedContext."""
+        blocks, citations, seen = [], {}, []
+        used, dropped = 0, 0
+        for cid, text in self._ranked(hits):
+            text = ' '.join(text.split())
+            sh = shingles(text, self.shingle_size)
+            if not text or any(jaccard(sh, other) >= self.dedup_threshold for other in seen):
+                dropped += 1
+                continue
+            tag = f"[{len(blocks) + 1}]"
+            header = f"{tag} ({cid}) "
+            remaining = self.budget - used - self.count_tokens(header) - (1 if blocks else 0)
+            if self.count_tokens(text) > remaining:
+                if remaining < self.min_block_tokens and blocks:
+                    dropped += 1
+                    continue
+                trimmed = self._fit(text, remaining)
+                if not trimmed and not blocks:
+                    # Never drop the top-ranked evidence entirely
+                    trimmed = self._truncate_words(text, remaining)
+                if not trimmed:
+                    dropped += 1
+                    continue
+                text = trimmed
+            blocks.append(header + text)
+            citations[tag] = cid
+            seen.append(sh)
+            used = self.count_tokens('\n'.join(blocks))
+        return PackedContext('\n'.join(blocks), citations, used, dropped)
@@ -1,6 +1,23 @@
 """
 Task-specific prompt construction for LLMs.
 """
+from model.context_packer import ContextPacker
+
 class InstructionTuner:
+    def __init__(self, packer=None, budget=1500):
+        self.packer = packer or ContextPacker(budget=budget)
+
+    def build(self, question, context):
+        """
+        Prompt plus the PackedContext it was built from. context is a list of
+        retrieval Hits (or plain chunk strings); it is de-duplicated, ordered by
+        score and trimmed to the packer's token budget.
+        """
+        packed = self.packer.pack(context)
+        prompt = (f"Answer the following based on context: {question}\n"
+                  f"Context:\n{packed.text}\n"
+                  f"Cite the [n] tags of the passages you use.")
+        return prompt, packed
+
     def build_prompt(self, question, context):
-        return f"Answer the following based on context: {question}\nContext: {context}"
+        return self.build(question, context)[0]
@@ -0,0 +1,127 @@
+"""
+Concurrent dispatch of independent LLM calls with token streaming.
+All prompts run on one process-wide background event loop, so an LLM client
+keeps a single async connection pool and concurrency limit across questions;
+synchronous callers such as the CLI, Streamlit and the HTTP service consume
+the tokens through a plain generator as they arrive.
+"""
+import queue
+import atexit
+import asyncio
+import weakref
+import threading
+from itertools import groupby
+
+_DONE = object()
+
+_loop = None
+_loop_lock = threading.Lock()
+# Clients that have run on the loop; their aclose() is awaited at shutdown
+_clients = weakref.WeakSet()
+
+def dispatch_loop():
+    """The background event loop all LLM calls run on, started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='llm-dispatch', daemon=True).start()
+            atexit.register(shutdown)
+        return _loop
+
+def shutdown(timeout=5):
+    """Close the clients used on the dispatch loop, then stop it. A later call starts a new loop."""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    async def close_all():
+        for client in list(_clients):
+            if hasattr(client, 'aclose'):
+                await client.aclose()
+    try:
+        asyncio.run_coroutine_threadsafe(close_all(), loop).result(timeout)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+
+def stream_answers(llm, prompts, hints=None, **gen_kwargs):
+    """
+    Yield (index, delta) for every prompt as tokens arrive, interleaved across
+    prompts; (index, None) marks the end of that prompt's response. If a call
+    fails, its exception is yielded as the delta just before the end marker.
+    """
+    hints = hints or [None] * len(prompts)
+    events = queue.Queue()
+    _clients.add(llm)
+
+    async def run_one(i):
+        try:
+            async for delta in llm.astream(prompts[i], cache_hint=hints[i], **gen_kwargs):
+                events.put((i, delta))
+        except Exception as e:
+            events.put((i, e))
+        finally:
+            events.put((i, None))
+
+    async def run_all():
+        await asyncio.gather(*(run_one(i) for i in range(len(prompts))))
+
+    future = asyncio.run_coroutine_threadsafe(run_all(), dispatch_loop())
+    future.add_done_callback(lambda _: events.put(_DONE))
+    try:
+        while True:
+            event = events.get()
+            if event is _DONE:
+                return
+            yield event
+    finally:
+        # The consumer stopped early (e.g. the HTTP client went away): stop generating
+        future.cancel()
+
+def ordered_stream(events, n):
+    """
+    Reorder (index, delta) events so responses come out whole and in index order:
+    response 0 streams live, later ones are buffered until their turn and then
+    continue live. Each response ends with (index, None).
+    """
+    buffers = [[] for _ in range(n)]
+    done = [False] * n
+    current = 0
+    for i, delta in events:
+        if i != current:
+            buffers[i].append(delta)
+            done[i] = done[i] or delta is None
+            continue
+        yield i, delta
+        if delta is not None:
+            continue
+        current += 1
+        # Flush responses that were buffered (and possibly finished) meanwhile
+        while current < n:
+            for buffered in buffers[current]:
+                yield current, buffered
+            buffers[current] = []
+            if not done[current]:
+                break
+            current += 1
+
+def _deltas(group):
+    for _, delta in group:
+        if isinstance(delta, Exception):
+            raise delta
+        if delta is not None:
+            yield delta
+
+def answer_streams(llm, prompts, hints=None, **gen_kwargs):
+    """
+    (index, delta iterator) per prompt, in order; the calls themselves all run
+    concurrently. Iterating a failed prompt's deltas raises its exception.
+    """
+    ordered = ordered_stream(stream_answers(llm, prompts, hints, **gen_kwargs), len(prompts))
+    for i, group in groupby(ordered, key=lambda event: event[0]):
+        yield i, _deltas(group)
+
+def generate_all(llm, prompts, hints=None, **gen_kwargs):
+    """Full responses for all prompts, generated concurrently."""
+    return [''.join(deltas).strip() for _, deltas in answer_streams(llm, prompts, hints, **gen_kwargs)]
@@ -0,0 +1,35 @@
+"""
+Offline stand-in for AzureOpenAIClient with the same generate/agenerate/astream
+interface. Responses are canned and delayed, so concurrency and streaming can
+be exercised without credentials (KAG_LLM_BACKEND=mock).
+"""
+import time
+import asyncio
+
+class MockLLMClient:
+    def __init__(self, latency=0.5, token_delay=0.02, max_concurrency=4, cache=None):
+        self.latency = latency          # seconds before the first token
+        self.token_delay = token_delay  # seconds between tokens
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.calls = 0
+
+    def respond(self, prompt):
+        question = prompt.split('\n', 1)[0]
+        return f"Mock answer. {question}"
+
+    def generate(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        self.calls += 1
+        text = self.respond(prompt)
+        time.sleep(self.latency + self.token_delay * len(text.split()))
+        return text
+
+    async def astream(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self.respond(prompt).split()):
+            await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
+
+    async def agenerate(self, prompt, max_tokens=1024, temperature=0.2, cache_hint=None):
+        return ''.join([delta async for delta in self.astream(prompt, max_tokens, temperature, cache_hint)])
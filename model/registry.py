@@ -0,0 +1,66 @@
+"""
+Lazy model registry. Modules register a factory for each heavy model (spaCy
+pipelines, transformers pipelines, ...) at import time, which costs nothing;
+the model is built on first get() and then shared by everything in the
+process. warmup() loads models up front, e.g. when a service starts.
+"""
+import threading
+
+_factories = {}
+_instances = {}
+_lock = threading.RLock()
+
+def register(name, factory, replace=False):
+    """Register factory() as the loader for name. Re-registering is a no-op unless replace=True."""
+    with _lock:
+        if name in _factories and not replace:
+            return
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+def get(name):
+    """The model registered as name, loading it on first use. Loader errors propagate."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"No model registered as {name!r}")
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+def get_optional(name):
+    """Like get(), but None if the model cannot be loaded (missing package or weights)."""
+    try:
+        return get(name)
+    except Exception as e:
+        print(f"[registry] {name} unavailable: {e}")
+        register(name, lambda: None, replace=True)
+        return get(name)
+
+def is_loaded(name):
+    return name in _instances
+
+def registered():
+    return sorted(_factories)
+
+def warmup(*names, optional=True):
+    """Load the named models (all registered ones if none are given); returns {name: loaded?}."""
+    status = {}
+    for name in names or registered():
+        model = get_optional(name) if optional else get(name)
+        status[name] = model is not None
+    return status
+
+def unload(name):
+    with _lock:
+        _instances.pop(name, None)
+
+def spacy_model(name, **kwargs):
+    """Factory for a spaCy pipeline; spaCy itself is imported only when the model is first needed."""
+    def load():
+        import spacy
+        return spacy.load(name, **kwargs)
+    return load
@@ -0,0 +1,141 @@
+"""
+Response cache for LLM calls: an in-memory LRU in front of a persistent SQLite
+store. Exact entries are keyed on (deployment, prompt, max_tokens, temperature);
+optional near-duplicate entries are keyed on the normalized question plus the
+set of context chunk IDs. Every entry is tagged with the index version it was
+answered against and stops matching once the index changes.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def exact_key(deployment, prompt, max_tokens, temperature):
+    return 'x:' + _digest([deployment, prompt, max_tokens, temperature])
+
+def normalize_question(question):
+    """Case-folded, punctuation-free, whitespace-collapsed question text."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', question.casefold()).split())
+
+def near_key(deployment, question, chunk_ids):
+    return 'q:' + _digest([deployment, normalize_question(question), sorted(set(chunk_ids))])
+
+def hint_chunk_ids(hint):
+    """Chunk IDs from a cache hint; falls back to content hashes of the context strings."""
+    if hint.get('chunk_ids') is not None:
+        return list(hint['chunk_ids'])
+    return [hashlib.sha1(str(c).encode('utf-8')).hexdigest() for c in hint.get('context', [])]
+
+class ResponseCache:
+    def __init__(self, path=None, max_entries=1024, ttl=None, index_version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_version = index_version
+        self._memory = OrderedDict()    # key -> (response, created, index_version)
+        self._conn = None
+        self._pid = None
+        self.hits = self.misses = 0
+        # Guards the LRU and the shared connection; the dispatcher calls in from several threads
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        # One connection per process, as in builder.link_cache.LinkCache
+        if self.path is None:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                               "response TEXT NOT NULL, created REAL NOT NULL, index_version TEXT)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def _valid(self, created, index_version):
+        if self.ttl is not None and time.time() - created > self.ttl:
+            return False
+        return index_version == self.index_version
+
+    def get(self, key):
+        """Cached response for key, or None if missing, expired or from another index version."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute("SELECT response, created, index_version FROM responses WHERE key = ?",
+                                        (key,)).fetchone()
+                if row:
+                    entry = tuple(row)
+                    self._remember(key, entry)
+            if entry is None or not self._valid(entry[1], entry[2]):
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, response):
+        entry = (response, time.time(), self.index_version)
+        with self._lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("INSERT OR REPLACE INTO responses (key, response, created, index_version) "
+                                      "VALUES (?, ?, ?, ?)", (key, *entry))
+
+    def _remember(self, key, entry):
+        # Caller holds self._lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set_index_version(self, version, purge=False):
+        """Switch to a new index version; entries answered against other versions no longer match."""
+        self.index_version = version
+        if purge:
+            self.invalidate()
+
+    def invalidate(self, all_versions=False):
+        """Drop entries from other index versions (or everything) from memory and disk."""
+        with self._lock:
+            if all_versions:
+                self._memory.clear()
+            else:
+                for key in [k for k, e in self._memory.items() if e[2] != self.index_version]:
+                    del self._memory[key]
+            if self.conn is not None:
+                with self.conn:
+                    if all_versions:
+                        self.conn.execute("DELETE FROM responses")
+                    else:
+                        self.conn.execute("DELETE FROM responses WHERE index_version IS NOT ?",
+                                          (self.index_version,))
+
+    def prune(self):
+        """Delete expired entries from disk."""
+        if self.ttl is None:
+            return
+        with self._lock:
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+
+def cache_from_env():
+    """
+    Cache configured by KAG_LLM_CACHE (SQLite path, default data/llm_cache.sqlite;
+    'none' disables caching) and KAG_LLM_CACHE_TTL (seconds).
+    """
+    path = os.getenv('KAG_LLM_CACHE', 'data/llm_cache.sqlite')
+    if path == 'none':
+        return None
+    ttl = os.getenv('KAG_LLM_CACHE_TTL')
+    return ResponseCache(path, ttl=float(ttl) if ttl else None)
@@ -2,12 +2,38 @@
 Final response generation and summarization for KAG.
 Supports extractive (TF-IDF, entity-aware) and optional abstractive (LLM) modes.
 """
-from sklearn.feature_extraction.text import TfidfVectorizer
+import re
+from functools import lru_cache
+from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
 import numpy as np
 
+@lru_cache(maxsize=256)
+def _entity_pattern(entities):
+    """One alternation over all entities, longest first, so overlapping names never nest."""
+    alternation = '|'.join(re.escape(e) for e in sorted(entities, key=len, reverse=True))
+    return re.compile(f'(?:{alternation})')
+
+def highlight_entities(text, entities, template="**{}**"):
+    """Wrap every occurrence of any entity in text with template, in a single pass."""
+    entities = tuple(sorted({e for e in entities if e}))
+    if not entities:
+        return text
+    return _entity_pattern(entities).sub(lambda m: template.format(m.group(0)), text)
+
 class Summarizer:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english')
+    def __init__(self, vectorizer=None, indexer=None):
+        """
+        vectorizer: a fitted TfidfVectorizer (e.g. SimpleIndexer.vectorizer), so
+        sentences are scored with corpus-level vocabulary and IDF, restricted to
+        its non-stop-word columns. Without one, a vectorizer is fitted per call
+        on the sentences being ranked.
+        """
+        if vectorizer is None and indexer is not None:
+            vectorizer = indexer.vectorizer
+        self.fitted = vectorizer is not None
+        self.vectorizer = vectorizer if self.fitted else TfidfVectorizer(stop_words='english')
+        self._columns = (None, None)   # (vocabulary it was built from, content column indices)
         try:
             import nltk
             nltk.data.find('tokenizers/punkt')
@@ -15,6 +41,12 @@ class Summarizer:
         except Exception:
             self.sent_tokenize = lambda text: text.split('. ')
 
+    def _sentences(self, text):
+        try:
+            return self.sent_tokenize(text)
+        except Exception:
+            return text.split('. ')
+
     def summarize(self, text, query=None, max_sentences=6, max_chars=1200, entities=None, abstractive_llm=None):
         """
         Summarize text using extractive (default) or abstractive (if LLM provided) mode.
@@ -22,32 +54,66 @@ class Summarizer:
         - entities: list of entity strings to highlight in summary
         - abstractive_llm: callable (prompt:str)->str for LLM-based summary
         """
-        if not text or not text.strip():
-            return "[No content to summarize]"
-        # Abstractive mode if LLM provided
-        if abstractive_llm:
+        if abstractive_llm and text and text.strip():
             prompt = f"Summarize the following in {max_sentences} sentences (max {max_chars} chars):\n{text}"
             return abstractive_llm(prompt)[:max_chars]
-        # Extractive mode
-        try:
-            sentences = self.sent_tokenize(text)
-        except Exception:
-            sentences = text.split('. ')
-        if not sentences or len(sentences) == 1:
-            return text[:max_chars]
-        # If query, rank by relevance
-        if query:
-            X = self.vectorizer.fit_transform(sentences + [query])
-            query_vec = X[-1]
-            sent_vecs = X[:-1]
-            scores = sent_vecs @ query_vec.T
-            ranked = np.argsort(-scores.toarray().flatten())
-            selected = [sentences[i] for i in ranked[:max_sentences]]
-        else:
-            selected = sentences[:max_sentences]
-        summary = '. '.join(selected).strip()
-        # Optionally highlight entities
-        if entities:
-            for ent in entities:
-                summary = summary.replace(ent, f"**{ent}**")
-        return summary[:max_chars]
+        return self.summarize_batch([text], [query], max_sentences=max_sentences, max_chars=max_chars,
+                                    entities=entities)[0]
+
+    def summarize_batch(self, texts, queries=None, max_sentences=6, max_chars=1200, entities=None):
+        """
+        Extractive summaries for several texts. With a fitted vectorizer, all
+        sentences and queries are vectorized in one transform and each text's
+        sentences are ranked by one sparse dot product against its query.
+        """
+        queries = list(queries) if queries is not None else [None] * len(texts)
+        summaries = [None] * len(texts)
+        ranked_jobs = []   # (text position, sentences) for texts that need query ranking
+        for pos, (text, query) in enumerate(zip(texts, queries)):
+            if not text or not text.strip():
+                summaries[pos] = "[No content to summarize]"
+                continue
+            sentences = self._sentences(text)
+            if not sentences or len(sentences) == 1:
+                summaries[pos] = text[:max_chars]
+            elif query:
+                ranked_jobs.append((pos, sentences))
+            else:
+                summaries[pos] = '. '.join(sentences[:max_sentences]).strip()
+        if ranked_jobs:
+            for (pos, sentences), order in zip(ranked_jobs, self._rank(ranked_jobs, queries)):
+                summaries[pos] = '. '.join(sentences[i] for i in order[:max_sentences]).strip()
+        for pos, (text, summary) in enumerate(zip(texts, summaries)):
+            if text and text.strip() and entities:
+                summary = highlight_entities(summary, entities)
+            summaries[pos] = summary[:max_chars]
+        return summaries
+
+    def _content_columns(self):
+        """Columns of the fitted vocabulary with no English stop word in the term."""
+        vocab = self.vectorizer.vocabulary_
+        if self._columns[0] is not vocab:
+            cols = sorted(col for term, col in vocab.items()
+                          if not any(tok in ENGLISH_STOP_WORDS for tok in term.split()))
+            self._columns = (vocab, np.asarray(cols, dtype=np.int64))
+        return self._columns[1]
+
+    def _rank(self, jobs, queries):
+        """Sentence indices by descending query relevance, one array per job."""
+        if not self.fitted:
+            orders = []
+            for pos, sentences in jobs:
+                X = self.vectorizer.fit_transform(sentences + [queries[pos]])
+                scores = (X[:-1] @ X[-1].T).toarray().ravel()
+                orders.append(np.argsort(-scores, kind='stable'))
+            return orders
+        sentences = [s for _, sents in jobs for s in sents]
+        X = self.vectorizer.transform(sentences + [queries[pos] for pos, _ in jobs])
+        # Drop stop-word columns and re-normalize, as the per-call vectorizer would.
+        X = normalize(X.tocsc()[:, self._content_columns()].tocsr())
+        S, Q = X[:len(sentences)], X[len(sentences):]
+        # owner[i] is the job that sentence i belongs to
+        owner = np.repeat(np.arange(len(jobs)), [len(sents) for _, sents in jobs])
+        scores = np.asarray(S.multiply(Q[owner]).sum(axis=1)).ravel()
+        bounds = np.cumsum([0] + [len(sents) for _, sents in jobs])
+        return [np.argsort(-scores[bounds[j]:bounds[j + 1]], kind='stable') for j in range(len(jobs))]
@@ -0,0 +1,173 @@
+"""
+Aho-Corasick matcher for graph entities: finds every graph node (by name and
+surface forms) in a text in one pass, in time linear in the text length.
+"""
+import re
+from collections import deque, namedtuple
+
+Match = namedtuple('Match', ['start', 'end', 'surface', 'nodes'])
+
+# Canonical names from graph_builder.link_entity fallback: "<surface>__<md5[:8]>"
+_HASHED_NAME = re.compile(r'^(.*)__[0-9a-f]{8}$', re.S)
+
+def surface_forms(node, data=None):
+    """Strings that identify a graph node in running text."""
+    forms = {str(node)}
+    m = _HASHED_NAME.match(str(node))
+    if m:
+        forms.add(m.group(1))
+    surface = (data or {}).get('surface')
+    if isinstance(surface, str):
+        forms.add(surface)
+    elif surface:
+        forms.update(surface)
+    return {f for f in forms if f.strip()}
+
+class EntityMatcher:
+    """
+    Multi-pattern automaton over node surface forms. Nodes can be added or
+    removed at any time; only the trie insertions are done eagerly, and the
+    failure links are recomputed lazily (one linear pass) before the next match.
+    """
+    def __init__(self, word_boundaries=True):
+        self.word_boundaries = word_boundaries
+        self._goto = [{}]
+        self._fail = [0]
+        self._dict = [-1]   # nearest proper suffix state that ends a pattern
+        self._out = [-1]    # pattern id ending exactly at this state
+        self._surfaces = []         # pattern id -> surface string
+        self._pattern_ids = {}      # surface string -> pattern id
+        self._pattern_nodes = []    # pattern id -> set of nodes
+        self._node_forms = {}       # node -> set of surface strings
+        self._dirty = False
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs):
+        matcher = cls(**kwargs)
+        matcher.sync(graph)
+        return matcher
+
+    def __len__(self):
+        return len(self._node_forms)
+
+    def __contains__(self, node):
+        return node in self._node_forms
+
+    def add(self, node, forms):
+        for form in forms:
+            pid = self._pattern_ids.get(form)
+            if pid is None:
+                pid = self._insert(form)
+            self._pattern_nodes[pid].add(node)
+        self._node_forms.setdefault(node, set()).update(forms)
+
+    def remove(self, node):
+        for form in self._node_forms.pop(node, ()):
+            self._pattern_nodes[self._pattern_ids[form]].discard(node)
+
+    def sync(self, graph):
+        """Bring the automaton in line with graph's nodes and their surface forms (only the diff is applied)."""
+        current = set(graph.nodes)
+        for node in set(self._node_forms) - current:
+            self.remove(node)
+        for node in current:
+            forms = set(surface_forms(node, graph.nodes[node]))
+            if self._node_forms.get(node) != forms:
+                self.remove(node)
+                self.add(node, forms)
+
+    def _insert(self, form):
+        state = 0
+        for ch in form:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._dict.append(-1)
+                self._out.append(-1)
+            state = nxt
+        pid = len(self._surfaces)
+        self._out[state] = pid
+        self._surfaces.append(form)
+        self._pattern_ids[form] = pid
+        self._pattern_nodes.append(set())
+        self._dirty = True
+        return pid
+
+    def _build_links(self):
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._dict[child] = -1
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                f = self._goto[f].get(ch, 0)
+                self._fail[child] = f
+                self._dict[child] = f if self._out[f] >= 0 else self._dict[f]
+                queue.append(child)
+        self._dirty = False
+
+    def _is_boundary(self, text, start, end):
+        if not self.word_boundaries:
+            return True
+        if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+            return False
+        if end < len(text) and text[end - 1].isalnum() and text[end].isalnum():
+            return False
+        return True
+
+    def iter_matches(self, text):
+        """Yield every (possibly overlapping) Match of a live node surface form in text."""
+        if self._dirty:
+            self._build_links()
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            s = state if out[state] >= 0 else dict_link[state]
+            while s > 0:
+                pid = out[s]
+                nodes = self._pattern_nodes[pid]
+                if nodes:
+                    start = pos + 1 - len(self._surfaces[pid])
+                    if self._is_boundary(text, start, pos + 1):
+                        yield Match(start, pos + 1, self._surfaces[pid], frozenset(nodes))
+                s = dict_link[s]
+
+    def find(self, text, overlapping=False):
+        """Matches sorted by offset; by default keeps leftmost-longest, non-overlapping spans."""
+        matches = sorted(self.iter_matches(text), key=lambda m: (m.start, -m.end))
+        if overlapping:
+            return matches
+        kept, last_end = [], -1
+        for m in matches:
+            if m.start >= last_end:
+                kept.append(m)
+                last_end = m.end
+        return kept
+
+    def nodes_in(self, text):
+        """Set of graph nodes mentioned anywhere in text."""
+        found = set()
+        for m in self.iter_matches(text):
+            found.update(m.nodes)
+        return found
+
+    def highlight(self, text, template="**{}**"):
+        """Wrap every matched span of text with template."""
+        parts, last = [], 0
+        for m in self.find(text):
+            parts.append(text[last:m.start])
+            parts.append(template.format(text[m.start:m.end]))
+            last = m.end
+        parts.append(text[last:])
+        return ''.join(parts)
@@ -3,41 +3,107 @@ Graph Reasoner: advanced reasoning over the knowledge graph.
 Supports path finding, subgraph matching, and rule-based inference.
 """
 import networkx as nx
+import numpy as np
+from .traversal import TraversalEngine, Path
+from .pattern_matcher import PatternMatcher, NodePattern, EdgePattern
 
 class GraphReasoner:
     def __init__(self, graph):
-        self.graph = graph
+        # A merged GraphStore is traversed through integer adjacency arrays;
+        # a plain networkx graph keeps using the networkx algorithms.
+        self.store = graph if hasattr(graph, 'to_networkx') else None
+        self.engine = TraversalEngine(graph) if self.store is not None else None
+        self._graph = None if self.store is not None else graph
+        self._matcher = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = self.store.to_networkx()
+        return self._graph
 
-    def find_path(self, source, target, max_hops=3):
+    def find_path(self, source, target, max_hops=3, edge_types=None):
         """Find a path between two entities (if exists)."""
+        if self.engine:
+            path = self.engine.shortest_path(source, target, max_hops=max_hops, edge_types=edge_types)
+            return path.nodes if path else None
         try:
-            return nx.shortest_path(self.graph, source, target, cutoff=max_hops)
+            graph = self.graph
+            if edge_types is not None:
+                graph = nx.subgraph_view(graph, filter_edge=lambda u, v, k: graph[u][v][k].get('type') in edge_types)
+            return nx.shortest_path(graph, source, target, cutoff=max_hops)
         except Exception:
             return None
 
-    def subgraph_match(self, pattern_nodes):
-        """Find subgraphs containing all pattern_nodes."""
-        matches = []
-        for sub_nodes in nx.algorithms.clique.find_cliques(self.graph):
-            if all(n in sub_nodes for n in pattern_nodes):
-                matches.append(sub_nodes)
-        return matches
+    def find_paths(self, source, target, k=3, max_hops=3, edge_types=None):
+        """Up to k shortest paths with the relation type of every hop (GraphStore only)."""
+        if not self.engine:
+            path = self.find_path(source, target, max_hops=max_hops, edge_types=edge_types)
+            return [Path(path, [])] if path else []
+        return self.engine.k_shortest_paths(source, target, k=k, max_hops=max_hops, edge_types=edge_types)
+
+    def subgraph_match(self, pattern, limit=None):
+        """
+        Bindings {var: node} for a typed pattern such as "(a:PERSON)-[SUED]->(b:ORG)".
+        A list of node names matches if the nodes are pairwise connected.
+        """
+        if not isinstance(pattern, str):
+            names = list(pattern)
+            nodes = {f'n{i}': NodePattern(f'n{i}', None, name) for i, name in enumerate(names)}
+            edges = [EdgePattern(f'n{i}', f'n{j}', None, False)
+                     for i in range(len(names)) for j in range(i + 1, len(names))]
+            pattern = (nodes, edges)
+        return self.matcher.match_all(pattern, limit=limit)
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            if self.store is not None:
+                store = self.store
+            else:
+                from builder.graph_store import GraphStore
+                store = GraphStore.from_graphs([self._graph])
+            self._matcher = PatternMatcher(store, self.engine)
+        return self._matcher
 
     def infer_relation(self, src, tgt):
         """Infer possible relation types between src and tgt."""
-        if self.graph.has_edge(src, tgt):
-            return [self.graph[src][tgt][k]['type'] for k in self.graph[src][tgt]]
+        graph = self.store if self.store is not None else self.graph
+        if graph.has_edge(src, tgt):
+            return [graph[src][tgt][k]['type'] for k in graph[src][tgt]]
         return []
 
-    def explain_answer(self, answer_nodes):
-        """Return a reasoning trace for the answer (e.g., path, supporting facts)."""
+    def explain_answer(self, answer_nodes, max_hops=3, edge_types=None):
+        """
+        Return a reasoning trace for the answer (e.g., path, supporting facts).
+        With a GraphStore, every ordered pair of answer entities is checked in one
+        batched reachability pass and a typed path is reported for each connected pair.
+        """
         if len(answer_nodes) < 2:
             return "No reasoning trace."
-        path = self.find_path(answer_nodes[0], answer_nodes[-1])
-        if path:
-            return f"Path: {' -> '.join(path)}"
+        if not self.engine:
+            path = self.find_path(answer_nodes[0], answer_nodes[-1], max_hops=max_hops, edge_types=edge_types)
+            if path:
+                return f"Path: {' -> '.join(path)}"
+            return "No path found."
+        nodes = list(dict.fromkeys(answer_nodes))
+        dist = self.engine.reachability(nodes, nodes, max_hops=max_hops, edge_types=edge_types)
+        traces = []
+        for i, j in zip(*np.nonzero(dist > 0)):
+            path = self.engine.shortest_path(nodes[i], nodes[j], max_hops=max_hops, edge_types=edge_types)
+            if path:
+                traces.append(format_path(path))
+        if traces:
+            return "Path: " + "; ".join(traces)
         return "No path found."
 
+def format_path(path):
+    """'a -[TYPE]-> b -[TYPE]-> c' for a traversal Path."""
+    parts = [str(path.nodes[0])]
+    for rel, node in zip(path.relations, path.nodes[1:]):
+        parts.append(f"-[{rel}]-> {node}")
+    return ' '.join(parts)
+
 # --- Graph Reasoning: GNNs, Logic, Contradiction Detection ---
 class GNNReasoner:
     def __init__(self, graph):
@@ -1,22 +1,79 @@
 """
 Multi-hop logic: retrieval, sort, deduce, etc.
 """
+import time
 from .memory_manager import MemoryManager
 from .planner import Planner
 
+NO_CONTEXT = "[No relevant context found]"
+
 class LogicalFormSolver:
-    def __init__(self):
-        self.memory = MemoryManager()
+    def __init__(self, memory=None):
+        self.memory = memory if memory is not None else MemoryManager()
         self.planner = Planner()
+        self.last_timings = []
 
     def solve(self, query, retriever, k=3, hops=2):
         """
-        Decompose the query, retrieve for each sub-question, store steps, and aggregate answers.
+        Decompose the query into a plan DAG and run it wave by wave. Steps already
+        in memory (same question, query, k, hops and index) are reused without
+        touching the index; the rest of a wave go through one batched retrieval.
+        Its second hop reuses the expansions memory holds for chunks retrieved
+        earlier in the session. A step that depends on an earlier one has its
+        query expanded with the entities found in that step's context.
+        Per-step timings end up in self.last_timings and in each answer's
+        'timing'; retrieved steps share their wave's batch time.
         """
-        sub_questions = self.planner.plan(query)
+        steps = self.planner.plan_dag(query)
+        version = getattr(retriever.indexer, 'version', None)
+        results = {}
+        self.last_timings = []
+        for wave_no, wave in enumerate(self.planner.waves(steps)):
+            todo = []
+            for step in wave:
+                start = time.perf_counter()
+                q = self._step_query(step, results, retriever)
+                cached = self.memory.lookup(step.question, {'query': q, 'k': k, 'hops': hops,
+                                                            'index_version': version})
+                if cached is not None:
+                    self._finish(step, wave_no, cached['hits'], {'query': q, 'memory_hit': True,
+                                                                 'seconds': time.perf_counter() - start}, results)
+                else:
+                    todo.append((step, q))
+            if not todo:
+                continue
+            start = time.perf_counter()
+            expanded = {}
+            known = lambda chunk_ids: self.memory.expansions_for_chunks(chunk_ids, {'index_version': version})
+            found = retriever.retrieve_hits_batch([q for _, q in todo], k=k, hops=hops, expansion_cache=expanded,
+                                                  known_expansions=known)
+            seconds = time.perf_counter() - start
+            for (step, q), hits in zip(todo, found):
+                self.memory.add({'question': step.question, 'query': q, 'hits': hits,
+                                 'context': [hit.text for hit in hits] or [NO_CONTEXT],
+                                 'expansions': {hit.chunk_id: expanded[hit.chunk_id]
+                                                for hit in hits if hit.hop == 1 and hit.chunk_id in expanded},
+                                 'k': k, 'hops': hops, 'index_version': version})
+                self._finish(step, wave_no, hits, {'query': q, 'memory_hit': False, 'seconds': seconds}, results)
         answers = []
-        for subq in sub_questions:
-            context = retriever.retrieve(subq, k=k, hops=hops)
-            self.memory.add({'question': subq, 'context': context})
-            answers.append({'sub_question': subq, 'context': context})
+        for step in steps:
+            hits, timing = results[step.index]
+            answers.append({'sub_question': step.question, 'context': [hit.text for hit in hits] or [NO_CONTEXT],
+                            'hits': hits, 'depends_on': list(step.depends_on), 'timing': timing})
         return answers
+
+    def _finish(self, step, wave_no, hits, timing, results):
+        timing.update(step=step.index, wave=wave_no)
+        results[step.index] = (hits, timing)
+        self.last_timings.append(timing)
+
+    def _step_query(self, step, results, retriever):
+        """The step's question, plus entities from its dependencies' contexts to resolve references."""
+        if not step.depends_on or not retriever.matcher:
+            return step.question
+        surfaces = []
+        for dep in step.depends_on:
+            for hit in results[dep][0]:
+                surfaces.extend(m.surface for m in retriever.matcher.find(hit.text))
+        surfaces = list(dict.fromkeys(surfaces))[:5]
+        return ' '.join([step.question] + surfaces)
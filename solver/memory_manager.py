@@ -1,14 +1,145 @@
 """
 Stores intermediate reasoning steps for multi-hop QA.
+Memory is bounded by entry count, approximate byte size and age (LRU + TTL),
+and steps are indexed by normalized sub-question and by retrieved chunk ID,
+so the second-hop expansions of chunks seen earlier in a session are reused.
 """
+import time
+import threading
+from collections import OrderedDict
+
+from model.response_cache import normalize_question
+
+def step_size(step):
+    """Approximate size of a step in bytes: its question, context and expansion text."""
+    size = len(step.get('question', '')) + len(step.get('query', '') or '')
+    for text in step.get('context', ()):
+        size += len(text)
+    for hits in step.get('expansions', {}).values():
+        size += sum(len(hit.text) for hit in hits)
+    return size
+
 class MemoryManager:
-    def __init__(self):
-        self.memory = []
+    def __init__(self, max_entries=256, max_bytes=8 << 20, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl                      # seconds; None keeps steps until evicted by size
+        self.memory = OrderedDict()         # step id -> (step, created, size), oldest use first
+        self.nbytes = 0
+        self._by_question = {}              # normalized question -> set of step ids
+        self._by_chunk = {}                 # chunk id -> set of step ids
+        self._next_id = 0
+        self._lock = threading.RLock()
+
     def add(self, step):
-        self.memory.append(step)
+        with self._lock:
+            sid = self._next_id
+            self._next_id += 1
+            size = step_size(step)
+            self.memory[sid] = (step, time.time(), size)
+            self.nbytes += size
+            self._by_question.setdefault(normalize_question(step['question']), set()).add(sid)
+            for cid in self._chunk_ids(step):
+                self._by_chunk.setdefault(cid, set()).add(sid)
+            self._evict()
+            return sid
+
     def get_all(self):
-        return self.memory
+        with self._lock:
+            self._expire()
+            return [step for step, _, _ in self.memory.values()]
+
     def clear(self):
-        self.memory = []
+        with self._lock:
+            self.memory.clear()
+            self._by_question.clear()
+            self._by_chunk.clear()
+            self.nbytes = 0
+
     def last(self):
-        return self.memory[-1] if self.memory else None
+        with self._lock:
+            self._expire()
+            if not self.memory:
+                return None
+            # Most recently added, not most recently used
+            return self.memory[max(self.memory)][0]
+
+    def __len__(self):
+        return len(self.memory)
+
+    def lookup(self, question, match=None):
+        """Most recent live step for the same (normalized) question whose fields equal match's."""
+        with self._lock:
+            for sid in sorted(self._by_question.get(normalize_question(question), ()), reverse=True):
+                step = self._live(sid)
+                if step is not None and all(step.get(f) == v for f, v in (match or {}).items()):
+                    self.memory.move_to_end(sid)
+                    return step
+            return None
+
+    def steps_with_chunks(self, chunk_ids):
+        """Live steps whose retrieved context contains any of chunk_ids, newest first; each counts as used."""
+        with self._lock:
+            sids = set()
+            for cid in chunk_ids:
+                sids.update(self._by_chunk.get(cid, ()))
+            steps = []
+            for sid in sorted(sids):
+                step = self._live(sid)
+                if step is not None:
+                    self.memory.move_to_end(sid)
+                    steps.append(step)
+            return steps[::-1]
+
+    def expansions_for_chunks(self, chunk_ids, match=None):
+        """
+        {chunk_id: [second-hop Hit]} that earlier steps whose fields equal
+        match's derived from these first-hop chunks (their 'expansions'),
+        newest step first.
+        """
+        with self._lock:
+            wanted, found = set(chunk_ids), {}
+            for step in self.steps_with_chunks(wanted):
+                if not all(step.get(f) == v for f, v in (match or {}).items()):
+                    continue
+                for cid, hits in step.get('expansions', {}).items():
+                    if cid in wanted:
+                        found.setdefault(cid, hits)
+            return found
+
+    @staticmethod
+    def _chunk_ids(step):
+        return {hit.chunk_id for hit in step.get('hits', ())}
+
+    def _live(self, sid):
+        entry = self.memory.get(sid)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry[1] > self.ttl:
+            self._remove(sid)
+            return None
+        return entry[0]
+
+    def _remove(self, sid):
+        step, _, size = self.memory.pop(sid)
+        self.nbytes -= size
+        for index, keys in ((self._by_question, [normalize_question(step['question'])]),
+                            (self._by_chunk, self._chunk_ids(step))):
+            for key in keys:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(sid)
+                    if not ids:
+                        del index[key]
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        for sid in [sid for sid, (_, created, _) in self.memory.items() if created < cutoff]:
+            self._remove(sid)
+
+    def _evict(self):
+        self._expire()
+        while self.memory and (len(self.memory) > self.max_entries or self.nbytes > self.max_bytes):
+            self._remove(next(iter(self.memory)))
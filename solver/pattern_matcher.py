@@ -0,0 +1,185 @@
+"""
+Typed subgraph pattern matching over a GraphStore.
+Patterns use a small Cypher-like syntax, e.g.
+
+    (a:PERSON)-[SUED]->(b:ORG {name: "Acme Corp"})
+    (a)-[SUED|ACCUSED]->(x), (x)<-[CO_OCCUR]-(c:GPE)
+
+Matching starts at the most selective pattern node (bound name, then smallest
+label) and binds the remaining nodes one at a time, each from the intersection
+of the bound neighbours' adjacency slices and the label index. Results stream
+from a generator, so a limit stops the search early.
+"""
+import re
+from collections import namedtuple
+import numpy as np
+from .traversal import TraversalEngine
+
+NodePattern = namedtuple('NodePattern', ['var', 'label', 'name'])
+EdgePattern = namedtuple('EdgePattern', ['src', 'dst', 'types', 'directed'])
+
+_NODE = re.compile(r'''\(\s*(?P<var>\w+)?\s*(?::\s*(?P<label>\w+))?\s*
+                       (?:\{\s*name\s*:\s*(?P<q>["'])(?P<name>.*?)(?P=q)\s*\})?\s*\)''', re.X)
+_EDGE = re.compile(r'''(?P<left><)?-\s*(?:\[\s*(?:\w*\s*:)?\s*(?P<types>[\w|]*)\s*\])?\s*-(?P<right>>)?''', re.X)
+
+def parse_pattern(pattern):
+    """Parse a pattern string into (node patterns by var, edge patterns)."""
+    nodes, edges = {}, []
+    anon = 0
+    for chain in _split_chains(pattern):
+        pos, prev = 0, None
+        while True:
+            m = _NODE.match(chain, pos)
+            if not m:
+                raise ValueError(f"Expected a node pattern at {chain[pos:]!r}")
+            var = m.group('var')
+            if var is None:
+                var, anon = f'_{anon}', anon + 1
+            node = NodePattern(var, m.group('label'), m.group('name'))
+            old = nodes.get(var)
+            if old:
+                node = NodePattern(var, node.label or old.label, node.name or old.name)
+                if (old.label and old.label != node.label) or (old.name and old.name != node.name):
+                    raise ValueError(f"Conflicting constraints for {var!r}")
+            nodes[var] = node
+            if prev is not None:
+                edges.append(_edge_between(prev, var, pending))
+            pos = m.end()
+            while pos < len(chain) and chain[pos].isspace():
+                pos += 1
+            if pos == len(chain):
+                break
+            e = _EDGE.match(chain, pos)
+            if not e or (e.group('left') and e.group('right')):
+                raise ValueError(f"Expected a relationship at {chain[pos:]!r}")
+            pending = e
+            prev = var
+            pos = e.end()
+            while pos < len(chain) and chain[pos].isspace():
+                pos += 1
+    return nodes, edges
+
+def _split_chains(pattern):
+    chains, depth, start = [], 0, 0
+    for i, ch in enumerate(pattern):
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            chains.append(pattern[start:i].strip())
+            start = i + 1
+    chains.append(pattern[start:].strip())
+    return [c for c in chains if c]
+
+def _edge_between(left_var, right_var, m):
+    types = tuple(t for t in (m.group('types') or '').split('|') if t) or None
+    if m.group('left'):
+        return EdgePattern(right_var, left_var, types, True)
+    return EdgePattern(left_var, right_var, types, bool(m.group('right')))
+
+class PatternMatcher:
+    """Matches patterns against a GraphStore; distinct pattern nodes bind distinct graph nodes."""
+    def __init__(self, store, engine=None):
+        self.store = store
+        self.engine = engine or TraversalEngine(store)
+        self._label_index = None
+
+    def label_index(self, label):
+        """Sorted node IDs carrying label."""
+        if self._label_index is None:
+            labels = np.asarray(self.store.node_label)
+            order = np.argsort(labels, kind='stable')
+            bounds = np.searchsorted(labels[order], np.arange(len(self.store.label_names) + 1))
+            self._label_index = {name: order[bounds[i]:bounds[i + 1]].astype(np.int64)
+                                 for i, name in enumerate(self.store.label_names)}
+        return self._label_index.get(label, np.zeros(0, dtype=np.int64))
+
+    def _candidates(self, node):
+        """Node-local candidates as a sorted ID array, or None for 'any node'."""
+        cands = None
+        if node.name is not None:
+            i = self.store.node_id(node.name)
+            cands = np.array([] if i is None else [i], dtype=np.int64)
+        if node.label is not None:
+            by_label = self.label_index(node.label)
+            cands = by_label if cands is None else np.intersect1d(cands, by_label, assume_unique=True)
+        return cands
+
+    def _neighbours(self, node_id, edge, from_src):
+        """Sorted, unique nodes reachable from node_id over edge (from its src end if from_src)."""
+        if not edge.directed:
+            direction = 'both'
+        else:
+            direction = 'out' if from_src else 'in'
+        indptr, indices, _ = self.engine.adjacency(direction, edge.types)
+        return np.unique(indices[indptr[node_id]:indptr[node_id + 1]])
+
+    def _plan(self, nodes, edges, cands):
+        """Binding order: the most selective node first, then connected nodes by selectivity."""
+        size = {v: self.store.number_of_nodes() if c is None else len(c) for v, c in cands.items()}
+        order, remaining = [], set(nodes)
+        while remaining:
+            connected = {v for v in remaining
+                         if any((e.src == v and e.dst in order) or (e.dst == v and e.src in order) for e in edges)}
+            pool = connected or remaining
+            var = min(pool, key=lambda v: (size[v], v))
+            order.append(var)
+            remaining.discard(var)
+        return order
+
+    def match(self, pattern, limit=None):
+        """Yield bindings {var: node name} for pattern (string or parse_pattern output)."""
+        nodes, edges = parse_pattern(pattern) if isinstance(pattern, str) else pattern
+        cands = {v: self._candidates(n) for v, n in nodes.items()}
+        if any(c is not None and not len(c) for c in cands.values()):
+            return
+        order = self._plan(nodes, edges, cands)
+        # For each position, the edges joining that var to earlier ones
+        joins = []
+        for pos, var in enumerate(order):
+            earlier = set(order[:pos])
+            joins.append([(e, e.dst == var) for e in edges
+                          if (e.src == var and e.dst in earlier) or (e.dst == var and e.src in earlier)
+                          or (e.src == var and e.dst == var)])
+        all_nodes = np.arange(self.store.number_of_nodes(), dtype=np.int64)
+        names = self.store.names
+        count = 0
+        binding = {}
+
+        def extend(pos):
+            nonlocal count
+            if pos == len(order):
+                count += 1
+                yield {v: names[binding[v]] for v in nodes if not v.startswith('_')}
+                return
+            var = order[pos]
+            current = cands[var]
+            for edge, var_is_dst in joins[pos]:
+                if edge.src == edge.dst:
+                    continue
+                other = binding[edge.src if var_is_dst else edge.dst]
+                nbrs = self._neighbours(other, edge, from_src=var_is_dst)
+                current = nbrs if current is None else np.intersect1d(current, nbrs, assume_unique=True)
+                if not len(current):
+                    return
+            if current is None:
+                current = all_nodes
+            used = set(binding.values())
+            for node_id in current:
+                node_id = int(node_id)
+                if node_id in used:
+                    continue
+                if any(edge.src == edge.dst and node_id not in self._neighbours(node_id, edge, True)
+                       for edge, _ in joins[pos]):
+                    continue
+                binding[var] = node_id
+                yield from extend(pos + 1)
+                del binding[var]
+                if limit is not None and count >= limit:
+                    return
+
+        yield from extend(0)
+
+    def match_all(self, pattern, limit=None):
+        return list(self.match(pattern, limit=limit))
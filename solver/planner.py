@@ -2,8 +2,50 @@
 Decomposes questions into sub-steps for complex queries.
 """
 import re
+from collections import namedtuple
+
+# One node of the plan DAG; depends_on holds indices of earlier steps.
+PlanStep = namedtuple('PlanStep', ['index', 'question', 'depends_on'])
+
+# Words that refer back to something an earlier sub-question introduced
+_ANAPHORA = re.compile(r'\b(it|its|they|them|their|he|him|his|she|her|this|that|these|those|such|same)\b',
+                       re.IGNORECASE)
+
 class Planner:
     def plan(self, question):
         # Split by 'and', 'then', or '?', and clean up
         parts = re.split(r'\band\b|\bthen\b|\?', question, flags=re.IGNORECASE)
         return [q.strip() for q in parts if q.strip()]
+
+    def plan_dag(self, question):
+        """
+        Sub-questions as PlanSteps. A step depends on the previous one if it was
+        introduced by 'then' or refers back with a pronoun/demonstrative;
+        everything else is independent and can be answered concurrently.
+        """
+        pieces = re.split(r'(\band\b|\bthen\b|\?)', question, flags=re.IGNORECASE)
+        steps, sequential = [], False
+        for piece in pieces:
+            text = piece.strip()
+            if text.lower() == 'then':
+                sequential = True
+                continue
+            if not text or text.lower() == 'and' or text == '?':
+                continue
+            depends = ()
+            if steps and (sequential or _ANAPHORA.search(text)):
+                depends = (steps[-1].index,)
+            steps.append(PlanStep(len(steps), text, depends))
+            sequential = False
+        return steps
+
+    @staticmethod
+    def waves(steps):
+        """Group steps into waves; every step's dependencies are in earlier waves."""
+        level = {}
+        for step in steps:
+            level[step.index] = 1 + max((level[d] for d in step.depends_on), default=-1)
+        grouped = {}
+        for step in steps:
+            grouped.setdefault(level[step.index], []).append(step)
+        return [grouped[l] for l in sorted(grouped)]
@@ -1,30 +1,102 @@
 """
 Hybrid retriever from graph and vector chunks.
 """
+from .entity_matcher import EntityMatcher
+
 class Retriever:
     def __init__(self, indexer=None, graph=None):
         self.indexer = indexer
+        self.graph = None
+        self.matcher = None
+        self._synced = (None, None)     # (graph, version) the matcher was last synced with
+        self.set_graph(graph)
+    def set_graph(self, graph):
+        """
+        Attach a graph; the entity matcher is built once and then kept in sync
+        incrementally. Call again after changing a networkx graph in place.
+        """
         self.graph = graph
+        if graph is None:
+            self.matcher = None
+        elif self.matcher is None:
+            self.matcher = EntityMatcher.from_graph(graph)
+        else:
+            self.matcher.sync(graph)
+        self._synced = (graph, getattr(graph, 'version', None))
+    def _sync_matcher(self):
+        """Resync if self.graph was replaced or (for a GraphStore) its content version changed."""
+        graph, version = self._synced
+        if self.graph is not graph or getattr(self.graph, 'version', None) != version:
+            self.set_graph(self.graph)
     def retrieve(self, query, k=3, hops=2):
         """
         Multi-hop retrieval: retrieves top-k chunks for the query, then expands search using entities from those chunks.
         """
+        return self.retrieve_batch([query], k=k, hops=hops)[0]
+    def retrieve_batch(self, queries, k=3, hops=2):
+        """
+        Multi-hop retrieval for several queries at once. Each hop issues a single
+        batched index search covering every query (first hop) or every entity
+        found in any first-hop chunk (second hop).
+        """
         if not self.indexer:
-            return ["[No relevant context found]"]
-        # First hop: retrieve top-k chunks for the original query
-        results = self.indexer.search(query, k=k)
-        if not self.graph or hops < 2:
-            return results
-        # Second hop: extract entities from first-hop results and retrieve more
-        node_names = set(self.graph.nodes) if self.graph else set()
-        found_entities = set()
-        for chunk in results:
-            for node in node_names:
-                if node in chunk:
-                    found_entities.add(node)
-        # For each found entity, retrieve more chunks
-        expanded_chunks = set(results)
-        for entity in found_entities:
-            more = self.indexer.search(entity, k=1)
-            expanded_chunks.update(more)
-        return list(expanded_chunks)[:k]
+            return [["[No relevant context found]"] for _ in queries]
+        return [[hit.text for hit in hits] for hits in self.retrieve_hits_batch(queries, k=k, hops=hops)]
+    def retrieve_hits_batch(self, queries, k=3, hops=2, expansions=None, expansion_cache=None,
+                            known_expansions=None):
+        """
+        Like retrieve_batch, but returns Hits (chunk ID, text, score, hop): the
+        top-k first-hop chunks, then up to `expansions` (default k) second-hop
+        chunks, best score first. The second hop is skipped when it cannot add
+        anything (hops < 2, expansions == 0, or no graph).
+        expansion_cache ({first-hop chunk ID: [second-hop Hit]}) supplies
+        expansions already known, e.g. from session memory; those chunks are
+        neither scanned nor searched again, and the dict is filled with the
+        expansions computed here. known_expansions, a callable from first-hop
+        chunk IDs to such a dict, is asked only for the chunks not in the cache.
+        """
+        if not self.indexer:
+            return [[] for _ in queries]
+        expansions = k if expansions is None else expansions
+        # First hop: retrieve top-k chunks for all original queries
+        first_hop = self.indexer.search_hits_batch(list(queries), k=k)
+        if not self.graph or hops < 2 or expansions <= 0:
+            return first_hop
+        cache = expansion_cache if expansion_cache is not None else {}
+        self._expand({hit.chunk_id: hit for results in first_hop for hit in results}, cache, known_expansions)
+        contexts = []
+        for results in first_hop:
+            seen = {hit.chunk_id for hit in results}
+            found = {}
+            for hit in results:
+                for exp in cache[hit.chunk_id]:
+                    best = found.get(exp.chunk_id)
+                    if exp.chunk_id not in seen and (best is None or exp.score > best.score):
+                        found[exp.chunk_id] = exp
+            ranked = sorted(found.values(), key=lambda hit: -hit.score)
+            contexts.append(list(results) + ranked[:expansions])
+        return contexts
+    def _expand(self, hits, cache, known=None):
+        """
+        Second hop for the first-hop hits ({chunk ID: Hit}) missing from cache
+        and unknown to known(): entities found in those chunks are searched in
+        one batch (top-1 each), and cache[chunk ID] gets the second-hop Hits.
+        """
+        if known is not None:
+            missing = [cid for cid in hits if cid not in cache]
+            if missing:
+                cache.update(known(missing))
+        todo = [hit for cid, hit in hits.items() if cid not in cache]
+        if not todo:
+            return
+        self._sync_matcher()
+        surfaces_per_chunk = [sorted({m.surface for m in self.matcher.iter_matches(hit.text)}) for hit in todo]
+        # One batched search for every distinct entity mention across all new chunks
+        surfaces = sorted(set().union(*surfaces_per_chunk))
+        found = dict(zip(surfaces, self.indexer.search_hits_batch(surfaces, k=1)))
+        for hit, chunk_surfaces in zip(todo, surfaces_per_chunk):
+            expanded = {}
+            for surface in chunk_surfaces:
+                for exp in found[surface]:
+                    expanded.setdefault(exp.chunk_id, exp._replace(hop=2))
+            cache[hit.chunk_id] = list(expanded.values())
@@ -0,0 +1,202 @@
+"""
+Array-backed traversal over a GraphStore: bidirectional BFS with hop limits,
+k-shortest paths (Yen), bit-parallel many-to-many reachability and edge-type
+filters. Frontiers are expanded with vectorized CSR gathers, not Python loops.
+"""
+import heapq
+from collections import namedtuple
+import numpy as np
+
+Path = namedtuple('Path', ['nodes', 'relations'])
+
+def _expand(indptr, indices, frontier):
+    """All (neighbour, parent, edge position) triples leaving the frontier node IDs."""
+    starts = indptr[frontier]
+    lens = indptr[frontier + 1] - starts
+    total = int(lens.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    parents = np.repeat(frontier, lens)
+    positions = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(total)
+    return indices[positions].astype(np.int64), parents, positions
+
+class TraversalEngine:
+    def __init__(self, store):
+        self.store = store
+        self.n = store.number_of_nodes()
+        self._adj_cache = {}
+
+    def type_ids(self, edge_types=None):
+        if edge_types is None:
+            return tuple(range(len(self.store.edge_types)))
+        wanted = set(edge_types)
+        return tuple(t for t, name in enumerate(self.store.edge_types) if name in wanted)
+
+    def adjacency(self, direction='out', edge_types=None):
+        """
+        Combined CSR (indptr, indices, edge type IDs) over the selected edge
+        types; direction is 'out', 'in' or 'both' (undirected). Cached per filter.
+        """
+        key = (direction, self.type_ids(edge_types))
+        if key in self._adj_cache:
+            return self._adj_cache[key]
+        directions = ('out', 'in') if direction == 'both' else (direction,)
+        srcs, dsts, types = [], [], []
+        for d in directions:
+            adj = self.store.out_adj if d == 'out' else self.store.in_adj
+            for t in key[1]:
+                indptr, indices, _ = adj[t]
+                srcs.append(np.repeat(np.arange(self.n, dtype=np.int64), np.diff(indptr)))
+                dsts.append(np.asarray(indices, dtype=np.int64))
+                types.append(np.full(len(indices), t, dtype=np.int32))
+        if srcs:
+            src, dst, etype = np.concatenate(srcs), np.concatenate(dsts), np.concatenate(types)
+            order = np.lexsort((etype, dst, src))
+            src, dst, etype = src[order], dst[order], etype[order]
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+            etype = np.zeros(0, dtype=np.int32)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.n), out=indptr[1:])
+        self._adj_cache[key] = (indptr, dst, etype)
+        return self._adj_cache[key]
+
+    def _ids(self, names):
+        return [self.store.node_id(name) for name in names]
+
+    def _to_path(self, node_ids, type_ids):
+        return Path([self.store.names[i] for i in node_ids], [self.store.edge_types[t] for t in type_ids])
+
+    # --- single pair ---
+    def _bidirectional_bfs(self, s, t, max_hops, edge_types, directed, banned_nodes=(), banned_edges=None):
+        """Shortest path as (node IDs, type IDs) or None. banned_edges: int64 array of u*n+v keys."""
+        if s == t:
+            return [s], []
+        fwd = self.adjacency('out' if directed else 'both', edge_types)
+        bwd = self.adjacency('in' if directed else 'both', edge_types)
+        parent = [np.full(self.n, -1, dtype=np.int64), np.full(self.n, -1, dtype=np.int64)]
+        via = [np.full(self.n, -1, dtype=np.int64), np.full(self.n, -1, dtype=np.int64)]
+        for b in banned_nodes:
+            parent[0][b] = parent[1][b] = -2
+        parent[0][s], parent[1][t] = s, t
+        frontiers = [np.array([s], dtype=np.int64), np.array([t], dtype=np.int64)]
+        hops = 0
+        while len(frontiers[0]) and len(frontiers[1]) and hops < max_hops:
+            # Expand the cheaper side
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            indptr, indices, _ = fwd if side == 0 else bwd
+            nbrs, parents, positions = _expand(indptr, indices, frontiers[side])
+            keep = parent[side][nbrs] == -1
+            if banned_edges is not None and len(banned_edges):
+                # Edge keys are always (tail, head) in the forward direction
+                keys = parents * self.n + nbrs if side == 0 else nbrs * self.n + parents
+                keep &= ~np.isin(keys, banned_edges)
+            nbrs, parents, positions = nbrs[keep], parents[keep], positions[keep]
+            nbrs, first = np.unique(nbrs, return_index=True)
+            parent[side][nbrs] = parents[first]
+            via[side][nbrs] = positions[first]
+            hops += 1
+            met = nbrs[parent[1 - side][nbrs] >= 0]
+            if len(met):
+                return self._join(int(met[0]), s, t, parent, via, fwd, bwd)
+            frontiers[side] = nbrs
+        return None
+
+    def _join(self, meet, s, t, parent, via, fwd, bwd):
+        head, head_types = [meet], []
+        while head[-1] != s:
+            node = head[-1]
+            head_types.append(int(fwd[2][via[0][node]]))
+            head.append(int(parent[0][node]))
+        tail, tail_types = [], []
+        node = meet
+        while node != t:
+            tail_types.append(int(bwd[2][via[1][node]]))
+            node = int(parent[1][node])
+            tail.append(node)
+        return head[::-1] + tail, head_types[::-1] + tail_types
+
+    def shortest_path(self, source, target, max_hops=3, edge_types=None, directed=True):
+        """Shortest path (node names + relation type per hop) within max_hops, or None."""
+        s, t = self._ids([source, target])
+        if s is None or t is None:
+            return None
+        found = self._bidirectional_bfs(s, t, max_hops, edge_types, directed)
+        return self._to_path(*found) if found else None
+
+    def k_shortest_paths(self, source, target, k=3, max_hops=4, edge_types=None, directed=True):
+        """Up to k loopless shortest paths (Yen's algorithm over the bidirectional BFS)."""
+        s, t = self._ids([source, target])
+        if s is None or t is None:
+            return []
+        first = self._bidirectional_bfs(s, t, max_hops, edge_types, directed)
+        if not first:
+            return []
+        accepted = [first]
+        seen = {tuple(first[0])}
+        candidates = []
+        while len(accepted) < k:
+            prev_nodes, prev_types = accepted[-1]
+            for i in range(len(prev_nodes) - 1):
+                root = prev_nodes[:i + 1]
+                banned = [p[0][i] * self.n + p[0][i + 1] for p in accepted
+                          if len(p[0]) > i + 1 and p[0][:i + 1] == root]
+                if not directed:
+                    banned += [p[0][i + 1] * self.n + p[0][i] for p in accepted
+                               if len(p[0]) > i + 1 and p[0][:i + 1] == root]
+                spur = self._bidirectional_bfs(root[-1], t, max_hops - i, edge_types, directed,
+                                               banned_nodes=root[:-1],
+                                               banned_edges=np.array(banned, dtype=np.int64))
+                if spur:
+                    nodes = root[:-1] + spur[0]
+                    if tuple(nodes) not in seen:
+                        seen.add(tuple(nodes))
+                        heapq.heappush(candidates, (len(nodes), nodes, prev_types[:i] + spur[1]))
+            if not candidates:
+                break
+            _, nodes, types = heapq.heappop(candidates)
+            accepted.append((nodes, types))
+        return [self._to_path(nodes, types) for nodes, types in accepted]
+
+    # --- many to many ---
+    def reachability(self, sources, targets, max_hops=3, edge_types=None, directed=True):
+        """
+        Hop distance from every source to every target (-1 if farther than
+        max_hops or unreachable), as a len(sources) x len(targets) int array.
+        Up to 64 sources are traversed together as bits of one uint64 per node.
+        """
+        dist = np.full((len(sources), len(targets)), -1, dtype=np.int64)
+        src_ids, tgt_ids = self._ids(sources), self._ids(targets)
+        indptr, indices, _ = self.adjacency('out' if directed else 'both', edge_types)
+        valid_t = [(j, tid) for j, tid in enumerate(tgt_ids) if tid is not None]
+        if not valid_t:
+            return dist
+        t_cols = np.array([j for j, _ in valid_t])
+        t_nodes = np.array([tid for _, tid in valid_t], dtype=np.int64)
+        valid_s = [(i, sid) for i, sid in enumerate(src_ids) if sid is not None]
+        for start in range(0, len(valid_s), 64):
+            group = valid_s[start:start + 64]
+            visited = np.zeros(self.n, dtype=np.uint64)
+            for bit, (_, sid) in enumerate(group):
+                visited[sid] |= np.uint64(1 << bit)
+            frontier_mask = visited.copy()
+            self._record(dist, group, t_cols, t_nodes, visited, 0)
+            for hop in range(1, max_hops + 1):
+                frontier = np.flatnonzero(frontier_mask)
+                if not len(frontier):
+                    break
+                nbrs, parents, _ = _expand(indptr, indices, frontier)
+                reached = np.zeros(self.n, dtype=np.uint64)
+                np.bitwise_or.at(reached, nbrs, frontier_mask[parents])
+                frontier_mask = reached & ~visited
+                visited |= frontier_mask
+                self._record(dist, group, t_cols, t_nodes, frontier_mask, hop)
+        return dist
+
+    @staticmethod
+    def _record(dist, group, t_cols, t_nodes, masks, hop):
+        hit = masks[t_nodes]
+        for bit, (row, _) in enumerate(group):
+            cols = t_cols[(hit >> np.uint64(bit)) & np.uint64(1) == 1]
+            dist[row, cols[dist[row, cols] < 0]] = hop